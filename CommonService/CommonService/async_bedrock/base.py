@@ -1,10 +1,10 @@
-import asyncio
 import json
 import logging
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List
 import numpy as np
-import random
+from CommonService.utils.resilience import for_dependency, is_retryable
+from CommonService.utils.singleflight import SingleFlight
 from .constants import (
     TITAN_V1,
     TITAN_V2,
@@ -33,6 +33,7 @@ class Embedding(ABC):
         self.__session = session
         self.max_retries = kwargs.get("max_retries", MAX_RETRIES)
         self.retry_delay = kwargs.get("retry_delay", RETRY_DELAY)
+        self._flight = SingleFlight()
 
     @abstractmethod
     async def generate_embedding(self, payload: Dict) -> List[float]:
@@ -47,9 +48,28 @@ class Embedding(ABC):
         """
         pass
 
+    async def invoke_shared(self, model_id, payload: Dict) -> List[float]:
+        """
+        Invoke the model, sharing one upstream call between concurrent
+        identical requests.
+
+        Args:
+            model_id (str): The ID of the model to invoke.
+            payload (Dict): The input payload for the model.
+        Returns:
+            List[float]: The embedding vector; callers must not mutate it.
+        """
+        key = (model_id, json.dumps(payload, sort_keys=True))
+        return await self._flight.do(key, lambda: self.invoke_with_retry(model_id, payload))
+
     async def invoke_with_retry(self, model_id, payload: Dict) -> List[float]:
         """
-        Invoke the model with retries.
+        Invoke the model, retrying throttling and transient failures.
+
+        Retries go through the shared "bedrock" resilience policy: jittered
+        backoff that honours Retry-After, a retry budget, and a circuit
+        breaker that fails fast (CircuitOpenError) while Bedrock is down.
+        Validation and auth errors are raised on the first attempt.
 
         Args:
             model_id (str): The ID of the model to invoke.
@@ -57,30 +77,27 @@ class Embedding(ABC):
         Returns:
             List[float]: The embedding vector returned from the model invocation.
         """
-        attempt = 0
-        while attempt < self.max_retries:
-            try:
-                response = await self.__session.invoke_model(
-                    modelId=model_id,
-                    body=json.dumps(payload),
-                    contentType=APPLICATION_JSON,
-                    accept=APPLICATION_JSON,
-                )
-                body_content = await response["body"].read()
-                result = json.loads(body_content)
-                embedding_vector = result[EMBEDDING]
-                return embedding_vector
-            except Exception as e:
-                logger.warning(f"Attempt {attempt + 1} failed: {e}")
-                attempt += 1
-                if attempt < self.max_retries:
-                    # Add random jitter to avoid thundering herd problem
-                    base_delay = self.retry_delay * (2 ** (attempt - 1))
-                    jitter = random.uniform(0, self.retry_delay)
-                    await asyncio.sleep(base_delay + jitter)
-        raise RuntimeError(
-            f"Failed to invoke model {model_id} after {self.max_retries} attempts"
-        )
+        async def invoke():
+            response = await self.__session.invoke_model(
+                modelId=model_id,
+                body=json.dumps(payload),
+                contentType=APPLICATION_JSON,
+                accept=APPLICATION_JSON,
+            )
+            body_content = await response["body"].read()
+            result = json.loads(body_content)
+            return result[EMBEDDING]
+
+        try:
+            return await for_dependency("bedrock").call(
+                invoke, max_attempts=self.max_retries, base_delay=self.retry_delay
+            )
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            raise RuntimeError(
+                f"Failed to invoke model {model_id} after {self.max_retries} attempts"
+            ) from e
 
 
 class TitanV1(Embedding):
@@ -123,7 +140,7 @@ class TitanV1(Embedding):
             payload = {}
         if NORMALIZE in payload:
             normalize = payload.pop(NORMALIZE)
-        embedding_vector = await self.invoke_with_retry(TitanV1.model_id, payload)
+        embedding_vector = await self.invoke_shared(TitanV1.model_id, payload)
         if normalize:
             embedding_vector = self._normalise_vector(np.array(embedding_vector))
         return embedding_vector
@@ -153,5 +170,5 @@ class TitanV2(Embedding):
         """
         if payload is None:
             payload = {}
-        embedding_vector = await self.invoke_with_retry(TitanV2.model_id, payload)
+        embedding_vector = await self.invoke_shared(TitanV2.model_id, payload)
         return embedding_vector
@@ -0,0 +1,7 @@
+"""
+This module initializes the async_commonsession package and exposes the session helpers as its public API.
+"""
+
+from CommonService.async_commonsession.commonsession import AsyncClientPool, CommonSession, CommonSessionConfig
+
+__all__ = ["AsyncClientPool", "CommonSession", "CommonSessionConfig"]
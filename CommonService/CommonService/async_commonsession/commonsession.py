@@ -1,34 +1,49 @@
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional, Tuple
+
 import aioboto3
-from pydantic import BaseModel,field_validator
-from typing import Optional
+from botocore.config import Config
+from pydantic import BaseModel, ValidationInfo, field_validator
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+
+
 class CommonSessionConfig(BaseModel):
-    client_name:str
+    client_name: str
     region: str
-    # profile_name:Optional[str]
-     
-    @field_validator('client_name','region')
-    def client_region_must_be_str(cls,v,field):
-        if not isinstance(v,str):
-            raise TypeError(f"{field.name} should be string")
+    profile_name: Optional[str] = None
+
+    @field_validator('client_name', 'region', mode='before')
+    def client_region_must_be_str(cls, v, info: ValidationInfo):
+        if not isinstance(v, str):
+            raise TypeError(f"{info.field_name} should be string")
         return v
 
-    @field_validator('profile_name')
-    def client_region_must_be_str(cls, v):
+    @field_validator('profile_name', mode='before')
+    def profile_name_must_be_str(cls, v):
         if not isinstance(v, str) and v is not None:
             raise TypeError(f"{v} should be string")
         return v
 
+
+def _new_session(profile_name: Optional[str] = None) -> aioboto3.Session:
+    return aioboto3.Session(profile_name=profile_name) if profile_name else aioboto3.Session()
+
+
 class CommonSession:
-    def __init__(self, config:CommonSessionConfig):
+    """One-off client: `async with CommonSession(config) as client: ...`.
 
+    Creates a session and client per use; long-running services should
+    take clients from an `AsyncClientPool` instead.
+    """
 
+    def __init__(self, config: CommonSessionConfig):
         self.client_name = config.client_name
         self.region = config.region
         self.profile_name = config.profile_name
         self.client = None
-        # self.session = (aioboto3.Session(profile_name=self.profile_name) if self.profile_name else aioboto3.Session())
-        self.session = aioboto3.Session()
-
+        self.session = _new_session(self.profile_name)
 
     async def __aenter__(self):
         self.client = await self.session.client(
@@ -42,25 +57,54 @@ class CommonSession:
             await self.client.__aexit__(exc_type, exc_val, exc_tb)
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+class AsyncClientPool:
+    """Long-lived aioboto3 clients keyed by (service, region).
+
+    All clients come from one session, so they share its credential
+    resolver, and each keeps its own HTTP connection pool sized by
+    `max_pool_connections`. Clients are created on first use and stay
+    open until `close()` (call it from the application lifespan).
+    """
+
+    def __init__(
+        self,
+        profile_name: Optional[str] = None,
+        max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+        session: Optional[aioboto3.Session] = None,
+        **config_options: Any,
+    ):
+        self.session = session or _new_session(profile_name)
+        self.config = Config(max_pool_connections=max_pool_connections, **config_options)
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._stack = AsyncExitStack()
+        self._lock = asyncio.Lock()
+        self._closed = False
+
+    async def get(self, service: str, region: str):
+        """Shared client for `service` in `region`; do not close it yourself."""
+        key = (service, region)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        async with self._lock:
+            if self._closed:
+                raise RuntimeError("AsyncClientPool is closed")
+            client = self._clients.get(key)
+            if client is None:
+                client = await self._stack.enter_async_context(
+                    self.session.client(service_name=service, region_name=region, config=self.config)
+                )
+                self._clients[key] = client
+        return client
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def close(self) -> None:
+        async with self._lock:
+            self._closed = True
+            self._clients.clear()
+            await self._stack.aclose()
 
 
 # async def main():
@@ -1,30 +1,114 @@
 from __future__ import annotations
-import boto3
-from typing import Dict,Any
-from opensearchpy import AsyncOpenSearch,AsyncHttpConnection,AWSV4SignerAsyncAuth,AsyncHttpConnection
+from typing import Dict,Any,Optional
+import aiohttp
+from opensearchpy import AsyncOpenSearch,AsyncHttpConnection,AWSV4SignerAsyncAuth,AsyncHttpConnection,AsyncTransport
+from opensearchpy.connection.http_async import OpenSearchClientResponse
+from opensearchpy._async.compat import get_running_loop
+from CommonService.utils.credentials import shared_credentials
+from CommonService.utils.deadline import cap_timeout,time_left
+from CommonService.utils.fastjson import FastJSONSerializer
+from CommonService.utils.hedging import Hedger
+from CommonService.utils.resilience import for_dependency
 from .config import OpenSearchSettings
 
-def build_async_client(settings:OpenSearchSettings):
+class PooledAsyncHttpConnection(AsyncHttpConnection):
+    """AsyncHttpConnection whose aiohttp connector also honours keepalive_timeout."""
+
+    def __init__(self,*args,keepalive_timeout:float=15.0,**kwargs):
+        super().__init__(*args,**kwargs)
+        self._keepalive_timeout=keepalive_timeout
+
+    async def _create_aiohttp_session(self):
+        # upstream's session, with keepalive_timeout on the connector
+        if self.loop is None:
+            self.loop = get_running_loop()
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            skip_auto_headers=("accept", "accept-encoding"),
+            auto_decompress=True,
+            loop=self.loop,
+            cookie_jar=aiohttp.DummyCookieJar(),
+            response_class=OpenSearchClientResponse,
+            connector=aiohttp.TCPConnector(
+                limit=self._limit,
+                use_dns_cache=True,
+                ssl=self._ssl_context,
+                keepalive_timeout=self._keepalive_timeout,
+            ),
+        )
+
+# idempotent POST endpoints; every GET/HEAD is a read as well
+READ_ENDPOINTS=("_search","_msearch","_count","_mget","template")
+
+def read_operation(method:str,url:str)->Optional[str]:
+    """Name of the read `method url` performs (e.g. "_search"), or None for writes."""
+    endpoint=url.split("?",1)[0].rstrip("/").rsplit("/",1)[-1] or "_root"
+    if method in ("GET","HEAD") or (method=="POST" and endpoint in READ_ENDPOINTS):
+        return endpoint
+    return None
+
+def deadline_params(params,default_timeout):
+    """`params` with request_timeout cut down to the current request deadline, if one is bound."""
+    if time_left() is None:
+        return params
+    params=dict(params or {})
+    # a zero timeout means "no timeout" to aiohttp
+    params["request_timeout"]=max(0.001,cap_timeout(params.get("request_timeout") or default_timeout))
+    return params
+
+class ResilientAsyncTransport(AsyncTransport):
+    """AsyncTransport that retries through the shared "opensearch" resilience policy.
+
+    The client's max_retries becomes the policy's extra attempts and the
+    transport's own retry loop is switched off, so only throttling,
+    unavailability and connection errors are retried, with jittered backoff,
+    a retry budget and a circuit breaker. With a `hedger` set, each attempt
+    of an idempotent read is hedged against the tail latency. Inside a
+    request deadline the per-request timeout is capped to the time left.
+    """
+
+    hedger:Optional[Hedger]=None
+
+    def __init__(self,*args,**kwargs):
+        super().__init__(*args,**kwargs)
+        self.attempts=int(self.max_retries)+1
+        self.max_retries=0
+
+    async def perform_request(self,method,url,headers=None,params=None,body=None):
+        parent=super().perform_request
+        attempt=lambda: parent(method,url,headers=headers,params=deadline_params(params,self.kwargs.get("timeout")),body=body)
+        operation=read_operation(method,url) if self.hedger is not None else None
+        if operation is not None:
+            single=attempt
+            attempt=lambda: self.hedger.run(operation,single)
+        return await for_dependency("opensearch").call(attempt,max_attempts=self.attempts)
+
+def build_async_client(settings:OpenSearchSettings,credentials=None,serializer=None,hedger:Optional[Hedger]=None):
     kwargs:Dict[str,Any]=dict(
         hosts=[{"host": settings.os_endpoint, "port": int(settings.os_port)}],
         use_ssl=True,
         verify_certs=settings.verify_certs,
-        connection_class=AsyncHttpConnection,
+        connection_class=PooledAsyncHttpConnection,
+        maxsize=settings.pool_maxsize,
+        keepalive_timeout=settings.keepalive_timeout,
         http_compress=settings.http_compress,
         retry_on_timeout=settings.retry_on_timeout,
         max_retries=settings.max_retries,
-        timeout=settings.timeout
+        timeout=settings.timeout,
+        serializer=serializer or FastJSONSerializer(),
+        transport_class=ResilientAsyncTransport,
     )
-    session = boto3.Session()
     # if settings.profile_name:
     #     session = boto3.Session(profile_name=settings.profile_name)
     # else:
     #     session = boto3.Session(profile_name=settings.profile_name)
 
-    credentials=session.get_credentials()
+    credentials=credentials or shared_credentials().credentials()
     kwargs["http_auth"]=AWSV4SignerAsyncAuth(credentials,settings.os_region,settings.service)
 
-    return AsyncOpenSearch(**kwargs)
+    client=AsyncOpenSearch(**kwargs)
+    client.transport.hedger=hedger
+    return client
 
 async def close_async_client(client:AsyncOpenSearch)->None:
     await client.close()
@@ -8,8 +8,10 @@ class OpenSearchSettings(BaseModel):
     os_region:str=Field(...,description="provide region")
     verify_certs:bool = Field(default=True)
     timeout:int=Field(default=30)
-    max_retries:int = Field(default=True)
+    max_retries:int = Field(default=3,description="extra attempts for retryable failures")
     retry_on_timeout:bool = Field(default=True)
     http_compress:bool = Field(default=True)
+    pool_maxsize:int = Field(default=10,description="max open connections per host")
+    keepalive_timeout:float = Field(default=15.0,description="seconds an idle pooled connection is kept open")
 
 
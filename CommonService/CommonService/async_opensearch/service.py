@@ -1,35 +1,21 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator,Callable
+from typing import AsyncGenerator,Callable,Optional
 from opensearchpy import AsyncOpenSearch
 from .config import OpenSearchSettings
 from .client import build_async_client,close_async_client
+from CommonService.utils.hedging import Hedger
 from fastapi import FastAPI, Request, Depends
-import os
-from datetime import datetime
-from loguru import logger
+import logging
 
-# Ensure log directory exists
-os.makedirs("app/logs", exist_ok=True)
+# Sinks (console, rotating file) are owned by the host application's logging setup.
+logger = logging.getLogger(__name__)
 
-# Create log file with current date
-log_filename = f"app/logs/{datetime.now().strftime('%Y-%m-%d')}.log"
-
-logger.add(
-    log_filename,
-    rotation="1 day",
-    retention="7 days",
-    compression="zip",
-    level="DEBUG",
-    format="{time} | {level} | {message}",
-    enqueue=True,
-)
-
-def lifespan_factory(settings:OpenSearchSettings):
+def lifespan_factory(settings:OpenSearchSettings,hedger:Optional[Hedger]=None):
     @asynccontextmanager
     async def lifespan(app:FastAPI)->AsyncGenerator[None,None]:
-        app.state.OSCLIENT=build_async_client(settings)
+        app.state.OSCLIENT=build_async_client(settings,hedger=hedger)
         try:
             yield
         finally:
@@ -0,0 +1,39 @@
+import unittest
+
+from aiohttp import web
+
+from CommonService.async_opensearch.client import PooledAsyncHttpConnection
+
+
+class TestPooledAsyncHttpConnection(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        async def search(request):
+            return web.json_response({"path": request.path, "size": request.query.get("size")})
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", search)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.runner.cleanup()
+
+    async def test_real_request_through_the_pooled_connector(self):
+        connection = PooledAsyncHttpConnection(host="127.0.0.1", port=self.port, keepalive_timeout=7.5)
+        try:
+            status, _, body = await connection.perform_request("POST", "/ei/_search", params={"size": "5"}, body=b"{}")
+            self.assertEqual(status, 200)
+            self.assertIn('"path": "/ei/_search"', body)
+            self.assertIn('"size": "5"', body)
+            self.assertEqual(connection.session.connector._keepalive_timeout, 7.5)
+            status, _, _ = await connection.perform_request("GET", "/")
+            self.assertEqual(status, 200)
+        finally:
+            await connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from pydantic import ValidationError
+
+from CommonService.async_commonsession import AsyncClientPool, CommonSession, CommonSessionConfig
+
+
+class TestCommonSessionConfig(unittest.TestCase):
+    def test_profile_name_is_optional(self):
+        config = CommonSessionConfig(client_name="s3", region="us-east-1")
+        self.assertIsNone(config.profile_name)
+        self.assertIsNone(CommonSession(config).profile_name)
+
+    def test_rejects_non_string_fields(self):
+        with self.assertRaises((TypeError, ValidationError)):
+            CommonSessionConfig(client_name=1, region="us-east-1")
+        with self.assertRaises((TypeError, ValidationError)):
+            CommonSessionConfig(client_name="s3", region="us-east-1", profile_name=3)
+
+
+class TestAsyncClientPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = AsyncClientPool(max_pool_connections=7)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_clients_are_reused_per_service_and_region(self):
+        first = await self.pool.get("s3", "us-east-1")
+        second = await self.pool.get("s3", "us-east-1")
+        other = await self.pool.get("s3", "us-west-2")
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(len(self.pool), 2)
+        self.assertEqual(first.meta.config.max_pool_connections, 7)
+
+    async def test_closed_pool_refuses_new_clients(self):
+        await self.pool.get("s3", "us-east-1")
+        await self.pool.close()
+        self.assertEqual(len(self.pool), 0)
+        with self.assertRaises(RuntimeError):
+            await self.pool.get("s3", "us-east-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
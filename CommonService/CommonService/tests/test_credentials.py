@@ -0,0 +1,95 @@
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from botocore.config import Config
+from botocore.credentials import Credentials, RefreshableCredentials
+
+from CommonService.utils.credentials import CredentialProvider
+
+
+class FakeSession:
+    def __init__(self, credentials):
+        self.lookups = 0
+        self._credentials = credentials
+
+    def get_credentials(self):
+        self.lookups += 1
+        return self._credentials
+
+    def client(self, service_name, **kwargs):
+        return object()
+
+
+def _refreshable(expires_in, calls):
+    def fetch():
+        calls.append(threading.current_thread().name)
+        return {
+            "access_key": f"AKIA{len(calls)}",
+            "secret_key": "secret",
+            "token": "token",
+            "expiry_time": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+        }
+
+    metadata = {
+        "access_key": "AKIA0",
+        "secret_key": "secret",
+        "token": "token",
+        "expiry_time": (datetime.now(timezone.utc) + timedelta(seconds=expires_in)).isoformat(),
+    }
+    return RefreshableCredentials.create_from_metadata(metadata, fetch, "test")
+
+
+class TestCredentialProvider(unittest.TestCase):
+    def test_credentials_are_resolved_once(self):
+        session = FakeSession(Credentials("AKIA", "secret"))
+        provider = CredentialProvider(session)
+        self.assertIs(provider.credentials(), provider.credentials())
+        self.assertEqual(session.lookups, 1)
+
+    def test_clients_are_created_once_per_options(self):
+        provider = CredentialProvider(FakeSession(Credentials("AKIA", "secret")))
+        options = {"region_name": "us-east-1", "config": Config(retries={"max_attempts": 1})}
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(provider.client("bedrock-runtime", **options))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(client) for client in clients}), 1)
+        same = provider.client("bedrock-runtime", region_name="us-east-1", config=Config(retries={"max_attempts": 1}))
+        self.assertIs(same, clients[0])
+        self.assertIsNot(provider.client("bedrock-runtime", region_name="us-west-2"), clients[0])
+
+    def test_missing_credentials_raise(self):
+        with self.assertRaises(RuntimeError):
+            CredentialProvider(FakeSession(None)).credentials()
+
+    def test_refresh_only_when_close_to_expiry(self):
+        calls = []
+        provider = CredentialProvider(FakeSession(_refreshable(3600, calls)))
+        provider.refresh()
+        self.assertEqual(calls, [])
+
+        expiring = CredentialProvider(FakeSession(_refreshable(60, calls)))
+        expiring.refresh()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(expiring.credentials().get_frozen_credentials().access_key, "AKIA1")
+
+    def test_background_thread_refreshes_ahead_of_expiry(self):
+        calls = []
+        provider = CredentialProvider(FakeSession(_refreshable(60, calls)), refresh_interval=0.01)
+        provider.credentials()
+        provider.start()
+        try:
+            for _ in range(200):
+                if calls:
+                    break
+                threading.Event().wait(0.01)
+        finally:
+            provider.stop()
+        self.assertEqual(calls, ["aws-credential-refresh"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import datetime
+import json
+import unittest
+import uuid
+
+import numpy as np
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+from CommonService.utils.fastjson import FastJSONSerializer, dumps, loads, raw_responses
+
+
+class TestFastJSONSerializer(unittest.TestCase):
+    def setUp(self):
+        self.serializer = FastJSONSerializer()
+
+    def test_matches_stdlib_serializer(self):
+        body = {
+            "query": {"term": {"region": "US"}},
+            "size": 3,
+            "title": "Ünïcode — text",
+            "when": datetime.date(2025, 11, 5),
+            "id": uuid.UUID(int=1),
+        }
+        self.assertEqual(json.loads(self.serializer.dumps(body)), json.loads(JSONSerializer().dumps(body)))
+
+    def test_numpy_values(self):
+        body = {"vector": np.arange(3, dtype=np.float32), "k": np.int64(5)}
+        self.assertEqual(json.loads(self.serializer.dumps(body)), {"vector": [0.0, 1.0, 2.0], "k": 5})
+
+    def test_strings_pass_through_and_output_is_str(self):
+        self.assertEqual(self.serializer.dumps('{"a":1}'), '{"a":1}')
+        self.assertIsInstance(self.serializer.dumps({"a": 1}), str)
+
+    def test_loads_accepts_str_and_bytes(self):
+        self.assertEqual(self.serializer.loads('{"a": [1, 2]}'), {"a": [1, 2]})
+        self.assertEqual(loads(dumps({"b": None})), {"b": None})
+
+    def test_errors_raise_serialization_error(self):
+        with self.assertRaises(SerializationError):
+            self.serializer.loads("{not json")
+        with self.assertRaises(SerializationError):
+            self.serializer.dumps({"x": object()})
+
+
+class TestRawResponses(unittest.TestCase):
+    def test_loads_returns_input_only_inside_block(self):
+        serializer = FastJSONSerializer()
+        with raw_responses():
+            self.assertEqual(serializer.loads('{"a": 1}'), '{"a": 1}')
+        self.assertEqual(serializer.loads('{"a": 1}'), {"a": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+
+from CommonService.async_opensearch.client import read_operation
+from CommonService.utils.hedging import HedgeBudget, Hedger, LatencyTracker
+
+
+def warmed_up(latency=0.01, **kwargs):
+    kwargs.setdefault("burst", 10)
+    hedger = Hedger(min_samples=5, min_delay=0.001, **kwargs)
+    hedger.budget.tokens = kwargs["burst"]
+    for _ in range(5):
+        hedger.tracker("_search").record(latency)
+    return hedger
+
+
+class TestHedgingParts(unittest.TestCase):
+    def test_latency_quantile(self):
+        tracker = LatencyTracker(quantile=0.95, window=100, refresh_every=1)
+        for ms in range(1, 101):
+            tracker.record(ms / 1000)
+        self.assertAlmostEqual(tracker.value(), 0.096)
+
+    def test_budget_bounds_hedges_to_a_share_of_requests(self):
+        budget = HedgeBudget(ratio=0.05, burst=10)
+        hedges = 0
+        for _ in range(1000):
+            budget.earn()
+            hedges += budget.spend()
+        self.assertEqual(hedges, 50)
+
+    def test_no_hedging_until_warmed_up(self):
+        self.assertIsNone(Hedger(min_samples=5).delay("_search"))
+        self.assertEqual(warmed_up(latency=10).delay("_search"), 2.0)
+
+    def test_only_reads_are_hedged(self):
+        self.assertEqual(read_operation("POST", "/ei_articles_index/_search"), "_search")
+        self.assertEqual(read_operation("POST", "/_msearch?typed_keys=true"), "_msearch")
+        self.assertEqual(read_operation("GET", "/ei_articles_index/_mapping"), "_mapping")
+        self.assertIsNone(read_operation("POST", "/_bulk"))
+        self.assertIsNone(read_operation("PUT", "/ei_articles_index/_doc/1"))
+
+
+class TestHedger(unittest.IsolatedAsyncioTestCase):
+    async def test_hedge_wins_and_straggler_is_cancelled(self):
+        events = []
+        hedger = warmed_up(on_event=lambda operation, outcome: events.append(outcome))
+        calls = []
+        cancelled = []
+
+        async def search():
+            calls.append(1)
+            try:
+                await asyncio.sleep(1.0 if len(calls) == 1 else 0.01)
+            except asyncio.CancelledError:
+                cancelled.append(len(calls))
+                raise
+            return len(calls)
+
+        self.assertEqual(await asyncio.wait_for(hedger.run("_search", search), 0.5), 2)
+        self.assertEqual(events, ["sent", "won"])
+        self.assertEqual(len(cancelled), 1)
+
+    async def test_fast_calls_are_not_duplicated(self):
+        hedger = warmed_up(latency=0.2)
+        calls = []
+
+        async def search():
+            calls.append(1)
+            return "ok"
+
+        self.assertEqual(await hedger.run("_search", search), "ok")
+        self.assertEqual(len(calls), 1)
+
+    async def test_exhausted_budget_waits_for_the_primary(self):
+        events = []
+        hedger = warmed_up(burst=0, on_event=lambda operation, outcome: events.append(outcome))
+        calls = []
+
+        async def search():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "slow"
+
+        self.assertEqual(await hedger.run("_search", search), "slow")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(events, ["budget_exhausted"])
+
+    async def test_a_failed_attempt_does_not_beat_a_slower_success(self):
+        hedger = warmed_up()
+        calls = []
+
+        async def search():
+            calls.append(1)
+            if len(calls) == 1:
+                await asyncio.sleep(0.05)
+                return "primary"
+            raise ConnectionResetError("hedge failed")
+
+        self.assertEqual(await hedger.run("_search", search), "primary")
+
+    async def test_error_when_every_attempt_fails(self):
+        hedger = warmed_up()
+
+        async def search():
+            await asyncio.sleep(0.02)
+            raise ValueError("bad query")
+
+        with self.assertRaises(ValueError):
+            await hedger.run("_search", search)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import asyncio
+import random
+import unittest
+
+from botocore.exceptions import ClientError, EndpointConnectionError
+from opensearchpy.exceptions import ConnectionTimeout, NotFoundError, RequestError, TransportError
+
+from CommonService.utils.deadline import DeadlineExpired, deadline_scope
+from CommonService.utils.resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    Resilience,
+    RetryBudget,
+    backoff_delay,
+    is_retryable,
+    retry_after_hint,
+)
+
+
+def client_error(code, status=400, headers=None):
+    return ClientError(
+        {"Error": {"Code": code, "Message": code}, "ResponseMetadata": {"HTTPStatusCode": status, "HTTPHeaders": headers or {}}},
+        "InvokeModel",
+    )
+
+
+class TestClassification(unittest.TestCase):
+    def test_retryable_errors(self):
+        for error in (
+            client_error("ThrottlingException", 429),
+            client_error("ServiceUnavailableException", 503),
+            client_error("ModelNotReadyException", 429),
+            EndpointConnectionError(endpoint_url="https://bedrock"),
+            ConnectionTimeout("TIMEOUT", "timed out", None),
+            TransportError(503, "unavailable"),
+            TransportError(429, "too many requests"),
+            asyncio.TimeoutError(),
+        ):
+            self.assertTrue(is_retryable(error), error)
+
+    def test_permanent_errors(self):
+        for error in (
+            client_error("ValidationException", 400),
+            client_error("AccessDeniedException", 403),
+            RequestError(400, "parsing_exception"),
+            NotFoundError(404, "index_not_found_exception"),
+            ValueError("bad payload"),
+            CircuitOpenError("opensearch", 5),
+        ):
+            self.assertFalse(is_retryable(error), error)
+
+    def test_retry_after_hint(self):
+        self.assertEqual(retry_after_hint(client_error("ThrottlingException", 429, {"retry-after": "3"})), 3.0)
+        self.assertIsNone(retry_after_hint(client_error("ThrottlingException", 429)))
+        self.assertIsNone(retry_after_hint(ValueError()))
+
+    def test_backoff_is_jittered_capped_and_honours_the_hint(self):
+        rng = random.Random(0)
+        delays = [backoff_delay(4, base=0.1, cap=1.0, rng=rng) for _ in range(50)]
+        self.assertTrue(all(0 <= delay <= 1.0 for delay in delays))
+        self.assertGreater(len(set(delays)), 1)
+        self.assertGreaterEqual(backoff_delay(0, base=0.1, cap=5.0, hint=2.0, rng=rng), 2.0)
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_retries_are_capped_by_the_request_rate(self):
+        budget = RetryBudget(ratio=0.5, min_per_second=0, window=60)
+        for _ in range(4):
+            budget.record_request()
+        self.assertEqual([budget.try_retry() for _ in range(3)], [True, True, False])
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_fails_fast_then_probes(self):
+        changes = []
+        breaker = CircuitBreaker("bedrock", failure_threshold=2, reset_timeout=0.05,
+                                 on_state_change=lambda name, state: changes.append(state))
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+
+        breaker._opened_at -= 1
+        breaker.allow()  # the single probe
+        self.assertEqual(breaker.state, HALF_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            breaker.allow()
+        breaker.record_success()
+        self.assertEqual(breaker.state, CLOSED)
+        self.assertEqual(changes, [OPEN, HALF_OPEN, CLOSED])
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker("opensearch", failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, OPEN)
+
+
+class TestResilience(unittest.IsolatedAsyncioTestCase):
+    def policy(self, **kwargs):
+        kwargs.setdefault("budget", RetryBudget(min_per_second=100))
+        return Resilience("test", base_delay=0.001, max_delay=0.01, **kwargs)
+
+    async def test_retries_transient_failures(self):
+        calls = []
+
+        async def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise client_error("ServiceUnavailableException", 503)
+            return "ok"
+
+        self.assertEqual(await self.policy(max_attempts=3).call(flaky), "ok")
+        self.assertEqual(len(calls), 3)
+
+    async def test_permanent_failures_are_not_retried_or_counted(self):
+        policy = self.policy(max_attempts=5, breaker=CircuitBreaker("test", failure_threshold=1))
+        calls = []
+
+        async def invalid():
+            calls.append(1)
+            raise client_error("ValidationException")
+
+        with self.assertRaises(ClientError):
+            await policy.call(invalid)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.breaker.state, CLOSED)
+
+    async def test_open_circuit_fails_fast(self):
+        policy = self.policy(max_attempts=10, breaker=CircuitBreaker("test", failure_threshold=2, reset_timeout=60))
+        calls = []
+
+        async def down():
+            calls.append(1)
+            raise TransportError(503, "unavailable")
+
+        with self.assertRaises(TransportError):
+            await policy.call(down)
+        self.assertEqual(len(calls), 2)
+        with self.assertRaises(CircuitOpenError):
+            await policy.call(down)
+        self.assertEqual(len(calls), 2)
+
+    async def test_exhausted_budget_stops_retrying(self):
+        policy = self.policy(max_attempts=10, budget=RetryBudget(ratio=0, min_per_second=0))
+        calls = []
+
+        async def down():
+            calls.append(1)
+            raise asyncio.TimeoutError()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            await policy.call(down)
+        self.assertEqual(len(calls), 1)
+
+    async def test_request_deadline_cuts_attempts_and_stops_retries(self):
+        policy = self.policy(max_attempts=10, breaker=CircuitBreaker("test", failure_threshold=1))
+        calls = []
+
+        async def hang():
+            calls.append(1)
+            await asyncio.sleep(1)
+
+        with deadline_scope(0.05):
+            with self.assertRaises(DeadlineExpired):
+                await policy.call(hang)
+        self.assertEqual(len(calls), 1)
+        # our own deadline is not the dependency's failure
+        self.assertEqual(policy.breaker.state, CLOSED)
+
+    def test_call_sync(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 2:
+                raise client_error("ThrottlingException", 429)
+            return "ok"
+
+        self.assertEqual(self.policy().call_sync(flaky), "ok")
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
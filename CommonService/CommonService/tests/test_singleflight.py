@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+from CommonService.utils.singleflight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("k", fetch) for _ in range(10)))
+        self.assertEqual(results, ["value"] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertFalse(flight.in_flight("k"))
+
+    async def test_errors_propagate_to_every_caller(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        self.assertTrue(all(isinstance(result, ValueError) for result in results))
+
+    async def test_key_released_after_completion(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        self.assertEqual(await flight.do("k", fetch), 1)
+        self.assertEqual(await flight.do("k", fetch), 2)
+
+    async def test_cancelled_waiter_does_not_cancel_shared_call(self):
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", fetch))
+        second = asyncio.ensure_future(flight.do("k", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        self.assertEqual(await second, "done")
+        with self.assertRaises(asyncio.CancelledError):
+            await first
+
+    async def test_last_waiter_cancelling_stops_upstream(self):
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.ensure_future(flight.do("k", fetch))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        self.assertFalse(flight.in_flight("k"))
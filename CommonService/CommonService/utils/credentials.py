@@ -0,0 +1,106 @@
+import logging
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 60.0
+
+
+class CredentialProvider:
+    """One boto3 session whose resolved credentials are shared by every signer and client.
+
+    The provider chain (environment, profile, IMDS/STS) is walked once.
+    Refreshable credentials are refreshed by botocore when they enter its
+    advisory window before expiry; `start()` runs a daemon thread that
+    touches them every `refresh_interval` seconds so that refresh (and its
+    IMDS/STS round trip) happens in the background instead of inside a
+    request that happens to sign at rollover.
+
+    Clients are cached per (service, options): boto3 sessions are not
+    thread-safe for client creation, so it happens once, under a lock, and
+    every later caller (threadpool workers included) gets the same client.
+    """
+
+    def __init__(self, session: Optional[boto3.Session] = None, refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.session = session or boto3.Session()
+        self.refresh_interval = refresh_interval
+        self._credentials = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._clients: Dict[Tuple[Hashable, ...], Any] = {}
+        self._clients_lock = threading.Lock()
+
+    def credentials(self):
+        """The shared (possibly refreshable) credentials object, resolved on first use."""
+        if self._credentials is None:
+            with self._lock:
+                if self._credentials is None:
+                    credentials = self.session.get_credentials()
+                    if credentials is None:
+                        raise RuntimeError("No AWS credentials found")
+                    self._credentials = credentials
+        return self._credentials
+
+    def client(self, service_name: str, **kwargs):
+        """The shared boto3 client for `service_name` with these options (region, endpoint, config...)."""
+        key = (service_name, *sorted((name, _option_key(value)) for name, value in kwargs.items()))
+        client = self._clients.get(key)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = self.session.client(service_name, **kwargs)
+        return client
+
+    def refresh(self) -> None:
+        """Let botocore refresh the credentials now if they are close to expiry."""
+        credentials = self.credentials()
+        if hasattr(credentials, "refresh_needed"):
+            credentials.get_frozen_credentials()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                # keep serving the current credentials; the next tick retries
+                logger.warning(f"Background credential refresh failed: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="aws-credential-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def _option_key(value: Any) -> Hashable:
+    if isinstance(value, Config):
+        # Config has no value equality; two configs with the same options share a client
+        return ("Config", repr(sorted(value._user_provided_options.items())))
+    return value if isinstance(value, Hashable) else repr(value)
+
+
+_shared_provider: Optional[CredentialProvider] = None
+_shared_lock = threading.Lock()
+
+
+def shared_credentials() -> CredentialProvider:
+    """Process-wide CredentialProvider."""
+    global _shared_provider
+    if _shared_provider is None:
+        with _shared_lock:
+            if _shared_provider is None:
+                _shared_provider = CredentialProvider()
+    return _shared_provider
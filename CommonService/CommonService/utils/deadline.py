@@ -0,0 +1,59 @@
+"""
+Per-request deadline carried in a context variable.
+
+The host application binds a deadline (a time.monotonic() value) when a
+request starts; clients and helpers read it to bound their own timeouts
+without the request being threaded through every call. Outside a request
+there is no deadline and `time_left()` is None.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+_current_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExpired(TimeoutError):
+    """The request's deadline passed before the work could finish."""
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Bind a deadline for the duration of a block, keeping an earlier one if it is sooner."""
+    current = _current_deadline.get()
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _current_deadline.get()
+
+
+def time_left() -> Optional[float]:
+    """Seconds until the current deadline (never negative), or None without one."""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def cap_timeout(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` shortened to the time left, if a deadline is bound."""
+    left = time_left()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
+
+
+def check_deadline(what: str = "request") -> None:
+    """Raise DeadlineExpired if the current deadline has passed."""
+    if time_left() == 0.0:
+        raise DeadlineExpired(f"{what} deadline exceeded")
@@ -0,0 +1,75 @@
+"""
+JSON encode/decode backed by orjson when it is installed, stdlib json otherwise.
+
+`FastJSONSerializer` is a drop-in opensearch-py serializer: pass it as
+`serializer=` to OpenSearch/AsyncOpenSearch and it is used both for
+request bodies and for decoding responses. Inside `raw_responses()` it
+skips decoding and hands the response text back unchanged, so a caller
+can pass an OpenSearch response through without parsing it.
+"""
+
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from opensearchpy.exceptions import SerializationError
+from opensearchpy.serializer import JSONSerializer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+HAVE_ORJSON = orjson is not None
+
+if HAVE_ORJSON:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+_raw_responses: ContextVar[bool] = ContextVar("fastjson_raw_responses", default=False)
+
+
+@contextmanager
+def raw_responses():
+    """Within this block (and the current task), FastJSONSerializer.loads returns its input as-is."""
+    token = _raw_responses.set(True)
+    try:
+        yield
+    finally:
+        _raw_responses.reset(token)
+
+
+def dumps(data: Any, default=None) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    if HAVE_ORJSON:
+        return orjson.dumps(data, default=default, option=_OPTIONS)
+    return json.dumps(data, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data) -> Any:
+    """Decode JSON from str or bytes."""
+    if HAVE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONSerializer(JSONSerializer):
+    """opensearch-py serializer using orjson, falling back to the stdlib implementation."""
+
+    def loads(self, s):
+        if _raw_responses.get():
+            return s
+        try:
+            return loads(s)
+        except (ValueError, TypeError) as e:
+            raise SerializationError(s, e)
+
+    def dumps(self, data):
+        # don't serialize strings (pre-built bulk bodies, raw queries)
+        if isinstance(data, (str, bytes)):
+            return data
+        try:
+            # str, not bytes: bulk helpers join serialized lines with "\n"
+            return dumps(data, default=self.default).decode("utf-8")
+        except (ValueError, TypeError) as e:
+            raise SerializationError(data, e)
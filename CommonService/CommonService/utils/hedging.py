@@ -0,0 +1,136 @@
+"""
+Hedged requests: if a call hasn't returned by the recent p95 latency of
+its operation, send a duplicate and take whichever answers first.
+
+Only use this for idempotent reads. A `HedgeBudget` bounds the extra load:
+each call earns `ratio` of a hedge (capped at `burst`), and a hedge is only
+sent when a whole one is available, so hedging adds at most `ratio` to the
+request rate. Until an operation has `min_samples` latencies, its calls are
+not hedged.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+
+class LatencyTracker:
+    """Quantile of the last `window` latencies, recomputed every `refresh_every` samples."""
+
+    def __init__(self, quantile: float = 0.95, window: int = 1000, refresh_every: int = 20):
+        self.quantile = quantile
+        self.refresh_every = refresh_every
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._since_refresh = 0
+        self._value: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._value is None or self._since_refresh >= self.refresh_every:
+            ordered = sorted(self._samples)
+            self._value = ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+            self._since_refresh = 0
+
+    def value(self) -> Optional[float]:
+        return self._value
+
+
+class HedgeBudget:
+    def __init__(self, ratio: float = 0.05, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+
+    def earn(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class Hedger:
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget_ratio: float = 0.05,
+        burst: float = 10.0,
+        min_samples: int = 50,
+        window: int = 1000,
+        min_delay: float = 0.02,
+        max_delay: float = 2.0,
+        on_event: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.quantile = quantile
+        self.window = window
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.budget = HedgeBudget(budget_ratio, burst)
+        self.on_event = on_event
+        self._trackers: Dict[str, LatencyTracker] = {}
+
+    def tracker(self, operation: str) -> LatencyTracker:
+        tracker = self._trackers.get(operation)
+        if tracker is None:
+            tracker = self._trackers[operation] = LatencyTracker(self.quantile, self.window)
+        return tracker
+
+    def delay(self, operation: str) -> Optional[float]:
+        """Seconds to wait before hedging `operation`, or None while its latency is still unknown."""
+        tracker = self.tracker(operation)
+        if len(tracker) < max(1, self.min_samples):
+            return None
+        return min(self.max_delay, max(self.min_delay, tracker.value()))
+
+    def _emit(self, operation: str, outcome: str) -> None:
+        if self.on_event is not None:
+            self.on_event(operation, outcome)
+
+    async def run(self, operation: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await `fn()`, racing a second `fn()` against it once the hedge delay passes."""
+        self.budget.earn()
+        delay = self.delay(operation)
+        started = time.monotonic()
+        if delay is None:
+            result = await fn()
+            self.tracker(operation).record(time.monotonic() - started)
+            return result
+
+        primary = asyncio.ensure_future(fn())
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                if self.budget.spend():
+                    self._emit(operation, "sent")
+                    tasks.append(asyncio.ensure_future(fn()))
+                else:
+                    self._emit(operation, "budget_exhausted")
+            pending = set(tasks)
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if not task.cancelled() and task.exception() is None), None)
+                for task in done:
+                    if task is not winner and not task.cancelled():
+                        error = error or task.exception()
+                if winner is not None:
+                    # the primary's latency is at least this long, whichever attempt won
+                    self.tracker(operation).record(time.monotonic() - started)
+                    if winner is not primary:
+                        self._emit(operation, "won")
+                    return winner.result()
+            # every attempt failed (or was cancelled from outside)
+            raise error or asyncio.CancelledError()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
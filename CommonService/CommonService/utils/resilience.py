@@ -0,0 +1,360 @@
+"""
+Retry and circuit-breaking policy shared by the OpenSearch and Bedrock clients.
+
+`Resilience` wraps calls to one dependency (one instance per dependency,
+see `for_dependency`):
+
+- only retryable failures are retried: throttling, 5xx-style unavailability,
+  timeouts and connection errors; validation/auth/not-found errors raise at once
+- backoff is exponential with full jitter, and never shorter than a
+  Retry-After hint the server sent
+- a retry budget caps retries at `budget_ratio` of recent requests (plus a
+  small floor), so an outage doesn't multiply traffic by max_attempts
+- a circuit breaker opens after `failure_threshold` consecutive retryable
+  failures, fails calls fast with `CircuitOpenError` for `reset_timeout`
+  seconds, then lets a single probe through to decide whether to close
+- inside a request deadline (CommonService.utils.deadline), async attempts
+  are cut off when it passes, no retry is scheduled past it, and the call
+  fails with `DeadlineExpired`
+
+The client libraries' own retries should be turned off where this is used,
+otherwise the attempts multiply.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from CommonService.utils.deadline import DeadlineExpired, check_deadline, time_left
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUSES = {429, 502, 503, 504}
+THROTTLING_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceQuotaExceededException",
+    "Throttling",
+    "RequestLimitExceeded",
+    "SlowDown",
+}
+TRANSIENT_CODES = {
+    "ServiceUnavailableException",
+    "ServiceUnavailable",
+    "InternalServerException",
+    "InternalFailure",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "RequestTimeout",
+    "RequestTimeoutException",
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """The dependency's circuit is open; `retry_after` is the time left until it probes again."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} circuit is open; failing fast for {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def _client_error_code(error: BaseException) -> Optional[str]:
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        return response.get("Error", {}).get("Code")
+    return None
+
+
+def _http_status(error: BaseException) -> Optional[int]:
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        return response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+    status = getattr(error, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_throttling(error: BaseException) -> bool:
+    return _client_error_code(error) in THROTTLING_CODES or _http_status(error) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True for failures a later attempt can plausibly fix."""
+    if isinstance(error, (CircuitOpenError, DeadlineExpired)):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = _client_error_code(error)
+    if code is not None:
+        return code in THROTTLING_CODES or code in TRANSIENT_CODES or _http_status(error) in RETRYABLE_STATUSES
+    # botocore transport errors (EndpointConnectionError, ReadTimeoutError, ...)
+    try:
+        from botocore.exceptions import ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError
+
+        if isinstance(error, (ConnectionClosedError, ConnectTimeoutError, EndpointConnectionError, ReadTimeoutError)):
+            return True
+    except ImportError:
+        pass
+    try:
+        from opensearchpy.exceptions import ConnectionError as OSConnectionError
+        from opensearchpy.exceptions import SSLError, TransportError
+
+        if isinstance(error, SSLError):
+            return False
+        if isinstance(error, OSConnectionError):
+            return True
+        if isinstance(error, TransportError):
+            return error.status_code in RETRYABLE_STATUSES
+    except ImportError:
+        pass
+    try:
+        import aiohttp
+
+        if isinstance(error, aiohttp.ClientConnectionError):
+            return True
+    except ImportError:
+        pass
+    return False
+
+
+def retry_after_hint(error: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header on a botocore error response, if any."""
+    response = getattr(error, "response", None)
+    if not isinstance(response, dict):
+        return None
+    headers = response.get("ResponseMetadata", {}).get("HTTPHeaders", {}) or {}
+    value = headers.get("retry-after") or headers.get("x-amzn-retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float, cap: float, hint: Optional[float] = None, rng: random.Random = random) -> float:
+    """Full-jitter exponential backoff for retry number `attempt` (0-based), at least `hint`."""
+    delay = rng.uniform(0, min(cap, base * (2 ** attempt)))
+    if hint is not None:
+        delay = max(delay, min(hint, cap))
+    return delay
+
+
+class RetryBudget:
+    """Allow retries up to `ratio` of the requests seen in the last `window` seconds, plus `min_per_second`."""
+
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 1.0, window: float = 10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window = window
+        self._requests: List[float] = []
+        self._retries: List[float] = []
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.window
+        while self._requests and self._requests[0] < horizon:
+            self._requests.pop(0)
+        while self._retries and self._retries[0] < horizon:
+            self._retries.pop(0)
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_retry(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            allowed = self.ratio * len(self._requests) + self.min_per_second * self.window
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        on_state_change: Optional[Callable[[str, str], None]] = None,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"{self.name} circuit {self.state} -> {state}")
+        self.state = state
+        if self.on_state_change is not None:
+            self.on_state_change(self.name, state)
+
+    def allow(self) -> None:
+        """Raise CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.name, max(remaining, 0.0) or 1.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._probing = False
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self) -> None:
+        """The probe ended without a verdict (non-retryable error, cancellation)."""
+        with self._lock:
+            self._probing = False
+
+
+class Resilience:
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 5.0,
+        budget: Optional[RetryBudget] = None,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget or RetryBudget()
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def _next_delay(self, error: BaseException, attempt: int, max_attempts: int, base_delay: float) -> Optional[float]:
+        """Seconds to wait before retrying after `error`, or None to give up and raise it."""
+        if time_left() == 0.0 or not is_retryable(error):
+            # a request deadline cutting the attempt short says nothing about the dependency
+            self.breaker.release()
+            return None
+        self.breaker.record_failure()
+        if attempt + 1 >= max_attempts or self.breaker.state == OPEN or not self.budget.try_retry():
+            return None
+        delay = backoff_delay(attempt, base_delay, self.max_delay, retry_after_hint(error))
+        left = time_left()
+        if left is not None and delay >= left:
+            return None
+        logger.warning(f"{self.name} attempt {attempt + 1} failed ({type(error).__name__}: {error}); retrying in {delay:.2f}s")
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], max_attempts: Optional[int] = None, base_delay: Optional[float] = None) -> Any:
+        """Await `fn()` under the policy; `max_attempts`/`base_delay` override the defaults for this call."""
+        max_attempts = max_attempts or self.max_attempts
+        base_delay = self.base_delay if base_delay is None else base_delay
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            check_deadline(self.name)
+            self.breaker.allow()
+            try:
+                left = time_left()
+                result = await (fn() if left is None else asyncio.wait_for(fn(), left))
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                delay = self._next_delay(e, attempt, max_attempts, base_delay)
+                if delay is None:
+                    check_deadline(self.name)
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def call_sync(self, fn: Callable[[], Any], max_attempts: Optional[int] = None, base_delay: Optional[float] = None) -> Any:
+        """Blocking counterpart of `call`, for boto3 and the sync OpenSearch client."""
+        max_attempts = max_attempts or self.max_attempts
+        base_delay = self.base_delay if base_delay is None else base_delay
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            check_deadline(self.name)
+            self.breaker.allow()
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._next_delay(e, attempt, max_attempts, base_delay)
+                if delay is None:
+                    check_deadline(self.name)
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+
+_policies: Dict[str, Resilience] = {}
+_policies_lock = threading.Lock()
+_state_listeners: List[Callable[[str, str], None]] = []
+
+
+def add_state_listener(listener: Callable[[str, str], None]) -> None:
+    """Call `listener(dependency, state)` whenever any shared breaker changes state."""
+    _state_listeners.append(listener)
+
+
+def _notify(name: str, state: str) -> None:
+    for listener in list(_state_listeners):
+        try:
+            listener(name, state)
+        except Exception as e:
+            logger.warning(f"circuit state listener failed: {e}")
+
+
+def for_dependency(name: str, **options) -> Resilience:
+    """The process-wide policy for `name` ("opensearch", "bedrock", ...); options apply on first use."""
+    policy = _policies.get(name)
+    if policy is None:
+        with _policies_lock:
+            policy = _policies.get(name)
+            if policy is None:
+                breaker = CircuitBreaker(
+                    name,
+                    failure_threshold=options.pop("failure_threshold", 5),
+                    reset_timeout=options.pop("reset_timeout", 30.0),
+                    on_state_change=_notify,
+                )
+                budget = RetryBudget(
+                    ratio=options.pop("budget_ratio", 0.2),
+                    min_per_second=options.pop("budget_min_per_second", 1.0),
+                )
+                policy = _policies[name] = Resilience(name, budget=budget, breaker=breaker, **options)
+    return policy
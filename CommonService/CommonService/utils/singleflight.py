@@ -0,0 +1,52 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse concurrent calls that share a key into one upstream call.
+
+    The first caller for a key starts `fn()` as a task; callers arriving
+    while it runs await the same task and receive its result or exception.
+    A cancelled caller only stops waiting: the shared call keeps running for
+    the others and is cancelled once the last waiter has gone. Nothing is
+    cached - the key is released as soon as the call completes.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(fn()))
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._release(key, call))
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.task.cancelled() or call.task.done():
+                raise
+            if call.waiters == 1:
+                # last interested caller is gone: stop the upstream work
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _release(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.task.cancelled():
+            # mark the exception as retrieved when every waiter has left
+            call.task.exception()
@@ -0,0 +1,239 @@
+"""
+Micro-benchmarks of the pure-Python helpers that run on every request.
+
+    python -m benchmarks.bench_hot_paths                      # all cases, all scales
+    python -m benchmarks.bench_hot_paths --scales real 10000 --save run.json
+    python -m benchmarks.bench_hot_paths --compare benchmarks/baselines/hot_paths.json
+
+Fixtures are built from unique_docs.txt: search hits use the real chunk
+sources (vectors included) and are scaled up to 10k/100k hits by cycling
+the export with fresh doc_ids, where every document contributes several
+chunks so get_unique_docs has duplicates to drop. LLM responses for
+`_extract_json` are the DSL the prompt asks for, fenced and unfenced.
+
+Each case is timed timeit-style: the loop count is picked so one repeat
+takes about `--min-time` seconds, and the median of `--repeat` repeats is
+reported per call. Every run also times a fixed pure-Python calibration
+loop; `--compare` checks each case's fastest repeat, relative to the
+calibration loop's, against the saved baseline, so a slower or faster
+machine doesn't show up as a regression. Cases slower than `--threshold` times the baseline are listed
+and the exit status is 1. Logging is disabled while timing, so the log
+lines some helpers write are not part of the measurement.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from CommonService.async_bedrock.base import TitanV1
+from CommonService.utils.helpers import JsonMapperHelper
+from src.api.routes.concern_risk_misc_naics import find_naics_by_code, find_naics_by_description, naics_data
+from src.api.routes.query_generator import OpenSearchQueryGenerator, dsl_validator
+from src.api.routes.search_opensearch import get_unique_docs
+from src.services.local_knn import iter_chunks
+from src.utils.utils import merge_with_overlap
+
+DEFAULT_SCALES = ("real", "10000", "100000")
+CHUNKS_PER_DOC = 4
+DEFAULT_THRESHOLD = 1.3
+
+MAPPED_FIELDS = ["doc_id", "title", "url", "published_time", "region", "tag", "concerns", "emerging_risk_name"]
+MAPPED_NAMES = ["id", "headline", "link", "published", "region", "tag", "concerns", "risks"]
+
+LLM_DSL = {
+    "size": 1000,
+    "query": {
+        "bool": {
+            "must": [{
+                "knn": {
+                    "chunk_vector": {
+                        "query_vector_builder": {
+                            "text_embedding": {
+                                "model_id": "amazon.titan-embed-text-v2:0",
+                                "model_text": "wildfire litigation against utilities",
+                            }
+                        },
+                        "k": 100,
+                    }
+                }
+            }],
+            "filter": [
+                {"term": {"tag": "Current"}},
+                {"terms": {"region": ["US", "Canada"]}},
+                {"range": {"published_time": {"gte": "now-30d/d"}}},
+            ],
+        }
+    },
+}
+
+
+def build_hits(export: str, count: Optional[int]) -> Dict[str, Any]:
+    """A search response with `count` hits (None: the export as-is)."""
+    docs = list(iter_chunks(export))
+    if count is None:
+        sources = docs
+    else:
+        sources = []
+        for i in range(count):
+            source = dict(docs[i % len(docs)])
+            # CHUNKS_PER_DOC consecutive hits share a doc_id, like chunks of one article
+            source["doc_id"] = 1_700_000_000_000 + i // CHUNKS_PER_DOC
+            source["chunk_id"] = i % CHUNKS_PER_DOC
+            sources.append(source)
+    return {
+        "took": 42,
+        "timed_out": False,
+        "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+        "hits": {
+            "total": {"value": len(sources), "relation": "eq"},
+            "max_score": 1.0,
+            "hits": [
+                {"_index": "ei_articles_index-05-nov-test", "_id": f"{s['doc_id']}_{s.get('chunk_id', 0)}", "_score": 1.0, "_source": s}
+                for s in sources
+            ],
+        },
+    }
+
+
+def _calibration() -> int:
+    total = 0
+    for i in range(20000):
+        total += i * i % 7
+    return total
+
+
+def cases(export: str, scale: str) -> List[Tuple[str, Callable[[], Any]]]:
+    """(name, zero-argument callable) pairs for one fixture scale."""
+    response = build_hits(export, None if scale == "real" else int(scale))
+    hits = response["hits"]["hits"]
+    chunks = [hit["_source"].get("chunk_text") or "" for hit in hits]
+    suffix = f"[{scale}]"
+    selected = [
+        (f"get_unique_docs{suffix}", lambda: get_unique_docs(response)),
+        (f"JsonMapperHelper.map_data{suffix}", lambda: JsonMapperHelper.map_data(hits, MAPPED_FIELDS, MAPPED_NAMES)),
+        (f"merge_with_overlap{suffix}", lambda: merge_with_overlap(chunks, overlap=150)),
+    ]
+    if scale != "real":
+        return selected
+
+    # per-request helpers whose cost doesn't depend on the result size
+    generator = OpenSearchQueryGenerator.__new__(OpenSearchQueryGenerator)  # skip the Bedrock client
+    fenced = "Here is the query:\n```json\n" + json.dumps(LLM_DSL, indent=2) + "\n```"
+    prose = "Sure! The query below searches semantically.\n" + json.dumps(LLM_DSL, indent=2) + "\nLet me know if you need more."
+    titan = TitanV1.__new__(TitanV1)
+    vector = np.random.default_rng(0).normal(size=1024).astype(np.float32)
+    last = naics_data[-1]
+    return selected + [
+        ("_extract_json[fenced]", lambda: generator._extract_json(fenced)),
+        ("_extract_json[prose]", lambda: generator._extract_json(prose)),
+        ("_prepare_schema", generator._prepare_schema),
+        ("DSLValidator.validate", lambda: dsl_validator.validate(LLM_DSL)),
+        ("find_naics_by_code[last]", lambda: find_naics_by_code(last["code"])),
+        ("find_naics_by_code[miss]", lambda: find_naics_by_code("000000")),
+        ("find_naics_by_description[last]", lambda: find_naics_by_description(last["description"][-12:])),
+        ("TitanV1._normalise_vector", lambda: titan._normalise_vector(vector)),
+    ]
+
+
+def measure(fn: Callable[[], Any], repeat: int, min_time: float) -> Dict[str, float]:
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9) * 1.1))
+    samples = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - started) / loops)
+    return {
+        "us_median": round(statistics.median(samples) * 1e6, 3),
+        "us_min": round(min(samples) * 1e6, 3),
+        "loops": loops,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    results = {}
+    for scale in args.scales:
+        for name, fn in cases(args.export, scale):
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, args.repeat, args.min_time)
+            print(f"{name:>40}: {results[name]['us_median']:>14.3f} us", flush=True)
+    # the fastest of several runs is the least noisy estimate of the machine's speed
+    calibration = min(measure(_calibration, args.repeat, args.min_time)["us_min"] for _ in range(3))
+    for stats in results.values():
+        stats["relative"] = round(stats["us_min"] / calibration, 5)
+    return {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "machine": platform.machine(),
+        "calibration_us": calibration,
+        "results": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Cases whose calibrated time exceeds `threshold` x the baseline's."""
+    regressions = []
+    for name, stats in report["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before:
+            continue
+        ratio = stats["relative"] / max(before["relative"], 1e-12)
+        if ratio > threshold:
+            regressions.append(f"{name}: {ratio:.2f}x baseline ({before['us_median']} -> {stats['us_median']} us)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", nargs="+", default=list(DEFAULT_SCALES), help="'real' and/or hit counts")
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--export", default="unique_docs.txt")
+    parser.add_argument("--save", help="write the report as JSON to this path")
+    parser.add_argument("--compare", help="baseline report to check against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown vs baseline")
+    args = parser.parse_args()
+
+    # time the helpers, not the JSON log formatter and handlers they call
+    logging.disable(logging.CRITICAL)
+    try:
+        report = run(args)
+    finally:
+        logging.disable(logging.NOTSET)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold}x:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"no regressions over {args.threshold}x against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Recall vs latency of the IVF index against brute force.
+
+    python -m benchmarks.bench_ivf --rows 200000 --dim 1024 --lists 512
+
+Vectors are synthetic: a Gaussian mixture whose centres are seeded from
+the real chunk vectors in unique_docs.txt (when present), which gives the
+clustered structure IVF relies on. Queries are perturbed corpus rows.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.services.ivf_index import IvfIndex
+from src.services.local_knn import iter_chunks
+
+
+def _unit(matrix):
+    return (matrix / np.linalg.norm(matrix, axis=1, keepdims=True)).astype(np.float32)
+
+
+def synthetic_corpus(rows, dim, clusters, spread=1.0, seed=0, export=None):
+    rng = np.random.default_rng(seed)
+    seeds = np.empty((0, dim), dtype=np.float32)
+    if export and os.path.exists(export):
+        vectors = [d["chunk_vector"] for d in iter_chunks(export) if len(d.get("chunk_vector") or []) == dim]
+        if vectors:
+            seeds = np.asarray(vectors, dtype=np.float32)
+    extra = max(0, clusters - len(seeds))
+    centres = np.vstack([seeds[:clusters], rng.normal(size=(extra, dim)).astype(np.float32)])
+    centres = _unit(centres)
+    labels = rng.integers(0, len(centres), size=rows)
+    noise = rng.normal(scale=spread / np.sqrt(dim), size=(rows, dim)).astype(np.float32)
+    return _unit(centres[labels] + noise)
+
+
+def run(args):
+    corpus = synthetic_corpus(args.rows, args.dim, args.clusters, spread=args.spread, export=args.export)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(corpus), size=args.queries)
+    queries = _unit(corpus[picks] + rng.normal(scale=0.3 / np.sqrt(args.dim), size=(args.queries, args.dim)))
+
+    started = time.perf_counter()
+    ivf = IvfIndex.train(corpus, n_lists=args.lists, iterations=args.iterations)
+    train_s = time.perf_counter() - started
+    with tempfile.TemporaryDirectory() as tmp:
+        ivf.save(tmp)
+        started = time.perf_counter()
+        IvfIndex.load(tmp)
+        load_ms = (time.perf_counter() - started) * 1000
+
+    truth, exact_ms = [], []
+    for query in queries:
+        started = time.perf_counter()
+        scores = corpus @ query
+        top = np.argpartition(-scores, args.k - 1)[:args.k]
+        exact_ms.append((time.perf_counter() - started) * 1000)
+        truth.append(set(top.tolist()))
+
+    report = {
+        "rows": args.rows,
+        "dim": args.dim,
+        "lists": ivf.n_lists,
+        "k": args.k,
+        "train_s": round(train_s, 2),
+        "load_ms": round(load_ms, 2),
+        "brute_force_ms_p50": round(float(np.median(exact_ms)), 3),
+        "ivf": [],
+    }
+    for nprobe in args.nprobe:
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            _, ids = ivf.search(corpus, query, args.k, nprobe=nprobe)
+            latencies.append((time.perf_counter() - started) * 1000)
+            recalls.append(len(expected & set(ids.tolist())) / args.k)
+        report["ivf"].append(
+            {
+                "nprobe": nprobe,
+                "recall_at_k": round(float(np.mean(recalls)), 4),
+                "ms_p50": round(float(np.median(latencies)), 3),
+                "ms_p95": round(float(np.percentile(latencies, 95)), 3),
+            }
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise norm relative to cluster centres")
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (default ~sqrt(rows))")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--export", default="unique_docs.txt", help="chunk export used to seed cluster centres")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+    args.lists = args.lists or None
+
+    report = run(args)
+    print(f"{report['rows']} x {report['dim']}, {report['lists']} lists, k={report['k']}: "
+          f"train {report['train_s']}s, load {report['load_ms']}ms, brute force p50 {report['brute_force_ms_p50']}ms")
+    print(f"{'nprobe':>7} {'recall':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in report["ivf"]:
+        print(f"{row['nprobe']:>7} {row['recall_at_k']:>8} {row['ms_p50']:>8} {row['ms_p95']:>8}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
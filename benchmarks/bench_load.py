@@ -0,0 +1,397 @@
+"""
+Load test of the API routes against stubbed Bedrock and OpenSearch.
+
+    python -m benchmarks.bench_load --mode closed --concurrency 32 --duration 30
+    python -m benchmarks.bench_load --mode open --rate 50 --server uvicorn --output run.json
+
+OpenSearch is the in-process stand-in (src/services/fake_opensearch.py)
+loaded with unique_docs.txt, replicated `--replicate` times; Bedrock is a
+runtime client stub returning a canned DSL body after `--llm-latency`
+seconds, so the real BedrockClient, LLM scheduler, query generator,
+search cache and routes all run (`--llm-rpm`/`--llm-tpm` resize the
+scheduler's quota buckets). `--server asgi` drives the app in-process through httpx's
+ASGI transport; `--server uvicorn` starts uvicorn on a background thread
+and goes over loopback HTTP (lifespan off, the stubs are installed
+directly).
+
+Closed loop: `--concurrency` workers each send a request, wait for it,
+and send the next. Open loop: requests start on a fixed schedule at
+`--rate` per second (Poisson with `--poisson`) whether or not earlier ones
+finished, and latency is measured from the scheduled start so queueing
+inside the client isn't hidden (coordinated omission); arrivals beyond
+`--max-inflight` outstanding requests are counted as dropped.
+
+Reports p50/p95/p99 latency, throughput and errors per route, plus
+event-loop lag sampled on the loop that serves the app. `--output`
+writes the whole report as JSON for comparing runs.
+"""
+
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+import uvicorn
+
+from main import app
+from src.api.routes import query_generator
+from src.api.routes.bedrock_client import BedrockClient
+from src.services.fake_opensearch import FakeOpenSearchStore, install
+from src.services.llm_scheduler import llm_scheduler
+from src.services.local_knn import iter_chunks
+from src.services.search_cache import search_cache
+
+INDEX = "ei_articles_index-05-nov-test"
+URL_INDEX = "ei_articles_index"
+
+QUESTIONS = [
+    "emerging risks from AI chatbots",
+    "current wildfire litigation in the US",
+    "new research on microplastics health effects",
+    "autonomous vehicle liability trends",
+    "cyber attacks on healthcare providers",
+    "extreme heat impact on workers",
+    "PFAS contamination lawsuits",
+    "social engineering fraud in financial services",
+]
+
+# what the LLM is asked to produce: knn on the question text plus a keyword filter
+CANNED_DSL = {
+    "size": 100,
+    "query": {
+        "bool": {
+            "must": [{
+                "knn": {
+                    "chunk_vector": {
+                        "query_vector_builder": {
+                            "text_embedding": {"model_id": "amazon.titan-embed-text-v2:0", "model_text": "{question}"}
+                        },
+                        "k": 100,
+                    }
+                }
+            }],
+            "filter": [{"term": {"is_latest": True}}],
+        }
+    },
+}
+
+ROUTES = {
+    "search-insights": ("POST", "/v1/search-insights"),
+    "search-query": ("POST", "/v1/search-query"),
+    "url-search": ("GET", "/v1/url-search"),
+    "searchDocument": ("GET", "/v1/searchDocument"),
+    "doc-search": ("GET", "/v1/doc-search"),
+}
+
+
+class StubBedrockRuntime:
+    """`bedrock-runtime` client stand-in: sleeps, then answers with the canned DSL."""
+
+    def __init__(self, latency: float, jitter: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+
+    def invoke_model(self, modelId, body, **kwargs):
+        request = json.loads(body)
+        prompt = request["messages"][0]["content"]
+        question = prompt.rsplit("USER QUERY:", 1)[-1].split("\n", 1)[0].strip()
+        time.sleep(self.latency + self._random.uniform(0, self.jitter))
+        text = json.dumps(CANNED_DSL).replace("{question}", question)
+        payload = {"content": [{"text": text}], "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4}}
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+class StubCredentialProvider:
+    def __init__(self, runtime: StubBedrockRuntime):
+        self.runtime = runtime
+
+    def client(self, service_name: str, **kwargs):
+        return self.runtime
+
+
+def install_stubs(app, args) -> FakeOpenSearchStore:
+    store = FakeOpenSearchStore(latency=args.os_latency, jitter=args.os_jitter, seed=0)
+    docs = list(iter_chunks(args.export))
+    for copy in range(args.replicate):
+        replicas = [{**doc, "doc_id": doc["doc_id"] + copy} for doc in docs]
+        store.load(INDEX, replicas)
+        store.load(URL_INDEX, replicas)
+    install(app, store)
+    runtime = StubBedrockRuntime(args.llm_latency, args.llm_jitter)
+    query_generator.BedrockClient = partial(BedrockClient, credential_provider=StubCredentialProvider(runtime))
+    if args.llm_rpm or args.llm_tpm:
+        llm_scheduler.set_limits(
+            args.llm_rpm or llm_scheduler.requests.rate * 60,
+            args.llm_tpm or llm_scheduler.tokens.rate * 60,
+        )
+    if args.no_cache:
+        search_cache.ttl_seconds = 0
+    search_cache.invalidate()
+    return store
+
+
+class LoopLagSampler:
+    """Lateness of a periodic wake-up on the loop it runs on."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - scheduled - self.interval))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def summary(self) -> Dict[str, float]:
+        return _percentiles([s * 1000 for s in self.samples], prefix="lag_ms")
+
+
+def _percentiles(values: List[float], prefix: str = "ms") -> Dict[str, float]:
+    if not values:
+        return {}
+    data = np.asarray(values)
+    return {
+        f"{prefix}_p50": round(float(np.percentile(data, 50)), 2),
+        f"{prefix}_p95": round(float(np.percentile(data, 95)), 2),
+        f"{prefix}_p99": round(float(np.percentile(data, 99)), 2),
+        f"{prefix}_max": round(float(data.max()), 2),
+        f"{prefix}_mean": round(float(data.mean()), 2),
+    }
+
+
+class Recorder:
+    def __init__(self):
+        self.measuring = False
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.dropped = 0
+
+    def record(self, route: str, started: float, status: str) -> None:
+        if self.measuring:
+            self.latencies[route].append((time.perf_counter() - started) * 1000)
+            self.statuses[route][status] += 1
+
+
+class RequestFactory:
+    def __init__(self, routes: List[str], distinct: int, seed: int = 0):
+        self.routes = itertools.cycle(routes)
+        self.questions = QUESTIONS * (distinct // len(QUESTIONS) + 1)
+        self.distinct = distinct
+        self._random = random.Random(seed)
+
+    def next(self):
+        route = next(self.routes)
+        method, path = ROUTES[route]
+        payload = None
+        if method == "POST":
+            n = self._random.randrange(self.distinct)
+            payload = {"query": f"{self.questions[n]} #{n}" if n >= len(QUESTIONS) else self.questions[n]}
+        return route, method, path, payload
+
+
+async def _send(client: httpx.AsyncClient, recorder: Recorder, request, started: float) -> None:
+    route, method, path, payload = request
+    try:
+        response = await client.request(method, path, json=payload)
+        await response.aread()
+        status = str(response.status_code)
+    except Exception as e:
+        status = type(e).__name__
+    recorder.record(route, started, status)
+
+
+async def closed_loop(client, recorder, factory, args, deadline: float) -> None:
+    async def worker():
+        while time.perf_counter() < deadline:
+            await _send(client, recorder, factory.next(), time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client, recorder, factory, args, deadline: float) -> None:
+    rng = random.Random(1)
+    inflight = set()
+    next_start = time.perf_counter()
+    while next_start < deadline:
+        delay = next_start - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(inflight) >= args.max_inflight:
+            if recorder.measuring:
+                recorder.dropped += 1
+        else:
+            task = asyncio.create_task(_send(client, recorder, factory.next(), next_start))
+            inflight.add(task)
+            task.add_done_callback(inflight.discard)
+        next_start += rng.expovariate(args.rate) if args.poisson else 1.0 / args.rate
+    if inflight:
+        await asyncio.gather(*inflight)
+
+
+class UvicornThread:
+    """uvicorn on its own thread and loop, with a lag sampler on that loop."""
+
+    def __init__(self, app, port: int):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+        self.sampler = LoopLagSampler()
+        self._thread = threading.Thread(target=self._run, name="bench-uvicorn", daemon=True)
+
+    def _run(self) -> None:
+        async def serve():
+            self.sampler.start()
+            await self.server.serve()
+
+        asyncio.run(serve())
+
+    def start(self) -> None:
+        self._thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+async def run_load(app, args) -> Dict[str, Any]:
+    recorder = Recorder()
+    factory = RequestFactory(args.routes, args.distinct_queries)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_inflight))
+    server = None
+    if args.server == "uvicorn":
+        server = UvicornThread(app, args.port)
+        server.start()
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", limits=limits, timeout=args.timeout)
+        sampler = server.sampler
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=args.timeout)
+        sampler = LoopLagSampler()
+        sampler.start()
+
+    drive = open_loop if args.mode == "open" else closed_loop
+    try:
+        if args.warmup > 0:
+            await drive(client, recorder, factory, args, time.perf_counter() + args.warmup)
+        sampler.samples.clear()
+        recorder.measuring = True
+        started = time.perf_counter()
+        await drive(client, recorder, factory, args, started + args.duration)
+        elapsed = time.perf_counter() - started
+        recorder.measuring = False
+    finally:
+        await client.aclose()
+        if server is not None:
+            server.stop()
+        else:
+            await sampler.stop()
+
+    routes = {}
+    for route in args.routes:
+        latencies = recorder.latencies.get(route, [])
+        statuses = recorder.statuses.get(route, Counter())
+        ok = sum(n for status, n in statuses.items() if status.startswith("2"))
+        routes[route] = {
+            "requests": len(latencies),
+            "rps": round(len(latencies) / elapsed, 2),
+            "errors": len(latencies) - ok,
+            "statuses": dict(statuses),
+            **_percentiles(latencies),
+        }
+    everything = [v for values in recorder.latencies.values() for v in values]
+    return {
+        "total": {
+            "requests": len(everything),
+            "rps": round(len(everything) / elapsed, 2),
+            "errors": sum(r["errors"] for r in routes.values()),
+            "dropped": recorder.dropped,
+            "elapsed_s": round(elapsed, 2),
+            **_percentiles(everything),
+        },
+        "routes": routes,
+        "event_loop": sampler.summary(),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    # per-request access/timing logs would otherwise dominate the measurement
+    logging.getLogger().setLevel(args.log_level)
+    store = install_stubs(app, args)
+    report = asyncio.run(run_load(app, args))
+    report["config"] = {
+        key: value for key, value in vars(args).items() if key not in ("output",)
+    }
+    report["config"]["documents"] = sum(len(index.docs) for index in store.indices.values())
+    report["started_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--routes", nargs="+", choices=sorted(ROUTES), default=["search-insights", "search-query", "url-search", "searchDocument"])
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=int, default=16, help="closed loop: concurrent workers")
+    parser.add_argument("--rate", type=float, default=20.0, help="open loop: requests started per second")
+    parser.add_argument("--poisson", action="store_true", help="open loop: exponential inter-arrival times")
+    parser.add_argument("--max-inflight", type=int, default=256, help="open loop: drop arrivals beyond this many outstanding")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before the run")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request client timeout")
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--os-latency", type=float, default=0.02, help="seconds added to every OpenSearch request")
+    parser.add_argument("--os-jitter", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=1.5, help="seconds per Bedrock invoke_model")
+    parser.add_argument("--llm-jitter", type=float, default=0.5)
+    parser.add_argument("--llm-rpm", type=float, help="override llm_scheduler.requests_per_minute")
+    parser.add_argument("--llm-tpm", type=float, help="override llm_scheduler.tokens_per_minute")
+    parser.add_argument("--distinct-queries", type=int, default=64, help="distinct questions posted to LLM routes")
+    parser.add_argument("--no-cache", action="store_true", help="disable the search result cache")
+    parser.add_argument("--export", default="unique_docs.txt")
+    parser.add_argument("--replicate", type=int, default=20, help="copies of the export loaded into the fake index")
+    parser.add_argument("--log-level", default="WARNING", help="root log level during the run")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run(args)
+    total = report["total"]
+    print(f"{args.mode} loop via {args.server}: {total['requests']} requests in {total['elapsed_s']} s, "
+          f"{total['rps']} rps, {total['errors']} errors, {total['dropped']} dropped")
+    for route, stats in report["routes"].items():
+        print(f"{route:>16}: {stats['requests']:>6} req {stats['rps']:>8} rps  "
+              f"p50 {stats.get('ms_p50', '-')} p95 {stats.get('ms_p95', '-')} p99 {stats.get('ms_p99', '-')} ms  "
+              f"errors {stats['errors']} {stats['statuses']}")
+    lag = report["event_loop"]
+    print(f"event loop lag: p50 {lag.get('lag_ms_p50', '-')} p99 {lag.get('lag_ms_p99', '-')} max {lag.get('lag_ms_max', '-')} ms")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
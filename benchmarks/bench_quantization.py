@@ -0,0 +1,116 @@
+"""
+Memory and recall of int8 / PQ codes against float32 brute force.
+
+    python -m benchmarks.bench_quantization --rows 100000 --dim 1024 --pq-m 256 128
+
+Uses the same clustered synthetic corpus as bench_ivf (seeded from
+unique_docs.txt). For each codec it reports bytes per vector, the
+compression ratio, recall@k of the raw code scores and of the code
+scores re-ranked against float32, and scoring latency per query.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_ivf import _unit, synthetic_corpus
+from src.services.quantization import ProductQuantizationCodec, ScalarInt8Codec
+
+
+def _top(scores, k):
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _evaluate(name, codec, corpus, queries, truth, k, rerank):
+    started = time.perf_counter()
+    codes = codec.encode(corpus)
+    encode_s = time.perf_counter() - started
+    latencies, recalls, reranked = [], [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        scores = codec.scores(codes, query)
+        top = _top(scores, k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len(expected & set(top.tolist())) / k)
+        shortlist = _top(scores, k * rerank)
+        exact = shortlist[_top(corpus[shortlist] @ query, k)]
+        reranked.append(len(expected & set(exact.tolist())) / k)
+    bytes_per_vector = codes.nbytes / len(codes)
+    return {
+        "codec": name,
+        "bytes_per_vector": bytes_per_vector,
+        "compression": round(corpus.shape[1] * 4 / bytes_per_vector, 1),
+        "encode_s": round(encode_s, 2),
+        "recall_at_k": round(float(np.mean(recalls)), 4),
+        "recall_at_k_reranked": round(float(np.mean(reranked)), 4),
+        "ms_p50": round(float(np.median(latencies)), 3),
+        "ms_p95": round(float(np.percentile(latencies, 95)), 3),
+    }
+
+
+def run(args):
+    corpus = synthetic_corpus(args.rows, args.dim, args.clusters, spread=args.spread, export=args.export)
+    rng = np.random.default_rng(1)
+    picks = rng.integers(0, len(corpus), size=args.queries)
+    queries = _unit(corpus[picks] + rng.normal(scale=0.3 / np.sqrt(args.dim), size=(args.queries, args.dim)))
+
+    truth, exact_ms = [], []
+    for query in queries:
+        started = time.perf_counter()
+        top = _top(corpus @ query, args.k)
+        exact_ms.append((time.perf_counter() - started) * 1000)
+        truth.append(set(top.tolist()))
+
+    report = {
+        "rows": args.rows,
+        "dim": args.dim,
+        "k": args.k,
+        "rerank": args.rerank,
+        "float32_bytes_per_vector": args.dim * 4,
+        "float32_ms_p50": round(float(np.median(exact_ms)), 3),
+        "codecs": [],
+    }
+    report["codecs"].append(
+        _evaluate("int8", ScalarInt8Codec().fit(corpus), corpus, queries, truth, args.k, args.rerank)
+    )
+    for m in args.pq_m:
+        started = time.perf_counter()
+        codec = ProductQuantizationCodec(m=m).fit(corpus, iterations=args.iterations)
+        result = _evaluate(f"pq{m}", codec, corpus, queries, truth, args.k, args.rerank)
+        result["train_s"] = round(time.perf_counter() - started - result["encode_s"], 2)
+        report["codecs"].append(result)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--spread", type=float, default=1.0, help="noise norm relative to cluster centres")
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[256, 128], help="PQ sub-vectors (bytes per vector)")
+    parser.add_argument("--iterations", type=int, default=10, help="k-means iterations per PQ subspace")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=4, help="shortlist k * rerank codes for float32 re-scoring")
+    parser.add_argument("--export", default="unique_docs.txt", help="chunk export used to seed cluster centres")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"{report['rows']} x {report['dim']}, k={report['k']}: float32 {report['float32_bytes_per_vector']} B/vector, "
+          f"brute force p50 {report['float32_ms_p50']}ms")
+    print(f"{'codec':>7} {'B/vec':>7} {'ratio':>6} {'recall':>8} {'reranked':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in report["codecs"]:
+        print(f"{row['codec']:>7} {row['bytes_per_vector']:>7.0f} {row['compression']:>6} {row['recall_at_k']:>8} "
+              f"{row['recall_at_k_reranked']:>9} {row['ms_p50']:>8} {row['ms_p95']:>8}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Decode + re-encode cost of a search response: stdlib path vs orjson path.
+
+    python -m benchmarks.bench_serializer --hits 1000
+
+"stdlib" is what a search route did before: opensearch-py's JSONSerializer
+decodes the raw response, FastAPI runs jsonable_encoder over it and
+JSONResponse renders it with json.dumps. "fast" is FastJSONSerializer +
+FastJSONResponse returned directly from the route. Hits are built from
+the chunks in unique_docs.txt, repeated to the requested count, with or
+without their 1024-dim vectors.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from opensearchpy.serializer import JSONSerializer
+
+from CommonService.utils.fastjson import HAVE_ORJSON, FastJSONSerializer
+from src.core.responses import FastJSONResponse
+from src.services.local_knn import VECTOR_FIELD, iter_chunks
+
+
+def build_response(export, hits, vectors=True):
+    docs = list(iter_chunks(export))
+    if not vectors:
+        docs = [{k: v for k, v in doc.items() if k != VECTOR_FIELD} for doc in docs]
+    return {
+        "took": 12,
+        "timed_out": False,
+        "hits": {
+            "total": {"value": hits, "relation": "eq"},
+            "hits": [
+                {"_index": "ei_articles_index", "_id": str(i), "_score": 1.0, "_source": docs[i % len(docs)]}
+                for i in range(hits)
+            ],
+        },
+    }
+
+
+def _stdlib(raw):
+    content = JSONSerializer().loads(raw)
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def _fast(raw):
+    content = FastJSONSerializer().loads(raw)
+    return FastJSONResponse(content).body
+
+
+def _time(fn, raw, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(raw)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"ms_p50": round(float(np.median(samples)), 2), "ms_p95": round(float(np.percentile(samples, 95)), 2)}
+
+
+def run(args):
+    raw = json.dumps(build_response(args.export, args.hits, vectors=not args.no_vectors))
+    if json.loads(_stdlib(raw)) != json.loads(_fast(raw)):
+        raise AssertionError("stdlib and fast paths rendered different documents")
+    report = {
+        "hits": args.hits,
+        "vectors": not args.no_vectors,
+        "payload_mb": round(len(raw.encode("utf-8")) / 1e6, 2),
+        "orjson": HAVE_ORJSON,
+        "stdlib": _time(_stdlib, raw, args.repeat),
+        "fast": _time(_fast, raw, args.repeat),
+    }
+    report["speedup_p50"] = round(report["stdlib"]["ms_p50"] / max(report["fast"]["ms_p50"], 1e-6), 1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=1000)
+    parser.add_argument("--no-vectors", action="store_true", help="drop chunk_vector from the hits")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--export", default="unique_docs.txt")
+    parser.add_argument("--output", help="write the report as JSON to this path")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"{report['hits']} hits, vectors={report['vectors']}, {report['payload_mb']} MB, orjson={report['orjson']}")
+    for name in ("stdlib", "fast"):
+        print(f"{name:>7}: p50 {report[name]['ms_p50']} ms, p95 {report[name]['ms_p95']} ms")
+    print(f"speedup (p50): {report['speedup_p50']}x")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
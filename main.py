@@ -1,21 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from CommonService.async_opensearch.config import OpenSearchSettings
 from CommonService.async_opensearch.service import dependency, lifespan_factory
+from CommonService.utils.credentials import shared_credentials
+from CommonService.utils.resilience import for_dependency
+from src.api.routes.metrics_route import metrics_router
 from src.api.routes.sample_route import sample_router
 from src.api.routes.search_docs_v1 import search_router
+from src.core.config_loader import close_shared_opensearch_client, opensearch_hedger, settings
+from src.core.metrics import monitor_runtime
+from src.db.compression_middleware import CompressionMiddleware
 from src.db.db_middleware import Opensearch_middleware
+from src.db.deadline_middleware import DeadlineMiddleware
+from src.logger.structured_logs import configure_logging
+
+configure_logging(
+    level=settings.get("logging.level", "INFO"),
+    log_file=settings.get("logging.file"),
+    max_message_chars=int(settings.get("logging.max_message_chars", 4096)),
+    debug_sample_rate=float(settings.get("logging.debug_sample_rate", 0.1)),
+    force=True,
+)
 
-app = FastAPI(title="Emerging Insights", lifespan=lifespan_factory(
+# one retry/circuit-breaker policy per dependency, shared by every client of it
+for dependency_name in ("opensearch", "bedrock", "bedrock-runtime"):
+    for_dependency(
+        dependency_name,
+        failure_threshold=int(settings.get("resilience.failure_threshold", 5)),
+        reset_timeout=float(settings.get("resilience.reset_timeout_seconds", 30)),
+        budget_ratio=float(settings.get("resilience.budget_ratio", 0.2)),
+        budget_min_per_second=float(settings.get("resilience.budget_min_per_second", 1)),
+        max_attempts=int(settings.get("resilience.max_attempts", 3)),
+        max_delay=float(settings.get("resilience.max_delay_seconds", 5)),
+    )
+
+opensearch_lifespan = lifespan_factory(
     settings=OpenSearchSettings(
         os_endpoint="tv9xe9sa7lpqtaqr5o9k.us-east-1.aoss.amazonaws.com",
         os_port=443,
         # profile_name="Comm-Prop-Sandbox",
         os_region="us-east-1",
-    )
-))
+        pool_maxsize=int(settings.get("opensearch.pool_maxsize", 10)),
+        keepalive_timeout=float(settings.get("opensearch.keepalive_timeout", 15)),
+    ),
+    hedger=opensearch_hedger,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    credentials = shared_credentials()
+    credentials.start()
+    async with opensearch_lifespan(app):
+        runtime_monitor = asyncio.create_task(monitor_runtime())
+        try:
+            yield
+        finally:
+            runtime_monitor.cancel()
+            await close_shared_opensearch_client()
+            credentials.stop()
+
+
+app = FastAPI(title="Emerging Insights", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,10 +75,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(Opensearch_middleware)
+if settings.get("deadline.enabled", True):
+    app.add_middleware(
+        DeadlineMiddleware,
+        default_seconds=float(settings.get("deadline.default_seconds", 29)),
+        max_seconds=float(settings.get("deadline.max_seconds", 120)),
+    )
+if settings.get("compression.enabled", True):
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(settings.get("compression.minimum_size", 1024)),
+        gzip_level=int(settings.get("compression.gzip_level", 5)),
+        brotli_quality=int(settings.get("compression.brotli_quality", 4)),
+        offload_min_bytes=int(settings.get("compression.offload_min_bytes", 256 * 1024)),
+    )
 
 
 app.include_router(sample_router)
 app.include_router(search_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     uvicorn.run(app=app, host="0.0.0.0", port=8098)
@@ -1,8 +1,12 @@
-import boto3
 import json
+import time
 from typing import Optional
+from botocore.config import Config
 from pydantic import BaseModel
+from CommonService.utils.credentials import CredentialProvider, shared_credentials
 from src.api.routes.logger import get_logger
+from src.core.config_loader import settings
+from src.core.metrics import BEDROCK_DURATION, BEDROCK_ERRORS, BEDROCK_TOKENS
 
 logger = get_logger(__name__)
 
@@ -12,19 +16,29 @@ class BedrockConfig(BaseModel):
     # PROFILE_NAME: Optional[str] = "Comm-Prop-Sandbox"
 
 class BedrockClient:
-    def __init__(self, config: BedrockConfig):
+    def __init__(self, config: BedrockConfig, credential_provider: Optional[CredentialProvider] = None):
         self.config = config
         
         try:
-            session = boto3.Session()
+            provider = credential_provider or shared_credentials()
             # session = boto3.Session(profile_name=config.PROFILE_NAME)
             # credentials = session.get_credentials().get_frozen_credentials()
             # credentials = session.get_credentials()
 
-            self.client = boto3.client(
+            # cached by the provider: every BedrockClient with this config shares one boto3 client
+            self.client = provider.client(
                 "bedrock-runtime",
                 region_name=config.AWS_REGION,
-                endpoint_url=config.ENDPOINT_URL
+                endpoint_url=config.ENDPOINT_URL,
+                # the LLM scheduler retries (and backs off on throttling) itself
+                config=Config(
+                    retries={"mode": "standard", "max_attempts": 1},
+                    # one long-lived client serves every concurrent request
+                    max_pool_connections=int(settings.get("aws_clients.max_pool_connections", 50)),
+                    # a threadpool call can't be cancelled; the socket timeouts end it near the request deadline
+                    connect_timeout=float(settings.get("aws_clients.connect_timeout_seconds", 5)),
+                    read_timeout=float(settings.get("aws_clients.read_timeout_seconds", settings.get("deadline.default_seconds", 29))),
+                ),
                 # aws_access_key_id=credentials.access_key,
                 # aws_secret_access_key=credentials.secret_key,
                 # aws_session_token=credentials.token,
@@ -36,6 +50,11 @@ class BedrockClient:
 
     def invoke_model(self, model_id: str, prompt: str, max_tokens: int = 5000, temperature: float = 0.0):
         """Invoke Bedrock model with proper message format for Claude"""
+        text, _ = self.invoke_with_usage(model_id, prompt, max_tokens=max_tokens, temperature=temperature)
+        return text
+
+    def invoke_with_usage(self, model_id: str, prompt: str, max_tokens: int = 5000, temperature: float = 0.0):
+        """`invoke_model` that also returns the total tokens Bedrock reported (None if it didn't)."""
         try:
             # Format for Claude 3.5 Sonnet
             body = {
@@ -50,6 +69,7 @@ class BedrockClient:
                 ]
             }
             
+            started = time.perf_counter()
             response = self.client.invoke_model(
                 modelId=model_id,
                 contentType="application/json",
@@ -58,9 +78,15 @@ class BedrockClient:
             )
             
             response_body = json.loads(response["body"].read().decode("utf-8"))
-            return response_body.get("content", [{}])[0].get("text", "")
+            BEDROCK_DURATION.observe(time.perf_counter() - started, model_id=model_id)
+            usage = response_body.get("usage", {})
+            BEDROCK_TOKENS.inc(usage.get("input_tokens", 0), model_id=model_id, direction="input")
+            BEDROCK_TOKENS.inc(usage.get("output_tokens", 0), model_id=model_id, direction="output")
+            used = usage.get("input_tokens", 0) + usage.get("output_tokens", 0) if usage else None
+            return response_body.get("content", [{}])[0].get("text", ""), used
             
         except Exception as e:
+            BEDROCK_ERRORS.inc(model_id=model_id)
             logger.error(f"Error invoking model {model_id}: {e}")
             raise
 
@@ -1,16 +1,4 @@
 # src/logger.py
-import logging
-
-def get_logger(name: str):
-    logger = logging.getLogger(name)
-    if not logger.handlers:
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        handler.setFormatter(formatter)
-        logger.addHandler(handler)
-        logger.setLevel(logging.INFO)
-        logger.propagate = False
-    return logger
+from src.logger.structured_logs import get_logger
 
+__all__ = ["get_logger"]
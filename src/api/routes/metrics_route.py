@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from src.core.metrics import REGISTRY
+
+metrics_router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(content=REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -4,9 +4,15 @@ from src.api.routes.bedrock_client import BedrockClient, BedrockConfig
 from src.api.routes.logger import get_logger
 from src.api.routes.concern_risk_misc_naics import concerns_events, emerging_risks, misc_topics, naics_data
 from src.api.routes.settings import BEDROCK_MODEL
+from src.core.timing import stage
+from src.services.dsl_validator import DSLValidator, InvalidQuery, recent_first_query, schema_index
+from src.services.filter_rewrite import register_fields
+from src.services.llm_scheduler import INTERACTIVE, LLMRejected, llm_scheduler
 
 logger = get_logger(__name__)
 
+QUERY_MAX_TOKENS = 2000
+
 # ------------------ OPENSEARCH SCHEMA ------------------
 
 OPENSEARCH_SCHEMA = """ 
@@ -546,6 +552,12 @@ Query: "Show articles with wildfire for last 3 days"
 
 # ------------------ QUERY GENERATOR CLASS ------------------
 
+# generated queries are checked against the same field list the prompt shows the model
+dsl_validator = DSLValidator.from_schema(OPENSEARCH_SCHEMA)
+# lets the search layer tell keyword term filters (movable to filter context) from scored text ones
+register_fields(schema_index(OPENSEARCH_SCHEMA), dsl_validator.fields)
+
+
 class OpenSearchQueryGenerator:
     def __init__(self):
         self.bedrock = BedrockClient(BedrockConfig())
@@ -598,28 +610,53 @@ class OpenSearchQueryGenerator:
     #         return self._default_query()
 
 
-    def generate_query(self, user_query: str) -> dict:
-      """Generate an OpenSearch query DSL body from a natural language query."""
+    async def generate_query(self, user_query: str, priority: int = INTERACTIVE, deadline: float = None) -> dict:
+      """Generate an OpenSearch query DSL body from a natural language query.
+
+      The Bedrock call is admitted by the LLM scheduler; its LLMRejected
+      errors (queue full, no capacity before `deadline`) propagate to the
+      caller instead of degrading to match_all.
+      """
       try:
           embedding_model_id = "amazon.titan-embed-text-v2:0"
-          schema = self._prepare_schema()
-          prompt = QUERY_GENERATION_PROMPT.format(schema=schema, query=user_query)
-          prompt = prompt.replace("embedding_model_id", embedding_model_id)
-
-          response_text = self.bedrock.invoke_model(
-              model_id=self.model_id,
-              prompt=prompt,
-              max_tokens=2000,
-              temperature=0.0
+          with stage("prompt_build"):
+              schema = self._prepare_schema()
+              prompt = QUERY_GENERATION_PROMPT.format(schema=schema, query=user_query)
+              prompt = prompt.replace("embedding_model_id", embedding_model_id)
+
+          def invoke():
+              with stage("bedrock_llm"):
+                  return self.bedrock.invoke_with_usage(
+                      model_id=self.model_id,
+                      prompt=prompt,
+                      max_tokens=QUERY_MAX_TOKENS,
+                      temperature=0.0
+                  )
+
+          response_text = await llm_scheduler.submit(
+              invoke,
+              estimated_tokens=llm_scheduler.estimate_tokens(prompt, QUERY_MAX_TOKENS),
+              priority=priority,
+              deadline=deadline,
           )
 
           logger.info(f"LLM Response (first 500 chars): {response_text[:500]}...")
-          query_body = self._extract_json(response_text)
+          with stage("llm_parse"):
+              query_body = self._extract_json(response_text)
 
           if not query_body or ("query" not in query_body and "knn" not in query_body):
               logger.warning(f"Invalid query generated, using match_all. Response: {response_text[:200]}")
               return self._default_query()
 
+          with stage("dsl_validate"):
+              try:
+                  query_body, repairs = dsl_validator.validate(query_body)
+              except InvalidQuery as e:
+                  logger.warning(f"Generated query rejected ({e}), using match_all.")
+                  return self._default_query()
+          if repairs:
+              logger.info(f"Repaired generated query: {'; '.join(repairs)}")
+
           if "knn" in query_body:
               logger.info("Generated vector similarity (semantic) search query.")
           else:
@@ -628,6 +665,8 @@ class OpenSearchQueryGenerator:
           logger.info(f"Query body: {json.dumps(query_body, indent=2)}")
           return query_body
 
+      except LLMRejected:
+          raise
       except Exception as e:
           logger.error(f"Error generating OpenSearch query: {e}", exc_info=True)
           return self._default_query()
@@ -706,8 +745,8 @@ class OpenSearchQueryGenerator:
         return {}
 
     def _default_query(self) -> dict:
-        """Return a fallback match_all query."""
-        return {"query": {"match_all": {}}}
+        """Return the fallback: match_all bounded to the newest articles."""
+        return recent_first_query(dsl_validator.recent_size)
 
 
 
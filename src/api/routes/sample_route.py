@@ -1,14 +1,28 @@
 import json
-from fastapi import APIRouter, Depends, Request
+import logging
+import math
+import threading
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
 from opensearchpy import AsyncOpenSearch
+from starlette.concurrency import run_in_threadpool
 
 from src.core.config_loader import get_opensearch_client
 from src.logger.console_logs import Loggercheck
+from src.logger.structured_logs import summarize_payload
 from CommonService.async_opensearch.service import dependency, lifespan_factory
+from CommonService.utils.singleflight import SingleFlight
 from ...utils.utils import merge_with_overlap
 from src.api.routes.query_generator import OpenSearchQueryGenerator
 # from src.aconcern_risk_misc_naics import concerns_events, emerging_risks, misc_topics, naics_data
 from src.api.routes.search_opensearch import search_documents, get_unique_docs
+from src.core.metrics import track_opensearch
+from src.core.responses import FastJSONResponse
+from src.core.timing import stage
+from src.services.llm_scheduler import LLMRejected
+from src.services.passthrough import PASSTHROUGH_ENABLED, passthrough_response, raw_get_mapping, raw_search
+from src.services.search_cache import cached_search, search_cache
 
 logger_instance = Loggercheck(__name__)
 logger = logger_instance.get_logger()
@@ -25,7 +39,10 @@ async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(depend
         "info",
     )
     try:
-        res = await client.indices.get_mapping(index=index)
+        if PASSTHROUGH_ENABLED:
+            return await passthrough_response(request, await raw_get_mapping(client, index))
+        with track_opensearch(index, "get_mapping"):
+            res = await client.indices.get_mapping(index=index)
         return res
     except Exception as e:
         logger_instance.logg_message(
@@ -35,16 +52,20 @@ async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(depend
 
         return {"error": str(e)}
     
-@sample_router.get("/doc-search")
+@sample_router.get("/doc-search", response_class=FastJSONResponse)
 async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(dependency())):
     session = request.state.session
     try:
         # res = await client.indices.get_mapping(index=index)
-        response = await client.search(body={
-                        "query": {"match_all": {}},
-                        "size": 1,
-                    }, index="ei_articles_index-05-nov-test")
-        return response
+        index = "ei_articles_index-05-nov-test"
+        body = {
+            "query": {"match_all": {}},
+            "size": 1,
+        }
+        if PASSTHROUGH_ENABLED:
+            return await passthrough_response(request, await raw_search(client, index, body))
+        response = await cached_search(client, index, body)
+        return FastJSONResponse(response)
     except Exception as e:
         logger_instance.logg_message(
             f"{session} - Error fetching the result - {e}",
@@ -54,7 +75,7 @@ async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(depend
         return {"error": str(e)}
 
 
-@sample_router.get("/url-search")
+@sample_router.get("/url-search", response_class=FastJSONResponse)
 async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(dependency())):
     session = request.state.session
     try:
@@ -69,13 +90,13 @@ async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(depend
                 }
             }
         }
-        response = await client.search(body=search_query, index="ei_articles_index")
+        response = await cached_search(client, "ei_articles_index", search_query)
         hits = response.get("hits", {}).get("hits", [])
         chunks = [hit["_source"]["Data"] for hit in hits if "_source" in hit and "Data" in hit["_source"]]
 
         # Merge all the chunks considering overlap of 150
         reconstructed_doc = merge_with_overlap(chunks, overlap=150)
-        return reconstructed_doc
+        return FastJSONResponse(reconstructed_doc)
 
     except Exception as e:
         logger_instance.logg_message(
@@ -86,6 +107,17 @@ async def get_indexes(request: Request, client: AsyncOpenSearch = Depends(depend
         return {"error": str(e)}
     
     
+@sample_router.post("/cache/invalidate")
+def invalidate_search_cache(request: Request, index: Optional[str] = None):
+    """Drop cached search results, e.g. after new articles were injected into `index`."""
+    removed = search_cache.invalidate(index)
+    logger_instance.logg_message(
+        f"{request.state.session} - Invalidated {removed} cached search results for index {index or '*'}",
+        "info",
+    )
+    return {"invalidated": removed, "index": index}
+
+
 @sample_router.get("/health")
 def health_check(request: Request):
     client = request.state.os_client
@@ -106,29 +138,69 @@ class Query(BaseModel):
     query: str
 
 
-@sample_router.post("/search-insights")
-def search_query(query: Query):
-    query_generator = OpenSearchQueryGenerator()
-    query_params = query_generator.generate_query(query)
-    print(query_params)
+# concurrent identical questions (e.g. a dashboard loading for many users) share one Bedrock call
+query_flight = SingleFlight()
+
+_generator: Optional[OpenSearchQueryGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def shared_generator() -> OpenSearchQueryGenerator:
+    """Process-wide query generator, so its Bedrock client and connection pool are built once."""
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = OpenSearchQueryGenerator()
+    return _generator
+
+
+async def generate_query_shared(query: Query) -> dict:
+    """Generate the DSL for `query`, collapsing concurrent identical questions.
+
+    The returned dict is shared between the collapsed callers; do not mutate it.
+    When the LLM scheduler sheds the call, answer 429/503 with Retry-After
+    rather than searching the whole index.
+    """
+    async def generate():
+        # the first call builds the boto3 client; keep that off the event loop
+        generator = await run_in_threadpool(shared_generator)
+        return await generator.generate_query(query)
+
+    try:
+        return await query_flight.do(query.query.strip(), generate)
+    except LLMRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+
+
+@sample_router.post("/search-insights", response_class=FastJSONResponse)
+async def search_query(query: Query):
+    query_params = await generate_query_shared(query)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Generated query params: {summarize_payload(query_params)}")
     index_name = "ei_articles_index-05-nov-test"
-    search_results = search_documents(index_name, query_params, size= 1000)
-    unique_docs = get_unique_docs(search_results)
+    # identical concurrent searches are collapsed by the result cache
+    search_results = await run_in_threadpool(search_documents, index_name, query_params, 1000)
+    with stage("unique_docs"):
+        unique_docs = get_unique_docs(search_results)
     # with open("unique_docs.txt", 'w', encoding='utf-8') as file:
     #     json.dump(unique_docs, file, indent=4, ensure_ascii=False)
     # print(search_results)
-    return {
+    return FastJSONResponse({
         "message": "User added successfully!",
         "user_query": query,
         "query_params": query_params,
         "results": unique_docs
-    }
+    })
 
 
 
-@sample_router.post("/search-query")
-def search_query(query: Query):
-    query_generator = OpenSearchQueryGenerator()
-    query_params = query_generator.generate_query(query)
-    return query_params
+@sample_router.post("/search-query", response_class=FastJSONResponse)
+async def search_query(query: Query):
+    query_params = await generate_query_shared(query)
+    return FastJSONResponse(query_params)
 
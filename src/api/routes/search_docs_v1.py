@@ -1,8 +1,13 @@
+import logging
+
 from fastapi import APIRouter, Depends, Request
 from opensearchpy import AsyncOpenSearch
 
 from src.core.config_loader import get_opensearch_client
+from src.core.responses import FastJSONResponse
+from src.services.search_cache import cached_search
 from src.logger.console_logs import Loggercheck
+from src.logger.structured_logs import summarize_payload
 from src.models.search_schemas import RequestModel
 from CommonService.async_opensearch.service import dependency, lifespan_factory
 
@@ -1582,21 +1587,19 @@ body1 = [
 ]
 
 
-@search_router.get("/searchDocument")
+@search_router.get("/searchDocument", response_class=FastJSONResponse)
 async def post_query(client: AsyncOpenSearch = Depends(dependency())):
     # if not request_data.question:
     #     raise MissingFieldException("question")
     # print("request_data", request_data)
     # mapped_input=
-    response = await client.search(body={
+    index = "ei_articles_index-05-nov-test"
+    response = await cached_search(client, index, {
         "query": {"match_all": {}},
         "size": 1,
-    }, index="ei_articles_index-05-nov-test")
-    logger_instance.logg_message(
-        f"Response from OpenSearch: {response}",
-        "info",
-    )
-    print("Response from OpenSearch:", response)
+    })
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Response from OpenSearch: {summarize_payload(response)}")
     results = [
         hit["_source"]
         for hit in response["responses"]
@@ -1604,6 +1607,6 @@ async def post_query(client: AsyncOpenSearch = Depends(dependency())):
         for hit in hit["hits"]["hits"]
     ]
 
-    return results
+    return FastJSONResponse(results)
 
 
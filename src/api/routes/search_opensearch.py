@@ -1,4 +1,5 @@
 import json
+import threading
 from opensearchpy import OpenSearch
 from typing import Dict, List, Any, Optional
 import boto3
@@ -6,9 +7,17 @@ from requests_aws4auth import AWS4Auth
 from opensearchpy import RequestsHttpConnection
 from pydantic import BaseModel, Field
 from typing import Literal
-# from src.api.routes.logger import get_logger
-
-# # logger = get_logger(__name__)
+from CommonService.utils.credentials import shared_credentials
+from CommonService.utils.fastjson import FastJSONSerializer
+from src.core.metrics import track_opensearch
+from src.core.timing import record_stage, stage
+from src.api.routes.logger import get_logger
+from src.core import config_loader
+from src.services.filter_rewrite import rewrite_filters
+from src.services.local_knn import LocalKnnIndex, extract_knn
+from src.services.search_cache import search_cache
+
+logger = get_logger(__name__)
 
 # # CONFIGURATION
 # class OpenSearchSettings(BaseModel):
@@ -117,6 +126,10 @@ class OpenSearchSettings(BaseModel):
     max_retries: int = Field(default=3)
     retry_on_timeout: bool = Field(default=True)
     http_compress: bool = Field(default=True)
+    pool_maxsize: int = Field(
+        default_factory=lambda: int(config_loader.settings.get("opensearch.pool_maxsize", 10)),
+        description="Connections kept per host; size it to the threadpool",
+    )
 
 
 # def build_client(settings: OpenSearchSettings) -> OpenSearch:
@@ -240,21 +253,44 @@ from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
 
 
 import boto3
-from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth
+from opensearchpy import OpenSearch, RequestsHttpConnection, AWSV4SignerAuth, Transport
+from CommonService.async_opensearch.client import deadline_params
+from CommonService.utils.resilience import for_dependency
+
+
+class ResilientTransport(Transport):
+    """Sync counterpart of CommonService's ResilientAsyncTransport (same "opensearch" policy)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.attempts = int(self.max_retries) + 1
+        self.max_retries = 0
+
+    def perform_request(self, method, url, headers=None, params=None, body=None):
+        parent = super().perform_request
+        return for_dependency("opensearch").call_sync(
+            lambda: parent(method, url, headers=headers, params=deadline_params(params, self.kwargs.get("timeout")), body=body),
+            max_attempts=self.attempts,
+        )
+
+
+class TimedJSONSerializer(FastJSONSerializer):
+    """orjson-backed serializer that records response decode time as its own stage."""
+
+    def loads(self, s):
+        with stage("os_decode"):
+            return super().loads(s)
 
 
-def build_client(settings: OpenSearchSettings) -> OpenSearch:
+def build_client(settings: OpenSearchSettings, credentials=None) -> OpenSearch:
     """
     Create a synchronous OpenSearch client using SigV4 signing.
     Supports both Amazon OpenSearch Service ('es') and
     Amazon OpenSearch Serverless ('aoss').
     """
 
-    # Get AWS credentials (from environment, EC2 role, or profile)
-    session = boto3.Session()
-    credentials = session.get_credentials()
-    if not credentials:
-        raise RuntimeError("No AWS credentials found for OpenSearch connection.")
+    # Shared, background-refreshed AWS credentials (environment, EC2 role, or profile)
+    credentials = credentials or shared_credentials().credentials()
 
     # Use AWSV4SignerAuth instead of http_auth
     auth = AWSV4SignerAuth(credentials, settings.os_region, settings.service)
@@ -270,11 +306,28 @@ def build_client(settings: OpenSearchSettings) -> OpenSearch:
         max_retries=settings.max_retries,
         retry_on_timeout=settings.retry_on_timeout,
         http_compress=settings.http_compress,
+        pool_maxsize=settings.pool_maxsize,
+        serializer=TimedJSONSerializer(),
+        transport_class=ResilientTransport,
     )
 
     return client
 
 
+_search_client: Optional[OpenSearch] = None
+_search_client_lock = threading.Lock()
+
+
+def get_search_client() -> OpenSearch:
+    """Long-lived client shared by all search_documents calls (its connection pool is thread-safe)."""
+    global _search_client
+    if _search_client is None:
+        with _search_client_lock:
+            if _search_client is None:
+                _search_client = build_client(OpenSearchSettings())
+    return _search_client
+
+
 
 
 def search_documents( index_name: str, query: Dict[str, Any], 
@@ -285,28 +338,70 @@ def search_documents( index_name: str, query: Dict[str, Any],
         Args:
             index_name: Name of the index
             query: OpenSearch query DSL
-            size: Number of results to return
+            size: Number of results to return; a size set in the query
+                itself wins (the URL parameter would override it)
         
         Returns:
             Search results
         """
-        settings = OpenSearchSettings()
-        client = build_client(settings)
+        if isinstance(query, dict) and isinstance(query.get("size"), int):
+            size = query["size"]
+        query = rewrite_filters(index_name, query)
+        return search_cache.get_or_load(
+            index_name, query, size, lambda: _execute_search(index_name, query, size)
+        )
+
+
+def _execute_search(index_name: str, query: Dict[str, Any], size: Optional[int]) -> Dict[str, Any]:
+        """Run the search against OpenSearch, bypassing the result cache."""
+        with stage("os_client"):
+            client = get_search_client()
         try:
-            print("DEBUG TYPE of client.search:", type(client.search))
-            response = client.search(
-                index=index_name,
-                body=query,
-                size=size
-            )
+            with stage("os_search"), track_opensearch(index_name, "search"):
+                response = client.search(
+                    index=index_name,
+                    body=query,
+                    size=size
+                )
+            # server-side time; os_search minus os_took is network + decode
+            record_stage("os_took", response.get("took", 0))
             # total_hits = response.get('hits', {}).get('total', {}).get('value', 0)
             return response
         
         except Exception as e:
-            print(f"✗ Error searching documents: {str(e)}")
+            logger.error(f"Error searching documents: {str(e)}")
+            fallback = _local_knn_fallback(query, size)
+            if fallback is not None:
+                return fallback
             return {"error": str(e)}
 
 
+_local_index = None
+
+
+def _local_knn_fallback(query: Dict[str, Any], size: Optional[int]) -> Optional[Dict[str, Any]]:
+        """Answer knn queries with an explicit vector from the local export when the cluster fails."""
+        global _local_index
+        path = config_loader.settings.get("local_knn.path")
+        if not path or not config_loader.settings.get("local_knn.fallback", False):
+            return None
+        extracted = extract_knn(query)
+        if extracted is None:
+            return None
+        vector, k, filters = extracted
+        try:
+            if _local_index is None:
+                _local_index = LocalKnnIndex.load(path)
+            with stage("local_knn"):
+                response = _local_index.search_response(vector, k=min(k, size or k), filters=filters)
+        except Exception as e:
+            logger.error(f"Local knn fallback failed: {str(e)}")
+            return None
+        logger.warning("Served search from the local knn fallback")
+        response["fallback"] = "local_knn"
+        return response
+
+
 def get_unique_docs(search_results):
     """Remove duplicate docs based on 'doc_id' but retain full search result structure."""
     if not search_results or "hits" not in search_results:
@@ -324,7 +419,7 @@ def get_unique_docs(search_results):
             seen_doc_ids.add(doc_id)
             unique_hits.append(hit)
 
-    print(f"Unique docs count: {len(unique_hits)}")
+    logger.debug(f"Unique docs count: {len(unique_hits)}")
 
     # ✅ Rebuild the full structure
     return {
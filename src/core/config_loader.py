@@ -1,10 +1,16 @@
 import os
+import threading
+from typing import Optional
 
-import boto3
 from dynaconf import Dynaconf
 from fastapi import Request
-from opensearchpy import AsyncHttpConnection, AsyncOpenSearch, AWSV4SignerAsyncAuth
+from opensearchpy import AsyncOpenSearch, AWSV4SignerAsyncAuth
 
+from CommonService.async_opensearch.client import PooledAsyncHttpConnection, ResilientAsyncTransport
+from CommonService.utils.credentials import shared_credentials
+from CommonService.utils.fastjson import FastJSONSerializer
+from CommonService.utils.hedging import Hedger
+from src.core.metrics import HEDGED_REQUESTS
 from src.logger.console_logs import Loggercheck
 
 logger_instance = Loggercheck(__name__)
@@ -26,38 +32,82 @@ def load_settings():
 settings = load_settings()
 
 
+def build_hedger() -> Optional[Hedger]:
+    """Tail-latency hedging for OpenSearch reads, or None when [hedging] is disabled."""
+    if not settings.get("hedging.enabled", True):
+        return None
+    return Hedger(
+        quantile=float(settings.get("hedging.quantile", 0.95)),
+        budget_ratio=float(settings.get("hedging.budget_ratio", 0.05)),
+        burst=float(settings.get("hedging.burst", 10)),
+        min_samples=int(settings.get("hedging.min_samples", 50)),
+        window=int(settings.get("hedging.window", 1000)),
+        min_delay=float(settings.get("hedging.min_delay_seconds", 0.02)),
+        max_delay=float(settings.get("hedging.max_delay_seconds", 2)),
+        on_event=lambda operation, outcome: HEDGED_REQUESTS.inc(operation=operation, outcome=outcome),
+    )
+
+
+# shared by every AsyncOpenSearch client of the process, so they learn one latency profile
+opensearch_hedger = build_hedger()
+
+
 def get_aws_auth():
-    session = boto3.Session()
     # if os.getenv("DYNACONF_ENV", "local") == "local":
     #     # session = boto3.Session(profile_name="Comm-Prop-Sandbox")
     #     session = boto3.Session()
     # else:
     #     session = boto3.Session()
-    credentials = session.get_credentials()
+    credentials = shared_credentials().credentials()
     return AWSV4SignerAsyncAuth(credentials, settings.aws_config.region, settings.aws_config.service)
 
 
 def opensearch_connection():
-    return AsyncOpenSearch(
+    client = AsyncOpenSearch(
         hosts=[{"host": settings.opensearch.host, "port": int(settings.opensearch.port)}],
         http_auth=get_aws_auth(),
         use_ssl=True,
         verify_certs=True,
-        connection_class=AsyncHttpConnection,
+        connection_class=PooledAsyncHttpConnection,
+        maxsize=int(settings.get("opensearch.pool_maxsize", 10)),
+        keepalive_timeout=float(settings.get("opensearch.keepalive_timeout", 15)),
+        serializer=FastJSONSerializer(),
+        transport_class=ResilientAsyncTransport,
     )
+    client.transport.hedger = opensearch_hedger
+    return client
+
+
+_shared_client: Optional[AsyncOpenSearch] = None
+_shared_client_lock = threading.Lock()
+
+
+def shared_opensearch_client() -> AsyncOpenSearch:
+    """Process-wide client for callers outside the app lifespan; created on first use."""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = opensearch_connection()
+    return _shared_client
+
+
+async def close_shared_opensearch_client() -> None:
+    global _shared_client
+    client, _shared_client = _shared_client, None
+    if client is not None:
+        await client.close()
 
 
 async def get_opensearch_client(request: Request):
-    opensearch = opensearch_connection()
+    """Hand out the pooled client owned by the app lifespan (app.state.OSCLIENT).
+
+    Falls back to the lazily created shared client when the app was started
+    without the lifespan. The client is never closed per request.
+    """
+    opensearch = getattr(request.app.state, "OSCLIENT", None) or shared_opensearch_client()
     try:
-        logger.info(f"{request.state.session} - Establishing connection to OpenSearch client.")
         yield opensearch
     except Exception as e:
-        logger.error(f"{request.state.session} - Error occurred while establishing OpenSearch client: {e}")
+        logger.error(f"{request.state.session} - Error occurred while using OpenSearch client: {e}")
         raise
-    finally:
-        try:
-            logger.info(f" {request.state.session} - Closing OpenSearch client connection.")
-            await opensearch.close()
-        except Exception as e:
-            logger.error(f"{request.state.session} - Error occurred while closing OpenSearch client: {e}")
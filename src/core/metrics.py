@@ -0,0 +1,269 @@
+"""
+In-process metrics registry rendered in the Prometheus text format.
+"""
+
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+import anyio.to_thread
+
+from CommonService.utils.resilience import add_state_listener
+
+# Latency buckets in seconds, tuned for a pipeline whose stages range from
+# sub-millisecond dict work to multi-second LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._series.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts (+Inf last), sum, count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self) -> Dict[Tuple[str, ...], dict]:
+        """Return cumulative bucket counts, sum and count for every label set."""
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        result = {}
+        for key, counts, total, count in items:
+            cumulative, running = [], 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                cumulative.append((bound, running))
+            result[key] = {"buckets": cumulative, "sum": total, "count": count}
+        return result
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in self.snapshot().items():
+            for bound, count in series["buckets"]:
+                le = 'le="{}"'.format(_format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+class Registry:
+    """Holds every metric so the /metrics endpoint can render them together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = REGISTRY.register(
+    Histogram("search_stage_duration_seconds", "Duration of individual request pipeline stages.", ("stage",))
+)
+HTTP_REQUESTS = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests served.", ("method", "route", "status"))
+)
+HTTP_REQUEST_DURATION = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+)
+OPENSEARCH_DURATION = REGISTRY.register(
+    Histogram("opensearch_request_duration_seconds", "OpenSearch call latency.", ("index", "operation"))
+)
+OPENSEARCH_ERRORS = REGISTRY.register(
+    Counter("opensearch_errors_total", "OpenSearch calls that raised.", ("index", "operation"))
+)
+BEDROCK_DURATION = REGISTRY.register(
+    Histogram("bedrock_request_duration_seconds", "Bedrock invoke_model latency.", ("model_id",))
+)
+BEDROCK_TOKENS = REGISTRY.register(
+    Counter("bedrock_tokens_total", "Bedrock tokens consumed.", ("model_id", "direction"))
+)
+BEDROCK_ERRORS = REGISTRY.register(
+    Counter("bedrock_errors_total", "Bedrock calls that raised.", ("model_id",))
+)
+LLM_QUEUE_WAIT = REGISTRY.register(
+    Histogram("llm_queue_wait_seconds", "Time LLM calls waited for rate-limit admission.", ("priority",))
+)
+LLM_QUEUE_DEPTH = REGISTRY.register(
+    Gauge("llm_queue_depth", "LLM calls waiting for admission.")
+)
+LLM_REJECTIONS = REGISTRY.register(
+    Counter("llm_rejections_total", "LLM calls refused or re-queued by the scheduler.", ("priority", "reason"))
+)
+CACHE_REQUESTS = REGISTRY.register(
+    Counter("cache_requests_total", "Cache lookups by outcome (hit/miss).", ("cache", "result"))
+)
+INGEST_CHUNKS = REGISTRY.register(
+    Counter("ingest_chunks_total", "Chunks processed by the ingestion pipeline, by outcome.", ("result",))
+)
+COMPRESSION_BYTES = REGISTRY.register(
+    Counter("http_compression_bytes_total", "Response bytes before (in) and after (out) compression.", ("encoding", "direction"))
+)
+EVENT_LOOP_LAG = REGISTRY.register(
+    Gauge("event_loop_lag_seconds", "Delay between a scheduled wake-up and the loop running it.")
+)
+THREADPOOL_BUSY = REGISTRY.register(
+    Gauge("threadpool_busy_threads", "Worker threads currently borrowed from the default pool.")
+)
+THREADPOOL_CAPACITY = REGISTRY.register(
+    Gauge("threadpool_capacity_threads", "Size of the default worker thread pool.")
+)
+CIRCUIT_STATE = REGISTRY.register(
+    Gauge("circuit_breaker_state", "Circuit state per dependency: 0 closed, 1 half-open, 2 open.", ("dependency",))
+)
+CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+REQUESTS_ABORTED = REGISTRY.register(
+    Counter("http_requests_aborted_total", "Requests cancelled before completing, by reason (deadline/disconnect).", ("reason",))
+)
+DSL_VALIDATIONS = REGISTRY.register(
+    Counter("dsl_validations_total", "Generated queries checked before execution: valid, repaired or rejected.", ("result",))
+)
+FILTER_REWRITES = REGISTRY.register(
+    Counter("query_filter_rewrites_total", "Query rewrites moving non-scoring predicates into bool.filter or knn.filter.", ("rewrite",))
+)
+HEDGED_REQUESTS = REGISTRY.register(
+    Counter("opensearch_hedged_requests_total", "Hedged OpenSearch reads: sent, won by the hedge, or skipped for budget.", ("operation", "outcome"))
+)
+
+
+@contextmanager
+def track_opensearch(index: str, operation: str):
+    """Time an OpenSearch call and count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        OPENSEARCH_ERRORS.inc(index=index, operation=operation)
+        raise
+    finally:
+        OPENSEARCH_DURATION.observe(time.perf_counter() - started, index=index, operation=operation)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_circuit_state(dependency: str, state: str) -> None:
+    CIRCUIT_STATE.set(CIRCUIT_STATES.get(state, 0), dependency=dependency)
+
+
+add_state_listener(record_circuit_state)
+
+
+async def monitor_runtime(interval: float = 1.0) -> None:
+    """Sample event-loop lag and threadpool occupancy until cancelled."""
+    loop = asyncio.get_running_loop()
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    while True:
+        scheduled = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.set(max(0.0, loop.time() - scheduled - interval))
+        THREADPOOL_BUSY.set(limiter.borrowed_tokens)
+        THREADPOOL_CAPACITY.set(limiter.total_tokens)
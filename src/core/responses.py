@@ -0,0 +1,29 @@
+"""
+Response classes for the search routes.
+
+Returning a `FastJSONResponse` instance from a route skips FastAPI's
+`jsonable_encoder` pass over the (large) search payload and renders it
+with orjson in one step. Objects orjson cannot encode natively (pydantic
+models, sets, ...) go through `jsonable_encoder` individually.
+"""
+
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from CommonService.utils.fastjson import dumps
+
+
+def _fallback(obj: Any) -> Any:
+    encoded = jsonable_encoder(obj)
+    if encoded is obj:
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+    return encoded
+
+
+class FastJSONResponse(JSONResponse):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, default=_fallback)
@@ -0,0 +1,83 @@
+"""
+Per-request stage timing.
+
+The middleware starts a RequestTimer for every request and binds it to a
+context variable, so code deep in the pipeline (query generation, OpenSearch
+calls, post-processing) can record spans without the request being threaded
+through every call. Spans end up in the Server-Timing response header, in a
+structured log line and in the stage duration histogram.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from src.core.metrics import STAGE_DURATION
+
+_current_timer: ContextVar[Optional["RequestTimer"]] = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    """Collects named stage durations for a single request."""
+
+    def __init__(self, session):
+        self.session = session
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def record(self, name: str, duration_ms: float) -> None:
+        self.spans.append((name, duration_ms))
+        STAGE_DURATION.observe(duration_ms / 1000.0, stage=name)
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000.0)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000.0
+
+    def server_timing(self) -> str:
+        """Render the spans as a Server-Timing header value."""
+        entries = [f"{name};dur={duration:.1f}" for name, duration in self.spans]
+        entries.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(entries)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Aggregate spans by name; repeated stages are summed."""
+        stages: Dict[str, float] = {}
+        for name, duration in self.spans:
+            stages[name] = round(stages.get(name, 0.0) + duration, 3)
+        return stages
+
+
+def start_request_timer(session) -> RequestTimer:
+    timer = RequestTimer(session)
+    _current_timer.set(timer)
+    return timer
+
+
+def current_timer() -> Optional[RequestTimer]:
+    return _current_timer.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block against the current request, if there is one."""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.span(name):
+        yield
+
+
+def record_stage(name: str, duration_ms: float) -> None:
+    """Record an externally measured duration (e.g. OpenSearch `took`)."""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.record(name, duration_ms)
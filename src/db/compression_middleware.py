@@ -0,0 +1,176 @@
+"""
+Content-encoding negotiation for responses.
+
+Pure ASGI middleware (no BaseHTTPMiddleware body buffering) that picks
+brotli or gzip from Accept-Encoding. Single-message bodies below
+`minimum_size` go out untouched; larger ones are compressed in one shot,
+in the threadpool when they exceed `offload_min_bytes`. Streaming bodies
+(more_body=True, e.g. NDJSON) are compressed chunk by chunk and flushed
+after each chunk so the client can decode every line as it arrives.
+Responses that already carry a Content-Encoding (the gzip'd passthrough
+routes) are left alone.
+"""
+
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.metrics import COMPRESSION_BYTES
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only without it
+    brotli = None
+
+HAVE_BROTLI = brotli is not None
+
+DEFAULT_MINIMUM_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 5
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_OFFLOAD_MIN_BYTES = 256 * 1024
+
+
+def _accepted_codings(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[name] = q
+    return codings
+
+
+def negotiate_encoding(accept_encoding: str, allow_brotli: bool = HAVE_BROTLI) -> Optional[str]:
+    """Best supported coding the client accepts ("br", "gzip") or None."""
+    codings = _accepted_codings(accept_encoding)
+    supported = ("br", "gzip") if allow_brotli else ("gzip",)
+    best, best_q = None, 0.0
+    for name in supported:
+        q = codings.get(name, codings.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31: gzip container
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = DEFAULT_MINIMUM_SIZE,
+        gzip_level: int = DEFAULT_GZIP_LEVEL,
+        brotli_quality: int = DEFAULT_BROTLI_QUALITY,
+        offload_min_bytes: int = DEFAULT_OFFLOAD_MIN_BYTES,
+        allow_brotli: bool = HAVE_BROTLI,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.offload_min_bytes = offload_min_bytes
+        self.allow_brotli = allow_brotli and HAVE_BROTLI
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.allow_brotli)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self._start: Optional[Message] = None
+        # None until the first body message decides: True compress, False pass through
+        self._active: Optional[bool] = None
+        self._compressor: Optional[_Compressor] = None
+
+    async def _run(self, compressor: _Compressor, body: bytes, final: bool) -> bytes:
+        if len(body) >= self.middleware.offload_min_bytes:
+            return await run_in_threadpool(compressor.compress, body, final)
+        return compressor.compress(body, final)
+
+    def _new_compressor(self) -> _Compressor:
+        return _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+
+    def _encoded_headers(self, content_length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = MutableHeaders(raw=list(self._start["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        return headers.raw
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._active is None:
+            headers = Headers(raw=self._start["headers"])
+            self._active = "content-encoding" not in headers and (more_body or len(body) >= self.middleware.minimum_size)
+            if not self._active:
+                await self._send(self._start)
+                await self._send(message)
+                return
+            self._compressor = self._new_compressor()
+            compressed = await self._run(self._compressor, body, final=not more_body)
+            COMPRESSION_BYTES.inc(len(body), encoding=self.encoding, direction="in")
+            COMPRESSION_BYTES.inc(len(compressed), encoding=self.encoding, direction="out")
+            await self._send({**self._start, "headers": self._encoded_headers(None if more_body else len(compressed))})
+            await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        if not self._active:
+            await self._send(message)
+            return
+
+        compressed = await self._run(self._compressor, body, final=not more_body)
+        COMPRESSION_BYTES.inc(len(body), encoding=self.encoding, direction="in")
+        COMPRESSION_BYTES.inc(len(compressed), encoding=self.encoding, direction="out")
+        await self._send({"type": "http.response.body", "body": compressed, "more_body": more_body})
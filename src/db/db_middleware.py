@@ -1,10 +1,16 @@
+import json
+import math
 import uuid
 
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.responses import JSONResponse, Response
 
+from CommonService.utils.deadline import DeadlineExpired
+from CommonService.utils.resilience import CircuitOpenError
 from src.core.config_loader import settings
+from src.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+from src.core.timing import start_request_timer
 from src.logger.console_logs import Loggercheck
 
 logger_instance = Loggercheck(__name__)
@@ -15,9 +21,21 @@ logger = logger_instance.get_logger()
 class Opensearch_middleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
         request.state.session = uuid.uuid4()
+        request.state.timer = start_request_timer(request.state.session)
         # request.state.index1 = settings.opensearch.index1
         try:
             response = await call_next(request)
+        except DeadlineExpired as ex:
+            logger_instance.logg_message(f"{request.state.session} - {ex}", "info")
+            response = JSONResponse(status_code=504, content={"message": str(ex)})
+        except CircuitOpenError as ex:
+            # the dependency is failing fast; tell the caller when it will be probed again
+            logger_instance.logg_message(f"{request.state.session} - {ex}", "info")
+            response = JSONResponse(
+                status_code=503,
+                content={"message": str(ex)},
+                headers={"Retry-After": str(max(1, math.ceil(ex.retry_after)))},
+            )
         except Exception as ex:
             logger_instance.logg_message(
                 f"{request.state.session} - Here is the error {ex}",
@@ -25,4 +43,24 @@ class Opensearch_middleware(BaseHTTPMiddleware):
             )
             response = JSONResponse(status_code=500, content={"message": "error connecting to db"})
 
+        timer = request.state.timer
+        response.headers["Server-Timing"] = timer.server_timing()
+        # label by route template, not raw path, to keep series cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        HTTP_REQUESTS.inc(method=request.method, route=route, status=str(response.status_code))
+        HTTP_REQUEST_DURATION.observe(timer.total_ms() / 1000.0, method=request.method, route=route)
+        logger_instance.logg_message(
+            json.dumps(
+                {
+                    "event": "request_timing",
+                    "session": str(request.state.session),
+                    "method": request.method,
+                    "path": request.url.path,
+                    "status": response.status_code,
+                    "total_ms": round(timer.total_ms(), 3),
+                    "stages": timer.as_dict(),
+                }
+            ),
+            "info",
+        )
         return response
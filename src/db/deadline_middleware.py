@@ -0,0 +1,147 @@
+"""
+Per-request deadline and cancellation.
+
+Pure ASGI middleware that gives every HTTP request a time budget
+(`default_seconds`, or the caller's `X-Request-Timeout` in seconds, up
+to `max_seconds`) and binds it as the request deadline in
+CommonService.utils.deadline. Clients further down read it to bound their
+own timeouts: OpenSearch requests get a request_timeout capped to the
+time left, retries are not scheduled past it, and the LLM scheduler won't
+start a generation that can't begin before it.
+
+The handler runs as a task. It is cancelled when the budget runs out,
+which answers 504 if no response has started yet, or when the client
+disconnects before the response completes. Cancellation reaches the
+pending OpenSearch/Bedrock awaits, so abandoned requests stop queueing
+LLM calls and searches. Work that already moved to the threadpool (a
+boto3 call, a sync OpenSearch search) runs to its own capped timeout,
+but its result is discarded.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from CommonService.utils.deadline import deadline_scope
+from src.core.metrics import REQUESTS_ABORTED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_SECONDS = 29.0
+DEFAULT_MAX_BUDGET_SECONDS = 120.0
+TIMEOUT_HEADER = "x-request-timeout"
+
+
+def request_budget(headers: Headers, default: float, maximum: float) -> float:
+    """Seconds this request may run: the caller's X-Request-Timeout (capped at `maximum`), else `default`."""
+    value = headers.get(TIMEOUT_HEADER)
+    try:
+        requested = float(value) if value is not None else None
+    except ValueError:
+        requested = None
+    if requested is None or requested <= 0:
+        return default
+    return min(requested, maximum)
+
+
+class DeadlineMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        default_seconds: float = DEFAULT_BUDGET_SECONDS,
+        max_seconds: float = DEFAULT_MAX_BUDGET_SECONDS,
+    ) -> None:
+        self.app = app
+        self.default_seconds = default_seconds
+        self.max_seconds = max_seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        budget = request_budget(Headers(scope=scope), self.default_seconds, self.max_seconds)
+        with deadline_scope(budget):
+            await _RequestRun(self.app, scope, receive, send).run(budget)
+
+
+class _RequestRun:
+    """One request: its handler task, a receive pump that notices disconnects, and the response state."""
+
+    def __init__(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send):
+        self.app = app
+        self.scope = scope
+        self._receive = receive
+        self._send = send
+        # maxsize=1 keeps request bodies flowing at the handler's pace
+        self._messages: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=1)
+        self.disconnected = asyncio.Event()
+        self.response_started = False
+        self.response_complete = False
+
+    async def _pump(self) -> None:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected.set()
+            await self._messages.put(message)
+            if self.disconnected.is_set():
+                return
+
+    async def receive(self) -> Message:
+        if self.disconnected.is_set() and self._messages.empty():
+            return {"type": "http.disconnect"}
+        return await self._messages.get()
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.response_started = True
+        elif message["type"] == "http.response.body" and not message.get("more_body", False):
+            self.response_complete = True
+        await self._send(message)
+
+    async def run(self, budget: float) -> None:
+        handler = asyncio.ensure_future(self.app(self.scope, self.receive, self.send))
+        pump = asyncio.ensure_future(self._pump())
+        disconnect = asyncio.ensure_future(self.disconnected.wait())
+        try:
+            loop = asyncio.get_running_loop()
+            expires = loop.time() + budget
+            reason: Optional[str] = None
+            while reason is None:
+                done, _ = await asyncio.wait(
+                    {handler, disconnect}, timeout=max(0.0, expires - loop.time()), return_when=asyncio.FIRST_COMPLETED
+                )
+                if handler in done:
+                    handler.result()
+                    return
+                if disconnect in done:
+                    if self.response_complete:
+                        # the usual disconnect after a finished response; let background work finish
+                        await handler
+                        return
+                    reason = "disconnect"
+                elif not done:
+                    reason = "deadline"
+            handler.cancel()
+            await asyncio.gather(handler, return_exceptions=True)
+            REQUESTS_ABORTED.inc(reason=reason)
+            logger.warning(f"{self.scope.get('method')} {self.scope.get('path')} cancelled: {reason} after a {budget:.1f}s budget")
+            if reason == "deadline" and not self.response_started:
+                await self._send_timeout(budget)
+        finally:
+            for task in (handler, pump, disconnect):
+                if not task.done():
+                    task.cancel()
+
+    async def _send_timeout(self, budget: float) -> None:
+        body = json.dumps({"message": f"request exceeded its {budget:g}s deadline"}).encode()
+        await self._send({
+            "type": "http.response.start",
+            "status": 504,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await self._send({"type": "http.response.body", "body": body})
@@ -1,28 +1,20 @@
-import logging
+from src.logger.structured_logs import get_logger
 
 
 class Loggercheck:
 
-    _instance = None
+    _instances = {}
 
     def __new__(cls, name: str):
-        if cls._instance is None:
-            cls._instance = super(Loggercheck, cls).__new__(cls)
-            cls._instance._initialize(name)
-        return cls._instance
+        # one instance per module name, so records carry the module that logged them
+        if name not in cls._instances:
+            instance = super(Loggercheck, cls).__new__(cls)
+            instance._initialize(name)
+            cls._instances[name] = instance
+        return cls._instances[name]
 
     def _initialize(self, name: str):
-        self.log = logging.getLogger(name)
-        self.log.setLevel(logging.DEBUG)
-
-        self.console_handler = logging.StreamHandler()
-        self.console_handler.setLevel(logging.DEBUG)
-
-        self.formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-        self.console_handler.setFormatter(self.formatter)
-
-        if not self.log.hasHandlers():
-            self.log.addHandler(self.console_handler)
+        self.log = get_logger(name)
 
     def get_logger(self):
         return self.log
@@ -0,0 +1,154 @@
+"""
+Queue-based structured logging.
+
+Every logger in the service hands records to a QueueHandler on the root
+logger; a QueueListener thread formats them as JSON lines and does the
+actual console/file I/O, so request handlers never block on a write.
+Messages are truncated to a size cap before they are enqueued and DEBUG
+records are sampled, which keeps large OpenSearch/LLM payloads cheap.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+DEFAULT_MAX_MESSAGE_CHARS = 4096
+DEFAULT_DEBUG_SAMPLE_RATE = 0.1
+
+# Attributes present on every LogRecord; anything else came in via `extra=`.
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["CappedQueueHandler"] = None
+
+
+def truncate(text: str, limit: int = DEFAULT_MAX_MESSAGE_CHARS) -> str:
+    """Cap a string at `limit` characters, noting how much was dropped."""
+    if limit <= 0 or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+def summarize_payload(payload: Any, limit: int = DEFAULT_MAX_MESSAGE_CHARS) -> str:
+    """Serialize a response/body for logging, capped at `limit` characters."""
+    if isinstance(payload, (bytes, bytearray)):
+        return truncate(payload[: limit + 1].decode("utf-8", "replace"), limit)
+    if isinstance(payload, str):
+        return truncate(payload, limit)
+    try:
+        text = json.dumps(payload, default=str, ensure_ascii=False)
+    except (TypeError, ValueError):
+        text = repr(payload)
+    return truncate(text, limit)
+
+
+class DebugSampler(logging.Filter):
+    """Let through only a fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class CappedQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that renders and size-caps the message in the caller, nothing more."""
+
+    def __init__(self, log_queue, max_message_chars: int):
+        super().__init__(log_queue)
+        self.max_message_chars = max_message_chars
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = truncate(record.getMessage(), self.max_message_chars)
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields are emitted as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging(
+    level: str = "INFO",
+    log_file: Optional[str] = None,
+    max_message_chars: int = DEFAULT_MAX_MESSAGE_CHARS,
+    debug_sample_rate: float = DEFAULT_DEBUG_SAMPLE_RATE,
+    force: bool = False,
+) -> None:
+    """Install the queue handler on the root logger and start the writer thread.
+
+    Safe to call repeatedly; without `force` an existing setup is kept.
+    """
+    global _listener, _queue_handler
+    if _listener is not None and not force:
+        return
+    shutdown_logging()
+
+    formatter = JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        handlers.append(logging.handlers.TimedRotatingFileHandler(log_file, when="midnight", backupCount=7, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = CappedQueueHandler(log_queue, max_message_chars)
+    _queue_handler.addFilter(DebugSampler(debug_sample_rate))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+
+def shutdown_logging() -> None:
+    """Detach the queue handler and flush everything still queued."""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Per-module logger that writes through the shared queue."""
+    configure_logging()
+    return logging.getLogger(name)
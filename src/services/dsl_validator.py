@@ -0,0 +1,394 @@
+"""
+Local validation and repair of LLM-generated OpenSearch DSL.
+
+`DSLValidator.validate` checks a query body against the index's field
+list (parsed from the schema text the prompt is built from) before it is
+sent, so a bad query costs microseconds here instead of a round trip and
+a 400 from the cluster. It never mutates its input: the generated dict
+is shared between single-flight callers, so the result is a copy.
+
+Repairs (reported back as short notes):
+- field names that only differ in case from a schema field are corrected
+- `knn` placed under `filter` is moved to `must` (under `must_not` it
+  would invert the query, so that is rejected)
+- `term`/`terms` on analyzed text fields become `match` queries
+- knn `k`/`num_candidates`, `size` and `from` are clamped
+- sorts on fields that can't be sorted, and unknown top-level keys, are dropped
+- `match_all` becomes a bounded, newest-first query (`recent_first_query`)
+
+Anything else wrong (unknown fields, type mismatches, wrong vector
+dimensions, unsupported clause types) raises `InvalidQuery`. Moving
+non-scoring predicates into filter context is left to the search layer
+(`filter_rewrite`), which does it for every query.
+"""
+
+import copy
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config_loader import settings
+from src.core.metrics import DSL_VALIDATIONS
+
+TEXT = "text"
+KEYWORD = "keyword"
+BOOLEAN = "boolean"
+NUMERIC_TYPES = {"long", "integer", "short", "byte", "double", "float"}
+VECTOR = "knn_vector"
+
+FIELD_CLAUSES = {"term", "terms", "range", "match", "match_phrase", "prefix", "wildcard"}
+ALLOWED_TOP_LEVEL = {"query", "knn", "size", "from", "sort", "_source", "track_total_hits", "min_score", "highlight", "aggs", "aggregations"}
+MAX_RESULT_WINDOW = 10000
+CLAUSE_OPTIONS = ("boost", "_name")
+
+_INDEX_LINE = re.compile(r"^Index Name:\s*(\S+)", re.MULTILINE)
+_FIELD_LINE = re.compile(r"^-\s+(\w+)\s+\((\w+)(?:,\s*(\d+)-dim)?")
+_SUB_FIELD = re.compile(r"(\w+)\s+\((\w+)\)")
+
+
+class InvalidQuery(ValueError):
+    """The query can't be repaired; `errors` lists what is wrong with it."""
+
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+def parse_schema_fields(schema: str) -> Tuple[Dict[str, str], Dict[str, int]]:
+    """({field: type}, {vector field: dimensions}) from the "- name (type)" lines of the prompt schema."""
+    fields: Dict[str, str] = {}
+    dimensions: Dict[str, int] = {}
+    for line in schema.splitlines():
+        match = _FIELD_LINE.match(line.strip())
+        if not match:
+            continue
+        name, kind, dims = match.groups()
+        if name in fields:
+            # later sections ("Vector Fields") describe fields already mapped
+            continue
+        fields[name] = kind
+        if dims:
+            dimensions[name] = int(dims)
+        if kind == "object" and "{" in line:
+            for sub_name, sub_kind in _SUB_FIELD.findall(line[line.index("{"):]):
+                fields[f"{name}.{sub_name}"] = sub_kind
+    return fields, dimensions
+
+
+def schema_index(schema: str) -> Optional[str]:
+    """The index named by the schema's "Index Name:" line."""
+    match = _INDEX_LINE.search(schema)
+    return match.group(1) if match else None
+
+
+def recent_first_query(size: int) -> Dict[str, Any]:
+    """The bounded stand-in for match_all: the newest `size` chunks (doc_id is a creation timestamp)."""
+    return {
+        "query": {"match_all": {}},
+        "sort": [{"doc_id": {"order": "desc"}}],
+        "size": size,
+        "track_total_hits": False,
+    }
+
+
+def _listed(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _single(clause: Any, kind: str) -> Tuple[str, Any]:
+    if not isinstance(clause, dict) or len(clause) != 1:
+        raise InvalidQuery([f"[{kind}] must name exactly one field"])
+    return next(iter(clause.items()))
+
+
+class DSLValidator:
+    def __init__(
+        self,
+        fields: Dict[str, str],
+        dimensions: Optional[Dict[str, int]] = None,
+        max_k: int = 100,
+        max_num_candidates: int = 1000,
+        max_size: int = 1000,
+        recent_size: int = 100,
+    ):
+        self.fields = fields
+        self.dimensions = dimensions or {}
+        self.max_k = max_k
+        self.max_num_candidates = max_num_candidates
+        self.max_size = max_size
+        self.recent_size = recent_size
+        self._by_lower = {}
+        for name in fields:
+            self._by_lower.setdefault(name.lower(), []).append(name)
+
+    @classmethod
+    def from_schema(cls, schema: str) -> "DSLValidator":
+        fields, dimensions = parse_schema_fields(schema)
+        return cls(
+            fields,
+            dimensions,
+            max_k=int(settings.get("dsl.max_k", 100)),
+            max_num_candidates=int(settings.get("dsl.max_num_candidates", 1000)),
+            max_size=int(settings.get("dsl.max_size", 1000)),
+            recent_size=int(settings.get("dsl.recent_size", 100)),
+        )
+
+    def validate(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """A repaired copy of `body` and the repairs made; raises InvalidQuery if it can't be fixed."""
+        run = _Run(self)
+        try:
+            result = run.body(body)
+        except InvalidQuery as e:
+            DSL_VALIDATIONS.inc(result="rejected")
+            raise InvalidQuery(run.errors + e.errors) from None
+        if run.errors:
+            DSL_VALIDATIONS.inc(result="rejected")
+            raise InvalidQuery(run.errors)
+        DSL_VALIDATIONS.inc(result="repaired" if run.repairs else "valid")
+        return result, run.repairs
+
+
+class _Run:
+    """State of one validate() call: collected errors and repairs."""
+
+    def __init__(self, validator: DSLValidator):
+        self.v = validator
+        self.errors: List[str] = []
+        self.repairs: List[str] = []
+
+    # -- fields -----------------------------------------------------------
+
+    def lookup(self, name: str) -> Tuple[str, Optional[str]]:
+        """(schema field name, its type) for `name`, tolerating case slips; type None if unknown."""
+        kind = self.v.fields.get(name)
+        if kind is not None:
+            return name, kind
+        base, _, sub = name.partition(".")
+        if sub == "keyword" and self.v.fields.get(base) == TEXT:
+            return name, KEYWORD
+        candidates = self.v._by_lower.get(name.lower(), [])
+        if len(candidates) == 1:
+            return candidates[0], self.v.fields[candidates[0]]
+        return name, None
+
+    def field(self, name: Any) -> Tuple[str, Optional[str]]:
+        """`lookup` that records the repair, or an error for unknown fields."""
+        if not isinstance(name, str):
+            self.errors.append(f"field name {name!r} is not a string")
+            return str(name), None
+        field, kind = self.lookup(name)
+        if kind is None:
+            self.errors.append(f"unknown field [{name}]")
+        elif field != name:
+            self.repairs.append(f"field {name} -> {field}")
+        return field, kind
+
+    def check_value(self, field: str, kind: Optional[str], value: Any) -> None:
+        if kind in NUMERIC_TYPES:
+            try:
+                float(value)
+            except (TypeError, ValueError):
+                self.errors.append(f"[{field}] is {kind}, got {value!r}")
+        elif kind == BOOLEAN and value not in (True, False, "true", "false"):
+            self.errors.append(f"[{field}] is boolean, got {value!r}")
+        elif kind == VECTOR:
+            self.errors.append(f"[{field}] is a vector field; use knn")
+
+    # -- top level ----------------------------------------------------------
+
+    def body(self, body: Any) -> Dict[str, Any]:
+        if not isinstance(body, dict):
+            raise InvalidQuery(["query body must be a JSON object"])
+        result: Dict[str, Any] = {}
+        for key, value in body.items():
+            if key not in ALLOWED_TOP_LEVEL:
+                self.repairs.append(f"dropped top-level [{key}]")
+                continue
+            result[key] = copy.deepcopy(value)
+
+        if "query" in result:
+            result["query"] = self.query(result["query"])
+        if "knn" in result:
+            result["knn"] = self.knn(result["knn"])
+        if "query" not in result and "knn" not in result:
+            raise InvalidQuery(["query body has neither [query] nor [knn]"])
+        if "size" in result:
+            result["size"] = self.size(result["size"])
+        if result.get("query") == {"match_all": {}} and "knn" not in result:
+            self.repairs.append("match_all -> recent-first")
+            result.update(recent_first_query(min(self.v.recent_size, result.get("size", self.v.recent_size))))
+        if "from" in result:
+            result["from"] = self.offset(result["from"], result.get("size", 10))
+        if "sort" in result:
+            result["sort"] = self.sort(result["sort"])
+            if not result["sort"]:
+                del result["sort"]
+        return result
+
+    def size(self, value: Any) -> int:
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            self.errors.append(f"[size] must be an integer, got {value!r}")
+            return 0
+        clamped = max(0, min(size, self.v.max_size))
+        if clamped != size:
+            self.repairs.append(f"size {size} -> {clamped}")
+        return clamped
+
+    def offset(self, value: Any, size: int) -> int:
+        try:
+            offset = int(value)
+        except (TypeError, ValueError):
+            self.errors.append(f"[from] must be an integer, got {value!r}")
+            return 0
+        clamped = max(0, min(offset, MAX_RESULT_WINDOW - size))
+        if clamped != offset:
+            self.repairs.append(f"from {offset} -> {clamped}")
+        return clamped
+
+    def sort(self, value: Any) -> List[Any]:
+        kept = []
+        for entry in _listed(value):
+            name = next(iter(entry), None) if isinstance(entry, dict) else entry
+            if name in ("_score", "_doc"):
+                kept.append(entry)
+                continue
+            field, kind = self.lookup(name) if isinstance(name, str) else (name, None)
+            if kind is None or kind in (TEXT, VECTOR, "object"):
+                # unknown or text fields fail the whole search at the cluster
+                self.repairs.append(f"dropped sort on [{name}]")
+                continue
+            kept.append({field: entry[name]} if isinstance(entry, dict) else field)
+        return kept
+
+    # -- queries ------------------------------------------------------------
+
+    def query(self, query: Any) -> Dict[str, Any]:
+        if not isinstance(query, dict) or len(query) != 1:
+            raise InvalidQuery(["each query clause must be an object with exactly one key"])
+        kind, clause = next(iter(query.items()))
+        if kind in ("match_all", "match_none", "ids"):
+            return {kind: clause}
+        if kind == "bool":
+            return {"bool": self.bool(clause)}
+        if kind == "knn":
+            return {"knn": self.knn(clause)}
+        if kind == "exists":
+            field, _ = self.field(clause.get("field") if isinstance(clause, dict) else None)
+            return {"exists": {**clause, "field": field}}
+        if kind == "multi_match":
+            fields = []
+            for name in _listed(clause.get("fields")):
+                bare, caret, boost = name.partition("^")
+                field, _ = self.field(bare)
+                fields.append(field + caret + boost)
+            return {"multi_match": {**clause, "fields": fields} if fields else clause}
+        if kind in FIELD_CLAUSES:
+            return self.field_clause(kind, clause)
+        raise InvalidQuery([f"unsupported query clause [{kind}]"])
+
+    def field_clause(self, kind: str, clause: Any) -> Dict[str, Any]:
+        # terms takes boost/_name next to the field; term (like match) inside the field's object
+        options: Dict[str, Any] = {}
+        if kind == "terms" and isinstance(clause, dict):
+            options = {key: clause[key] for key in CLAUSE_OPTIONS if key in clause}
+            clause = {key: value for key, value in clause.items() if key not in CLAUSE_OPTIONS}
+        name, spec = _single(clause, kind)
+        field, field_type = self.field(name)
+        if kind in ("term", "terms") and field_type == TEXT:
+            # exact terms never match analyzed text; match does what was meant
+            if kind == "term" and isinstance(spec, dict):
+                options = {key: spec[key] for key in CLAUSE_OPTIONS if key in spec}
+                values = [spec.get("value")]
+            else:
+                values = _listed(spec)
+            self.repairs.append(f"{kind} on text field [{field}] -> match")
+            if len(values) == 1:
+                return {"match": {field: {"query": values[0], **options} if options else values[0]}}
+            return {"bool": {"should": [{"match": {field: value}} for value in values], "minimum_should_match": 1, **options}}
+        if kind == "term":
+            self.check_value(field, field_type, spec.get("value") if isinstance(spec, dict) else spec)
+        elif kind == "terms":
+            if not isinstance(spec, list):
+                self.errors.append(f"[terms] on [{field}] expects a list")
+            else:
+                for value in spec:
+                    self.check_value(field, field_type, value)
+        elif kind == "range":
+            if field_type in (BOOLEAN, VECTOR):
+                self.errors.append(f"[range] on {field_type} field [{field}]")
+            elif not isinstance(spec, dict) or not set(spec) & {"gt", "gte", "lt", "lte"}:
+                self.errors.append(f"[range] on [{field}] needs gt/gte/lt/lte")
+            elif field_type in NUMERIC_TYPES:
+                for bound in ("gt", "gte", "lt", "lte"):
+                    if bound in spec:
+                        self.check_value(field, field_type, spec[bound])
+        elif field_type == VECTOR:
+            self.errors.append(f"[{kind}] on vector field [{field}]; use knn")
+        return {kind: {field: spec, **options}}
+
+    def bool(self, clause: Any) -> Dict[str, Any]:
+        if not isinstance(clause, dict):
+            raise InvalidQuery(["[bool] must be an object"])
+        result = {key: value for key, value in clause.items() if key not in ("must", "filter", "should", "must_not")}
+        occurs = {occur: [self.query(sub) for sub in _listed(clause.get(occur))] for occur in ("must", "filter", "should", "must_not")}
+
+        knns = [sub for sub in occurs["filter"] if "knn" in sub]
+        if knns:
+            self.repairs.append("knn under bool.filter -> bool.must")
+            occurs["filter"] = [sub for sub in occurs["filter"] if "knn" not in sub]
+            occurs["must"].extend(knns)
+        if any("knn" in sub for sub in occurs["must_not"]):
+            # "not near X" can't be expressed with knn; moving it would search for the opposite
+            self.errors.append("[knn] under bool.must_not is not supported")
+
+        for occur in ("must", "filter", "should", "must_not"):
+            if occurs[occur]:
+                result[occur] = occurs[occur]
+        return result
+
+    def knn(self, clause: Any) -> Dict[str, Any]:
+        """Both the `{"field": f, ...}` form the prompt uses and OpenSearch's `{f: {...}}`."""
+        if not isinstance(clause, dict):
+            raise InvalidQuery(["[knn] must be an object"])
+        flat = "field" in clause
+        name, spec = (clause["field"], clause) if flat else _single(clause, "knn")
+        if not isinstance(spec, dict):
+            raise InvalidQuery([f"[knn] on [{name}] must be an object"])
+        field, kind = self.field(name)
+        if kind is not None and kind != VECTOR:
+            self.errors.append(f"[knn] on {kind} field [{field}]")
+        spec = dict(spec)
+
+        vector = spec.get("vector", spec.get("query_vector"))
+        expected = self.v.dimensions.get(field)
+        if vector is not None and expected and len(vector) != expected:
+            self.errors.append(f"[knn] vector has {len(vector)} dims, [{field}] has {expected}")
+        if vector is None and "query_vector_builder" not in spec:
+            self.errors.append(f"[knn] on [{field}] has no vector or query_vector_builder")
+
+        k = self.bounded(spec, "k", 10, 1, self.v.max_k)
+        if "num_candidates" in spec:
+            self.bounded(spec, "num_candidates", k, k, max(k, self.v.max_num_candidates))
+        if spec.get("filter"):
+            spec["filter"] = self.query(spec["filter"])
+
+        if flat:
+            spec["field"] = field
+            return spec
+        return {field: spec}
+
+    def bounded(self, spec: Dict[str, Any], key: str, default: int, low: int, high: int) -> int:
+        try:
+            value = int(spec.get(key, default))
+        except (TypeError, ValueError):
+            self.errors.append(f"[knn] {key} must be an integer, got {spec.get(key)!r}")
+            return default
+        clamped = max(low, min(value, high))
+        if clamped != value:
+            self.repairs.append(f"knn {key} {value} -> {clamped}")
+        if key in spec or clamped != value:
+            spec[key] = clamped
+        return clamped
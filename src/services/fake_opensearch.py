@@ -0,0 +1,646 @@
+"""
+In-process OpenSearch stand-in for tests, load tests and benchmarks.
+
+`FakeOpenSearchStore` keeps documents per index in memory and answers the
+subset of the REST API the service uses: `_search`, `_msearch`, `_bulk`,
+`_doc`, `_mapping` and `_cluster/health`. Queries support match_all,
+term/terms, range (numbers and the index's date strings), bool, ids,
+exists, match/match_phrase/multi_match and knn (top-level or inside a
+query, with a filter). knn with an explicit vector is scored by cosine
+similarity; `query_vector_builder` goes through `embedder` when one is
+set and falls back to term overlap with `chunk_text` otherwise.
+
+The store is plugged into real opensearch-py clients as a connection
+class, so requests still go through the client's serializer, transport,
+retries and error mapping; only the network hop is replaced:
+
+    store = FakeOpenSearchStore(latency=0.02)
+    store.load(INDEX, iter_chunks("unique_docs.txt"))
+    client = fake_async_client(store)
+
+`latency` (seconds, or a callable of (method, path)) and `jitter` are
+slept on every request; `inject_failure(status, times)` makes the next
+requests fail with that HTTP status.
+"""
+
+import asyncio
+import fnmatch
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+from urllib.parse import unquote
+
+import numpy as np
+from dateutil import parser as date_parser
+from opensearchpy import AsyncOpenSearch, OpenSearch
+from opensearchpy._async.http_aiohttp import AsyncConnection
+from opensearchpy.connection.base import Connection
+
+from CommonService.utils.fastjson import FastJSONSerializer, dumps, loads
+from src.api.routes import search_opensearch
+from src.services.ingestion import chunk_doc_id
+from src.services.local_knn import MULTI_VALUE_FIELDS, VECTOR_FIELD
+
+Latency = Union[float, Callable[[str, str], float]]
+
+_TOKEN = re.compile(r"\w+")
+_DATE_MATH = re.compile(r"^now(?:([+-])(\d+)([smhdwMy]))?(?:/[smhdwMy])?$")
+_DATE_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days", "w": "weeks"}
+
+
+class QueryError(ValueError):
+    """A query the stand-in cannot evaluate; reported as a 400 like OpenSearch would."""
+
+
+def _tokens(text: Any) -> List[str]:
+    return _TOKEN.findall(str(text).lower()) if text is not None else []
+
+
+def _values(doc: Dict[str, Any], field: str) -> List[Any]:
+    value = doc
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return []
+        value = value[part]
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    if field in MULTI_VALUE_FIELDS and isinstance(value, str):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    return [value]
+
+
+def _same(stored: Any, wanted: Any) -> bool:
+    if isinstance(stored, bool) or isinstance(wanted, bool):
+        return str(stored).lower() == str(wanted).lower()
+    if isinstance(stored, (int, float)) and not isinstance(wanted, (list, dict)):
+        try:
+            return float(stored) == float(wanted)
+        except (TypeError, ValueError):
+            return False
+    return str(stored) == str(wanted)
+
+
+def _as_comparable(value: Any, now: datetime) -> Any:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    match = _DATE_MATH.match(text)
+    if match:
+        sign, amount, unit = match.groups()
+        if not unit:
+            return now
+        amount = int(amount) * (1 if sign == "+" else -1)
+        if unit in ("M", "y"):
+            return now + timedelta(days=amount * (30 if unit == "M" else 365))
+        return now + timedelta(**{_DATE_UNITS[unit]: amount})
+    try:
+        # the index stores times like "2025-11-05 03:19:40 EST"
+        return date_parser.parse(text, ignoretz=True)
+    except (ValueError, OverflowError):
+        return text
+
+
+def _in_range(stored: Any, bounds: Dict[str, Any], now: datetime) -> bool:
+    value = _as_comparable(stored, now)
+    for op, bound in bounds.items():
+        if op not in ("gt", "gte", "lt", "lte"):
+            continue
+        bound = _as_comparable(bound, now)
+        try:
+            if op == "gt" and not value > bound:
+                return False
+            if op == "gte" and not value >= bound:
+                return False
+            if op == "lt" and not value < bound:
+                return False
+            if op == "lte" and not value <= bound:
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def _single_field(clause: Dict[str, Any], name: str) -> Tuple[str, Any]:
+    fields = [key for key in clause if key not in ("boost", "_name")]
+    if len(fields) != 1:
+        raise QueryError(f"[{name}] query expects exactly one field")
+    return fields[0], clause[fields[0]]
+
+
+class _Index:
+    def __init__(self) -> None:
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        self._vectors: Optional[Tuple[List[str], np.ndarray]] = None
+
+    def put(self, doc_id: str, source: Dict[str, Any]) -> bool:
+        created = doc_id not in self.docs
+        self.docs[doc_id] = source
+        self._vectors = None
+        return created
+
+    def delete(self, doc_id: str) -> bool:
+        self._vectors = None
+        return self.docs.pop(doc_id, None) is not None
+
+    def vectors(self, field: str) -> Tuple[List[str], np.ndarray]:
+        """Ids and unit-normalized vectors of the docs that have `field`, cached until the next write."""
+        if self._vectors is None:
+            ids = [doc_id for doc_id, doc in self.docs.items() if doc.get(field)]
+            if ids:
+                matrix = np.asarray([self.docs[doc_id][field] for doc_id in ids], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                matrix = matrix / norms
+            else:
+                matrix = np.zeros((0, 0), dtype=np.float32)
+            self._vectors = (ids, matrix)
+        return self._vectors
+
+
+class FakeOpenSearchStore:
+    def __init__(
+        self,
+        latency: Latency = 0.0,
+        jitter: float = 0.0,
+        embedder: Optional[Callable[[str], Sequence[float]]] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.embedder = embedder
+        self.indices: Dict[str, _Index] = {}
+        self.requests: List[Tuple[str, str]] = []
+        self._failures: List[int] = []
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+
+    # -- data -------------------------------------------------------------
+
+    def load(self, index: str, documents: Iterable[Dict[str, Any]]) -> int:
+        """Index `_source` dicts shaped like unique_docs.txt; ids follow the ingestion pipeline."""
+        count = 0
+        with self._lock:
+            target = self.indices.setdefault(index, _Index())
+            for document in documents:
+                source = document.get("_source", document)
+                doc_id = document.get("_id") or chunk_doc_id(source)
+                target.put(str(doc_id), source)
+                count += 1
+        return count
+
+    def inject_failure(self, status: int, times: int = 1) -> None:
+        """Fail the next `times` requests with HTTP `status`."""
+        with self._lock:
+            self._failures.extend([status] * times)
+
+    def delay(self, method: str, path: str) -> float:
+        base = self.latency(method, path) if callable(self.latency) else self.latency
+        if self.jitter:
+            base += self._random.uniform(0, self.jitter)
+        return max(0.0, base)
+
+    # -- REST dispatch ----------------------------------------------------
+
+    def handle(self, method: str, url: str, params: Optional[Dict[str, Any]], body: Any) -> Tuple[int, bytes]:
+        path, _, query_string = url.partition("?")
+        params = dict(params or {})
+        for pair in filter(None, query_string.split("&")):
+            key, _, value = pair.partition("=")
+            params.setdefault(unquote(key), unquote(value))
+        with self._lock:
+            self.requests.append((method, path))
+            if self._failures:
+                status = self._failures.pop(0)
+                return status, dumps({"error": {"type": "injected_failure", "reason": f"injected {status}"}, "status": status})
+        try:
+            status, response = self._route(method, [unquote(p) for p in path.strip("/").split("/") if p], params, body)
+        except QueryError as e:
+            status, response = 400, {"error": {"type": "parsing_exception", "reason": str(e)}, "status": 400}
+        return status, dumps(response)
+
+    def _route(self, method: str, parts: List[str], params: Dict[str, Any], body: Any) -> Tuple[int, Any]:
+        endpoint = next((p for p in parts if p.startswith("_")), None)
+        index = parts[0] if parts and not parts[0].startswith("_") else None
+        if endpoint == "_search":
+            return 200, self.search(index, self._json(body) or {}, params)
+        if endpoint == "_msearch":
+            return 200, self.msearch(index, self._lines(body))
+        if endpoint == "_bulk":
+            return 200, self.bulk(index, self._lines(body))
+        if endpoint == "_mapping":
+            return 200, self.mapping(index)
+        if parts[:2] == ["_cluster", "health"]:
+            return 200, {"status": "green", "number_of_nodes": 1}
+        if endpoint in ("_doc", "_source") and index and len(parts) == 3:
+            return self._document(method, index, parts[2], self._json(body), source_only=endpoint == "_source")
+        if method == "HEAD" and index and len(parts) == 1:
+            return (200 if index in self.indices else 404), {}
+        raise QueryError(f"unsupported endpoint {method} /{'/'.join(parts)}")
+
+    @staticmethod
+    def _json(body: Any) -> Any:
+        if body is None or isinstance(body, (dict, list)):
+            return body
+        return loads(body) if body else None
+
+    @staticmethod
+    def _lines(body: Any) -> List[Any]:
+        if isinstance(body, (list, tuple)):
+            return [FakeOpenSearchStore._json(line) for line in body]
+        if isinstance(body, bytes):
+            body = body.decode("utf-8")
+        return [loads(line) for line in (body or "").splitlines() if line.strip()]
+
+    def _targets(self, index: Optional[str]) -> List[Tuple[str, _Index]]:
+        if not index or index in ("_all", "*"):
+            return list(self.indices.items())
+        patterns = index.split(",")
+        return [(name, idx) for name, idx in self.indices.items() if any(fnmatch.fnmatchcase(name, p) for p in patterns)]
+
+    def _document(self, method: str, index: str, doc_id: str, body: Any, source_only: bool) -> Tuple[int, Any]:
+        with self._lock:
+            target = self.indices.setdefault(index, _Index()) if method in ("PUT", "POST") else self.indices.get(index)
+            if method in ("PUT", "POST"):
+                created = target.put(doc_id, body or {})
+                return (201 if created else 200), {"_index": index, "_id": doc_id, "result": "created" if created else "updated"}
+            if method == "DELETE":
+                found = target is not None and target.delete(doc_id)
+                return (200 if found else 404), {"_index": index, "_id": doc_id, "result": "deleted" if found else "not_found"}
+            source = target.docs.get(doc_id) if target else None
+        if source is None:
+            return 404, {"_index": index, "_id": doc_id, "found": False}
+        return 200, source if source_only else {"_index": index, "_id": doc_id, "found": True, "_source": source}
+
+    # -- APIs -------------------------------------------------------------
+
+    def search(self, index: Optional[str], body: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        params = params or {}
+        size = int(params.get("size", body.get("size", 10)))
+        offset = int(params.get("from", body.get("from", 0)))
+        now = datetime.now()
+        query = body.get("query")
+        with self._lock:
+            scored: List[Tuple[float, str, str, Dict[str, Any]]] = []
+            for name, target in self._targets(index):
+                if query is None:
+                    scores = self._knn(body["knn"], target, now) if "knn" in body else {k: 1.0 for k in target.docs}
+                else:
+                    scores = self._evaluate(query, target, now)
+                    if "knn" in body:
+                        # top-level knn next to `query` behaves like a bool.must of both
+                        knn_scores = self._knn(body["knn"], target, now)
+                        scores = {k: s + knn_scores[k] for k, s in scores.items() if k in knn_scores}
+                scored.extend((score, name, doc_id, target.docs[doc_id]) for doc_id, score in scores.items())
+        scored = self._sort(scored, body.get("sort"))
+        page = scored[offset:offset + size]
+        hits = []
+        for score, name, doc_id, source in page:
+            hit = {"_index": name, "_id": doc_id, "_score": score, "_source": self._filter_source(source, body.get("_source", True))}
+            if body.get("sort"):
+                hit["sort"] = [score if field == "_score" else next(iter(_values(source, field)), None)
+                               for field, _ in self._sort_specs(body["sort"])]
+            hits.append(hit)
+        return {
+            "took": int((time.perf_counter() - started) * 1000),
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {
+                "total": {"value": len(scored), "relation": "eq"},
+                "max_score": max((s for s, *_ in scored), default=None),
+                "hits": hits,
+            },
+        }
+
+    def msearch(self, index: Optional[str], lines: List[Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        responses = []
+        for header, body in zip(lines[0::2], lines[1::2]):
+            try:
+                responses.append({**self.search(header.get("index", index), body or {}), "status": 200})
+            except QueryError as e:
+                responses.append({"error": {"type": "parsing_exception", "reason": str(e)}, "status": 400})
+        return {"took": int((time.perf_counter() - started) * 1000), "responses": responses}
+
+    def bulk(self, index: Optional[str], lines: List[Any]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        items, errors, position = [], False, 0
+        with self._lock:
+            while position < len(lines):
+                action, meta = next(iter(lines[position].items()))
+                position += 1
+                name = meta.get("_index", index)
+                doc_id = meta.get("_id")
+                target = self.indices.setdefault(name, _Index())
+                if action == "delete":
+                    found = target.delete(str(doc_id))
+                    items.append({action: {"_index": name, "_id": doc_id, "status": 200 if found else 404,
+                                           "result": "deleted" if found else "not_found"}})
+                    continue
+                source = lines[position]
+                position += 1
+                if action == "update":
+                    current = target.docs.get(str(doc_id))
+                    if current is None and not source.get("doc_as_upsert"):
+                        errors = True
+                        items.append({action: {"_index": name, "_id": doc_id, "status": 404,
+                                               "error": {"type": "document_missing_exception"}}})
+                        continue
+                    target.put(str(doc_id), {**(current or {}), **source.get("doc", {})})
+                    items.append({action: {"_index": name, "_id": doc_id, "status": 200, "result": "updated"}})
+                    continue
+                if doc_id is None:
+                    doc_id = f"fake-{len(target.docs)}-{self._random.getrandbits(32):08x}"
+                if action == "create" and str(doc_id) in target.docs:
+                    errors = True
+                    items.append({action: {"_index": name, "_id": doc_id, "status": 409,
+                                           "error": {"type": "version_conflict_engine_exception"}}})
+                    continue
+                created = target.put(str(doc_id), source)
+                items.append({action: {"_index": name, "_id": doc_id, "status": 201 if created else 200,
+                                       "result": "created" if created else "updated"}})
+        return {"took": int((time.perf_counter() - started) * 1000), "errors": errors, "items": items}
+
+    def mapping(self, index: Optional[str]) -> Dict[str, Any]:
+        mappings = {}
+        with self._lock:
+            for name, target in self._targets(index):
+                properties: Dict[str, Any] = {}
+                for source in target.docs.values():
+                    for field, value in source.items():
+                        if field not in properties and value is not None:
+                            properties[field] = self._field_mapping(field, value)
+                mappings[name] = {"mappings": {"properties": properties}}
+        return mappings
+
+    @staticmethod
+    def _field_mapping(field: str, value: Any) -> Dict[str, Any]:
+        if field == VECTOR_FIELD and isinstance(value, list):
+            return {"type": "knn_vector", "dimension": len(value)}
+        if isinstance(value, bool):
+            return {"type": "boolean"}
+        if isinstance(value, int):
+            return {"type": "long"}
+        if isinstance(value, float):
+            return {"type": "float"}
+        if isinstance(value, dict):
+            return {"properties": {}}
+        return {"type": "keyword" if field in MULTI_VALUE_FIELDS or field in ("url", "region", "source", "tag") else "text"}
+
+    # -- query evaluation -------------------------------------------------
+
+    def _evaluate(self, query: Dict[str, Any], target: _Index, now: datetime) -> Dict[str, float]:
+        """Matching doc ids with their scores."""
+        if not isinstance(query, dict) or len(query) != 1:
+            raise QueryError("query must be an object with a single clause")
+        kind, clause = next(iter(query.items()))
+        docs = target.docs
+        if kind == "match_all":
+            return {doc_id: 1.0 for doc_id in docs}
+        if kind == "match_none":
+            return {}
+        if kind == "bool":
+            return self._bool(clause, target, now)
+        if kind == "knn":
+            return self._knn(clause, target, now)
+        if kind == "ids":
+            return {str(v): 1.0 for v in clause.get("values", []) if str(v) in docs}
+        if kind == "exists":
+            return {doc_id: 1.0 for doc_id, doc in docs.items() if _values(doc, clause["field"])}
+        if kind in ("term", "terms"):
+            field, wanted = _single_field(clause, kind)
+            if kind == "term":
+                wanted = [wanted.get("value") if isinstance(wanted, dict) else wanted]
+            elif not isinstance(wanted, list):
+                raise QueryError("[terms] query expects a list of values")
+            return {
+                doc_id: 1.0
+                for doc_id, doc in docs.items()
+                if any(_same(stored, w) for stored in _values(doc, field) for w in wanted)
+            }
+        if kind == "range":
+            field, bounds = _single_field(clause, kind)
+            return {doc_id: 1.0 for doc_id, doc in docs.items() if any(_in_range(v, bounds, now) for v in _values(doc, field))}
+        if kind in ("match", "match_phrase"):
+            field, wanted = _single_field(clause, kind)
+            text = wanted.get("query") if isinstance(wanted, dict) else wanted
+            return self._text(docs, [field], text, phrase=kind == "match_phrase")
+        if kind == "multi_match":
+            fields = [f.split("^")[0] for f in clause.get("fields", [])]
+            return self._text(docs, fields, clause.get("query", ""), phrase=clause.get("type") == "phrase")
+        raise QueryError(f"unsupported query [{kind}]")
+
+    def _bool(self, clause: Dict[str, Any], target: _Index, now: datetime) -> Dict[str, float]:
+        def listed(key: str) -> List[Dict[str, Any]]:
+            value = clause.get(key, [])
+            return value if isinstance(value, list) else [value]
+
+        must, filters, should, must_not = listed("must"), listed("filter"), listed("should"), listed("must_not")
+        scores = {doc_id: 0.0 for doc_id in target.docs}
+        for sub in must:
+            matched = self._evaluate(sub, target, now)
+            scores = {k: s + matched[k] for k, s in scores.items() if k in matched}
+        for sub in filters:
+            matched = self._evaluate(sub, target, now)
+            scores = {k: s for k, s in scores.items() if k in matched}
+        for sub in must_not:
+            matched = self._evaluate(sub, target, now)
+            scores = {k: s for k, s in scores.items() if k not in matched}
+        if should:
+            default = 0 if must or filters else 1
+            minimum = int(clause.get("minimum_should_match", default))
+            hits: Dict[str, int] = {}
+            for sub in should:
+                for doc_id, score in self._evaluate(sub, target, now).items():
+                    if doc_id in scores:
+                        scores[doc_id] += score
+                        hits[doc_id] = hits.get(doc_id, 0) + 1
+            scores = {k: s for k, s in scores.items() if hits.get(k, 0) >= minimum}
+        if not must and not should:
+            scores = {k: 1.0 for k in scores}
+        return scores
+
+    def _knn(self, clause: Dict[str, Any], target: _Index, now: datetime) -> Dict[str, float]:
+        if "field" not in clause:
+            field, clause = _single_field(clause, "knn")
+        else:
+            field = clause["field"]
+        k = int(clause.get("k", 10))
+        allowed = self._evaluate(clause["filter"], target, now) if clause.get("filter") else None
+        vector = clause.get("query_vector") or clause.get("vector")
+        if vector is None:
+            text = clause.get("query_vector_builder", {}).get("text_embedding", {}).get("model_text")
+            if text is None:
+                raise QueryError("[knn] requires a vector or a query_vector_builder")
+            if self.embedder is None:
+                # no model: rank by term overlap with the chunk text instead
+                scores = self._text(target.docs, ["chunk_text"], text, phrase=False)
+                if allowed is not None:
+                    scores = {d: s for d, s in scores.items() if d in allowed}
+                return dict(sorted(scores.items(), key=lambda item: -item[1])[:k])
+            vector = self.embedder(text)
+        ids, matrix = target.vectors(field)
+        if not ids:
+            return {}
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if matrix.shape[1] != query.shape[0]:
+            raise QueryError(f"[knn] query vector has {query.shape[0]} dims, field has {matrix.shape[1]}")
+        # cosinesimil space: score = (1 + cos) / 2
+        similarities = (1.0 + matrix @ (query / (norm or 1.0))) / 2.0
+        order = np.argsort(-similarities)
+        result: Dict[str, float] = {}
+        for row in order:
+            doc_id = ids[row]
+            if allowed is None or doc_id in allowed:
+                result[doc_id] = float(similarities[row])
+                if len(result) == k:
+                    break
+        return result
+
+    @staticmethod
+    def _text(docs: Dict[str, Dict[str, Any]], fields: List[str], text: Any, phrase: bool) -> Dict[str, float]:
+        wanted = _tokens(text)
+        if not wanted:
+            return {}
+        scores = {}
+        for doc_id, doc in docs.items():
+            score = 0.0
+            for field in fields:
+                for value in _values(doc, field):
+                    if phrase:
+                        score += float(" ".join(wanted) in " ".join(_tokens(value)))
+                    else:
+                        tokens = set(_tokens(value))
+                        score += sum(1.0 for token in wanted if token in tokens) / len(wanted)
+            if score > 0:
+                scores[doc_id] = score
+        return scores
+
+    # -- response shaping -------------------------------------------------
+
+    @staticmethod
+    def _sort_specs(sort: Any) -> List[Tuple[str, str]]:
+        specs = []
+        for item in sort if isinstance(sort, list) else [sort]:
+            if isinstance(item, str):
+                specs.append((item, "desc" if item == "_score" else "asc"))
+            else:
+                field, options = next(iter(item.items()))
+                order = options.get("order", "asc") if isinstance(options, dict) else options
+                specs.append((field, order))
+        return specs
+
+    @staticmethod
+    def _sort_value(source: Dict[str, Any], score: float, spec: Tuple[str, str]) -> Tuple[bool, Any]:
+        field = spec[0]
+        if field == "_score":
+            return False, score
+        values = _values(source, field)
+        if not values:
+            return True, None
+        return False, _as_comparable(values[0], datetime.now())
+
+    def _sort(self, scored: List[Tuple[float, str, str, Dict[str, Any]]], sort: Any) -> List[Tuple[float, str, str, Dict[str, Any]]]:
+        if not sort:
+            return sorted(scored, key=lambda item: -item[0])
+        # stable multi-key sort: apply keys from last to first; missing values go last
+        for spec in reversed(self._sort_specs(sort)):
+            present = [item for item in scored if not self._sort_value(item[3], item[0], spec)[0]]
+            missing = [item for item in scored if self._sort_value(item[3], item[0], spec)[0]]
+            present.sort(key=lambda item: self._sort_value(item[3], item[0], spec)[1], reverse=spec[1] == "desc")
+            scored = present + missing
+        return scored
+
+    @staticmethod
+    def _filter_source(source: Dict[str, Any], spec: Any) -> Optional[Dict[str, Any]]:
+        if spec is False:
+            return None
+        if spec is True or spec is None:
+            return source
+        includes = spec if isinstance(spec, list) else [spec] if isinstance(spec, str) else spec.get("includes", [])
+        excludes = [] if isinstance(spec, (list, str)) else spec.get("excludes", [])
+        return {
+            field: value
+            for field, value in source.items()
+            if (not includes or any(fnmatch.fnmatchcase(field, p) for p in includes))
+            and not any(fnmatch.fnmatchcase(field, p) for p in excludes)
+        }
+
+
+def _respond(connection, method, url, body, status, raw, started, ignore):
+    """Log and return (status, headers, text) like a real connection, raising on error statuses."""
+    text = raw.decode("utf-8")
+    duration = time.perf_counter() - started
+    if not (200 <= status < 300) and status not in ignore:
+        connection.log_request_fail(method, url, url, body, duration, status, text)
+        connection._raise_error(status, text, "application/json")
+    connection.log_request_success(method, url, url, body, status, text, duration)
+    return status, {"content-type": "application/json"}, text
+
+
+class FakeConnection(Connection):
+    """Synchronous connection answering from a FakeOpenSearchStore."""
+
+    def __init__(self, store: FakeOpenSearchStore = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        started = time.perf_counter()
+        delay = self.store.delay(method, url)
+        if delay:
+            time.sleep(delay)
+        status, raw = self.store.handle(method, url, params, body)
+        return _respond(self, method, url, body, status, raw, started, ignore)
+
+
+class AsyncFakeConnection(AsyncConnection):
+    """Async connection answering from a FakeOpenSearchStore; latency is an asyncio.sleep."""
+
+    def __init__(self, store: FakeOpenSearchStore = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    async def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        started = time.perf_counter()
+        delay = self.store.delay(method, url)
+        if delay:
+            await asyncio.sleep(delay)
+        status, raw = self.store.handle(method, url, params, body)
+        return _respond(self, method, url, body, status, raw, started, ignore)
+
+    async def close(self):
+        pass
+
+
+def fake_client(store: FakeOpenSearchStore, **kwargs) -> OpenSearch:
+    """Synchronous client (like `get_search_client()`) backed by `store`."""
+    kwargs.setdefault("serializer", search_opensearch.TimedJSONSerializer())
+    return OpenSearch(hosts=[{"host": "fake-opensearch"}], connection_class=FakeConnection, store=store, **kwargs)
+
+
+def fake_async_client(store: FakeOpenSearchStore, **kwargs) -> AsyncOpenSearch:
+    """Async client (like `app.state.OSCLIENT`) backed by `store`."""
+    kwargs.setdefault("serializer", FastJSONSerializer())
+    return AsyncOpenSearch(hosts=[{"host": "fake-opensearch"}], connection_class=AsyncFakeConnection, store=store, **kwargs)
+
+
+def install(app, store: FakeOpenSearchStore) -> Tuple[OpenSearch, AsyncOpenSearch]:
+    """Point the app's async client and the shared sync search client at `store`.
+
+    Call without running the app lifespan (which would build real AOSS clients).
+    """
+    sync_client, async_client = fake_client(store), fake_async_client(store)
+    search_opensearch._search_client = sync_client
+    app.state.OSCLIENT = async_client
+    return sync_client, async_client
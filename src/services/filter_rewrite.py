@@ -0,0 +1,188 @@
+"""
+Filter-context rewriting for OpenSearch query bodies.
+
+Predicates that score every match the same - term/terms on keyword,
+numeric, boolean and date fields, range, exists, ids - gain nothing from
+`bool.must`: they are scored document by document and skip the node
+query cache. `rewrite_filters` moves them into `bool.filter`; the hits and
+their order stay the same.
+
+Optionally, when a bool's only knn clause sits in `must` next to such
+filters, the filters are pushed into `knn.filter`, so the engine searches
+only the vectors that pass them instead of cutting down the top k
+afterwards. That changes the result set (up to k matching hits instead of
+whatever part of the top k passes), and indexes on the nmslib engine
+reject it with a 400, so it is off unless the index is listed in
+`filter_rewrite.knn_prefilter_indexes` (lucene/faiss mappings only).
+
+It runs in the search layer (`search_documents`, `cached_search`) before
+the cache key is taken, so LLM-generated and hand-written queries get the
+same pass. Field types are registered per index with `register_fields`;
+term clauses on fields with no known type are left where they are, since
+on a text field their score differs between documents.
+
+Moves happen only where the dropped score is the same constant for every
+hit: the top-level query and the `must` clauses under it, or anywhere
+below `filter`/`must_not`. Under `should` a clause's score decides which
+hits rank higher, so it stays, and a body with `min_score` keeps its
+scores as they are. The input is never mutated; unchanged subtrees are
+shared with the result.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config_loader import settings
+from src.core.metrics import FILTER_REWRITES
+from src.services.dsl_validator import KEYWORD, TEXT, VECTOR
+
+ENABLED = bool(settings.get("filter_rewrite.enabled", True))
+# indexes whose knn mapping uses an engine with efficient filtering (lucene or faiss)
+KNN_PREFILTER_INDEXES = set(settings.get("filter_rewrite.knn_prefilter_indexes", []))
+
+OCCURS = ("must", "filter", "should", "must_not")
+CONSTANT_SCORE_CLAUSES = {"range", "exists", "ids"}
+TERM_CLAUSES = {"term", "terms"}
+# a term on these scores by term frequency and field length
+SCORED_TYPES = {TEXT, VECTOR, "object"}
+
+# how the score of a clause is used where it sits
+SCORED = "scored"  # added to every hit alike
+OPTIONAL = "optional"  # decides which hits rank higher (under should)
+UNSCORED = "unscored"  # ignored (under filter/must_not)
+
+
+def _listed(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class FilterRewriter:
+    def __init__(self, fields: Optional[Dict[str, str]] = None, knn_prefilter: bool = False):
+        self.fields = fields or {}
+        self.knn_prefilter = knn_prefilter
+
+    def field_type(self, name: str) -> Optional[str]:
+        kind = self.fields.get(name)
+        if kind is None and name.endswith(".keyword") and self.fields.get(name[: -len(".keyword")]) == TEXT:
+            return KEYWORD
+        return kind
+
+    def non_scoring(self, query: Any) -> bool:
+        """True for a clause that gives every match the same score."""
+        if not isinstance(query, dict) or len(query) != 1:
+            return False
+        kind, clause = next(iter(query.items()))
+        if kind in CONSTANT_SCORE_CLAUSES:
+            return True
+        if kind not in TERM_CLAUSES or not isinstance(clause, dict):
+            return False
+        names = [name for name in clause if name not in ("boost", "_name")]
+        if len(names) != 1:
+            return False
+        kind = self.field_type(names[0])
+        return kind is not None and kind not in SCORED_TYPES
+
+    def rewrite(self, body: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """The rewritten body (`body` itself if nothing changed) and notes on what moved."""
+        query = body.get("query")
+        if not isinstance(query, dict):
+            return body, []
+        notes: List[str] = []
+        context = OPTIONAL if "min_score" in body else SCORED
+        rewritten = self._query(query, context, notes)
+        if context == SCORED and self.non_scoring(rewritten):
+            notes.append(f"{next(iter(rewritten))} -> bool.filter")
+            rewritten = {"bool": {"filter": [rewritten]}}
+        if rewritten is query:
+            return body, notes
+        return {**body, "query": rewritten}, notes
+
+    def _query(self, query: Any, context: str, notes: List[str]) -> Any:
+        if not isinstance(query, dict) or len(query) != 1:
+            return query
+        kind, clause = next(iter(query.items()))
+        if kind == "bool" and isinstance(clause, dict):
+            rewritten = self._bool(clause, context, notes)
+        elif kind == "knn" and isinstance(clause, dict):
+            rewritten = self._knn(clause, notes)
+        else:
+            return query
+        return query if rewritten is clause else {kind: rewritten}
+
+    def _bool(self, clause: Dict[str, Any], context: str, notes: List[str]) -> Dict[str, Any]:
+        below = {
+            "must": context,
+            "filter": UNSCORED,
+            "must_not": UNSCORED,
+            "should": UNSCORED if context == UNSCORED else OPTIONAL,
+        }
+        original = {occur: _listed(clause.get(occur)) for occur in OCCURS}
+        occurs = {occur: [self._query(sub, below[occur], notes) for sub in subs] for occur, subs in original.items()}
+        changed = any(new is not old for occur in OCCURS for new, old in zip(occurs[occur], original[occur]))
+
+        if context != OPTIONAL:
+            moved = [sub for sub in occurs["must"] if self.non_scoring(sub)]
+            if moved:
+                notes.append(f"{len(moved)} clause(s) bool.must -> bool.filter")
+                occurs["must"] = [sub for sub in occurs["must"] if not self.non_scoring(sub)]
+                occurs["filter"] = occurs["filter"] + moved
+                changed = True
+
+        knns = [i for i, sub in enumerate(occurs["must"]) if isinstance(sub, dict) and "knn" in sub]
+        if self.knn_prefilter and len(knns) == 1 and (occurs["filter"] or occurs["must_not"]) and not occurs["should"]:
+            notes.append("bool.filter -> knn.filter")
+            must = list(occurs["must"])
+            must[knns[0]] = {"knn": self._prefiltered(must[knns[0]]["knn"], occurs["filter"], occurs["must_not"])}
+            occurs.update(must=must, filter=[], must_not=[])
+            changed = True
+
+        if not changed:
+            return clause
+        rewritten = {key: value for key, value in clause.items() if key not in OCCURS}
+        for occur in OCCURS:
+            if occurs[occur]:
+                rewritten[occur] = occurs[occur]
+        return rewritten
+
+    def _knn(self, clause: Dict[str, Any], notes: List[str]) -> Dict[str, Any]:
+        """Rewrite inside `knn.filter`, for both the `{"field": f, ...}` and `{f: {...}}` forms."""
+        flat = "field" in clause
+        spec = clause if flat else next(iter(clause.values()), None)
+        if not isinstance(spec, dict) or not spec.get("filter"):
+            return clause
+        query = self._query(spec["filter"], UNSCORED, notes)
+        if query is spec["filter"]:
+            return clause
+        spec = {**spec, "filter": query}
+        return spec if flat else {next(iter(clause)): spec}
+
+    def _prefiltered(self, clause: Dict[str, Any], filters: List[Any], must_not: List[Any]) -> Dict[str, Any]:
+        flat = "field" in clause
+        spec = clause if flat else next(iter(clause.values()))
+        parts = _listed(spec.get("filter")) + filters
+        if len(parts) == 1 and not must_not:
+            combined = parts[0]
+        else:
+            combined = {"bool": {occur: subs for occur, subs in (("filter", parts), ("must_not", must_not)) if subs}}
+        spec = {**spec, "filter": combined}
+        return spec if flat else {next(iter(clause)): spec}
+
+
+_rewriters: Dict[str, FilterRewriter] = {}
+_untyped = FilterRewriter()
+
+
+def register_fields(index: str, fields: Dict[str, str]) -> None:
+    """Use `fields` ({name: type}) to decide which term clauses on `index` can move."""
+    _rewriters[index] = FilterRewriter(fields, knn_prefilter=index in KNN_PREFILTER_INDEXES)
+
+
+def rewrite_filters(index: str, body: Any) -> Any:
+    """`body` with its non-scoring predicates in filter context (the same object if nothing moved)."""
+    if not ENABLED or not isinstance(body, dict):
+        return body
+    rewritten, notes = _rewriters.get(index, _untyped).rewrite(body)
+    for note in notes:
+        FILTER_REWRITES.inc(rewrite="knn_prefilter" if note.endswith("knn.filter") else "filter")
+    return rewritten
@@ -0,0 +1,474 @@
+"""
+Streaming ingestion: articles -> chunks -> Titan embeddings -> `_bulk`.
+
+The stages run concurrently and are connected by bounded queues, so a
+slow stage (usually Bedrock) applies backpressure to the reader instead of
+letting chunks pile up in memory:
+
+    reader -> chunk queue -> embed workers -> doc queue -> batcher
+           -> bulk queue -> bulk workers (max_inflight concurrent _bulk calls)
+
+Bulk batches are bounded both by document count and by serialized bytes.
+Whole `_bulk` requests are retried by the client's transport (the shared
+"opensearch" resilience policy), so a failed request is final here;
+throttled items (HTTP 429 inside a successful response) are retried with
+jittered exponential backoff, and other item failures are counted and logged.
+Once a run has indexed anything, the search result cache for the index is
+invalidated: in this process, and in the API server through its
+`POST /v1/cache/invalidate` when `ingestion.cache_invalidate_url` is set.
+Without that URL a separate server process serves cached results for up to
+`search_cache.ttl_seconds` after the run.
+
+Every chunk is stored with `chunk_hash` (its text plus the embedding
+model). In incremental mode the stored chunks of each group of articles
+are fetched first: chunks whose hash is unchanged are not re-embedded
+(only their metadata is updated, if it differs), chunks whose vector is in
+the optional embedding cache skip Bedrock, and stored chunks that no
+longer exist in the article are flipped to `is_latest: false` in bulk.
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import urllib.parse
+import urllib.request
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Tuple
+
+from src.api.routes.logger import get_logger
+from src.core.config_loader import settings
+from src.core.metrics import INGEST_CHUNKS, track_opensearch
+from src.services.local_knn import VECTOR_FIELD
+from src.services.search_cache import search_cache
+
+logger = get_logger(__name__)
+
+DEFAULT_FIELDS = ("data",)
+EMBEDDING_DIMENSIONS = 1024
+RETRYABLE_STATUS = {429, 502, 503, 504}
+HASH_FIELD = "chunk_hash"
+CHUNK_FIELDS = {"field", "chunk_id", "chunk_text", HASH_FIELD, VECTOR_FIELD}
+LOOKUP_BATCH = 100
+# hits per page of the stored chunk lookup, paged with search_after
+LOOKUP_PAGE_SIZE = 10000
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+_DONE = object()
+
+
+def chunk_text(text: str, max_words: int = 200, overlap_sentences: int = 0) -> List[str]:
+    """Pack whole sentences into chunks of at most `max_words` words.
+
+    A sentence longer than `max_words` becomes its own chunk. With
+    `overlap_sentences`, each chunk repeats the last sentences of the
+    previous one.
+    """
+    sentences = [s for s in _SENTENCE_BOUNDARY.split(text or "") if s.strip()]
+    chunks: List[str] = []
+    current: List[Tuple[str, int]] = []
+    words = 0
+    for sentence in sentences:
+        count = len(sentence.split())
+        if current and words + count > max_words:
+            chunks.append(" ".join(s for s, _ in current))
+            current = current[-overlap_sentences:] if overlap_sentences else []
+            words = sum(n for _, n in current)
+        current.append((sentence, count))
+        words += count
+    if current:
+        chunks.append(" ".join(s for s, _ in current))
+    return chunks
+
+
+def chunk_article(
+    article: Dict[str, Any],
+    fields: Sequence[str] = DEFAULT_FIELDS,
+    max_words: int = 200,
+    overlap_sentences: int = 0,
+) -> List[Dict[str, Any]]:
+    """Split an article into chunk documents carrying the article metadata.
+
+    Documents that are already chunks (they have `chunk_text`, as in
+    unique_docs.txt) are passed through for re-embedding.
+    """
+    if article.get("chunk_text"):
+        return [{k: v for k, v in article.items() if k != VECTOR_FIELD}]
+    base = {k: v for k, v in article.items() if k not in CHUNK_FIELDS}
+    chunks = []
+    for name in fields:
+        for text in chunk_text(article.get(name) or "", max_words, overlap_sentences):
+            chunks.append({**base, "field": name, "chunk_id": len(chunks), "chunk_text": text})
+    return chunks
+
+
+def chunk_doc_id(chunk: Dict[str, Any]) -> str:
+    return f"{chunk.get('doc_id')}_{chunk.get('chunk_id')}"
+
+
+def chunk_hash(text: str, model_id: str = "") -> str:
+    """Identity of a chunk's embedding: changes with the text or the model."""
+    return hashlib.sha256(f"{model_id}\n{text}".encode("utf-8")).hexdigest()
+
+
+class _Update:
+    """Partial-document `update` action queued next to full chunk documents."""
+
+    __slots__ = ("id", "doc")
+
+    def __init__(self, id: str, doc: Dict[str, Any]):
+        self.id = id
+        self.doc = doc
+
+
+@dataclass
+class IngestionStats:
+    articles: int = 0
+    chunks: int = 0
+    embedded: int = 0
+    indexed: int = 0
+    failed: int = 0
+    retries: int = 0
+    unchanged: int = 0
+    cached: int = 0
+    retired: int = 0
+    bulk_requests: int = 0
+    bulk_bytes: int = 0
+    seconds: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {**{k: v for k, v in self.__dict__.items() if k != "errors"}, "errors": self.errors[:10]}
+
+
+class IngestionPipeline:
+    """Chunk, embed and bulk-index articles with bounded memory and concurrency."""
+
+    def __init__(
+        self,
+        client,
+        embedder,
+        index: str,
+        *,
+        fields: Sequence[str] = DEFAULT_FIELDS,
+        chunk_words: int = 200,
+        chunk_overlap: int = 0,
+        embed_concurrency: int = 8,
+        bulk_max_docs: int = 500,
+        bulk_max_bytes: int = 5 * 1024 * 1024,
+        max_inflight: int = 4,
+        queue_size: int = 1000,
+        max_retries: int = 5,
+        retry_delay: float = 0.5,
+        incremental: bool = False,
+        embedding_cache: Optional[MutableMapping[str, List[float]]] = None,
+        invalidate_url: Optional[str] = None,
+    ):
+        self.client = client
+        self.embedder = embedder
+        self.index = index
+        self.fields = tuple(fields)
+        self.chunk_words = chunk_words
+        self.chunk_overlap = chunk_overlap
+        self.embed_concurrency = embed_concurrency
+        self.bulk_max_docs = bulk_max_docs
+        self.bulk_max_bytes = bulk_max_bytes
+        self.max_inflight = max_inflight
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.incremental = incremental
+        self.embedding_cache = embedding_cache
+        self.invalidate_url = invalidate_url
+        self.model_id = getattr(embedder, "model_id", "")
+        self.stats = IngestionStats()
+
+    @classmethod
+    def from_settings(
+        cls, client, embedder, index: Optional[str] = None, incremental: Optional[bool] = None
+    ) -> "IngestionPipeline":
+        return cls(
+            client,
+            embedder,
+            index or settings.get("ingestion.index") or settings.get("opensearch.index1"),
+            fields=tuple(settings.get("ingestion.fields", list(DEFAULT_FIELDS))),
+            chunk_words=int(settings.get("ingestion.chunk_words", 200)),
+            chunk_overlap=int(settings.get("ingestion.chunk_overlap", 0)),
+            embed_concurrency=int(settings.get("ingestion.embed_concurrency", 8)),
+            bulk_max_docs=int(settings.get("ingestion.bulk_max_docs", 500)),
+            bulk_max_bytes=int(settings.get("ingestion.bulk_max_bytes", 5 * 1024 * 1024)),
+            max_inflight=int(settings.get("ingestion.max_inflight", 4)),
+            queue_size=int(settings.get("ingestion.queue_size", 1000)),
+            max_retries=int(settings.get("ingestion.max_retries", 5)),
+            incremental=bool(settings.get("ingestion.incremental", False)) if incremental is None else incremental,
+            invalidate_url=settings.get("ingestion.cache_invalidate_url") or None,
+        )
+
+    # ------------------ stages ------------------
+
+    def _chunks(self, article: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return chunk_article(article, self.fields, self.chunk_words, self.chunk_overlap)
+
+    async def _read(
+        self, articles: Iterable[Dict[str, Any]], chunk_queue: asyncio.Queue, doc_queue: asyncio.Queue
+    ) -> None:
+        group: List[Dict[str, Any]] = []
+        for article in articles:
+            self.stats.articles += 1
+            group.append(article)
+            if len(group) >= LOOKUP_BATCH:
+                await self._plan(group, chunk_queue, doc_queue)
+                group = []
+        if group:
+            await self._plan(group, chunk_queue, doc_queue)
+
+    async def _stored_chunks(self, doc_ids: List[Any]) -> Dict[str, Dict[str, Any]]:
+        """Stored chunks (without vectors) of `doc_ids`, keyed by chunk document id.
+
+        Pages through every match with `search_after`: a truncated lookup
+        would re-embed the missing chunks and never retire stale ones.
+        """
+        body: Dict[str, Any] = {
+            "size": LOOKUP_PAGE_SIZE,
+            # a lookup, not a ranking: filter context skips scoring and can use the filter cache
+            "query": {"bool": {"filter": [{"terms": {"doc_id": doc_ids}}]}},
+            "_source": {"excludes": [VECTOR_FIELD]},
+            "sort": [{"doc_id": "asc"}, {"chunk_id": "asc"}],
+        }
+        stored: Dict[str, Dict[str, Any]] = {}
+        while True:
+            with track_opensearch(self.index, "search"):
+                response = await self.client.search(index=self.index, body=body)
+            hits = response["hits"]["hits"]
+            stored.update((chunk_doc_id(hit["_source"]), hit["_source"]) for hit in hits)
+            if len(hits) < LOOKUP_PAGE_SIZE:
+                return stored
+            body = {**body, "search_after": hits[-1]["sort"]}
+
+    async def _plan(
+        self, articles: List[Dict[str, Any]], chunk_queue: asyncio.Queue, doc_queue: asyncio.Queue
+    ) -> None:
+        """Route each chunk of `articles` to embedding, straight to bulk, or nowhere."""
+        stored: Dict[str, Dict[str, Any]] = {}
+        if self.incremental:
+            doc_ids = sorted({a["doc_id"] for a in articles if a.get("doc_id") is not None})
+            try:
+                stored = await self._stored_chunks(doc_ids)
+            except Exception as e:
+                logger.warning(f"Stored chunk lookup failed, re-embedding {len(doc_ids)} articles: {e}")
+
+        current = set()
+        for article in articles:
+            for chunk in self._chunks(article):
+                self.stats.chunks += 1
+                chunk[HASH_FIELD] = chunk_hash(chunk["chunk_text"], self.model_id)
+                doc_id = chunk_doc_id(chunk)
+                current.add(doc_id)
+                if self.incremental:
+                    chunk["is_latest"] = True
+                previous = stored.get(doc_id)
+                if previous is not None and previous.get(HASH_FIELD) == chunk[HASH_FIELD]:
+                    self.stats.unchanged += 1
+                    INGEST_CHUNKS.inc(result="unchanged")
+                    if previous != chunk:
+                        await doc_queue.put(_Update(doc_id, chunk))
+                    continue
+                vector = self.embedding_cache.get(chunk[HASH_FIELD]) if self.embedding_cache is not None else None
+                if vector is not None:
+                    self.stats.cached += 1
+                    INGEST_CHUNKS.inc(result="cached")
+                    chunk[VECTOR_FIELD] = vector
+                    await doc_queue.put(chunk)
+                else:
+                    await chunk_queue.put(chunk)
+
+        for doc_id, previous in stored.items():
+            if doc_id not in current and previous.get("is_latest", True):
+                self.stats.retired += 1
+                await doc_queue.put(_Update(doc_id, {"is_latest": False}))
+
+    async def _embed(self, chunk: Dict[str, Any]) -> List[float]:
+        payload = {"inputText": chunk["chunk_text"], "dimensions": EMBEDDING_DIMENSIONS, "normalize": True}
+        return await self.embedder.generate_embedding(payload)
+
+    async def _embed_worker(self, chunk_queue: asyncio.Queue, doc_queue: asyncio.Queue) -> None:
+        while True:
+            chunk = await chunk_queue.get()
+            if chunk is _DONE:
+                return
+            try:
+                chunk[VECTOR_FIELD] = await self._embed(chunk)
+            except Exception as e:
+                self._fail(f"embedding {chunk_doc_id(chunk)}: {e}")
+                continue
+            self.stats.embedded += 1
+            if self.embedding_cache is not None:
+                self.embedding_cache[chunk[HASH_FIELD]] = chunk[VECTOR_FIELD]
+            await doc_queue.put(chunk)
+
+    async def _batch(self, doc_queue: asyncio.Queue, bulk_queue: asyncio.Queue) -> None:
+        lines: List[bytes] = []
+        size = 0
+        while True:
+            doc = await doc_queue.get()
+            if doc is _DONE:
+                break
+            action, source = self._encode(doc)
+            full = len(lines) // 2 >= self.bulk_max_docs or size + len(action) + len(source) > self.bulk_max_bytes
+            if lines and full:
+                await bulk_queue.put(lines)
+                lines, size = [], 0
+            lines += (action, source)
+            size += len(action) + len(source)
+        if lines:
+            await bulk_queue.put(lines)
+
+    def _encode(self, doc) -> Tuple[bytes, bytes]:
+        if isinstance(doc, _Update):
+            action, source = {"update": {"_index": self.index, "_id": doc.id}}, {"doc": doc.doc}
+        else:
+            action, source = {"index": {"_index": self.index, "_id": chunk_doc_id(doc)}}, doc
+        return (
+            json.dumps(action, separators=(",", ":")).encode("utf-8") + b"\n",
+            json.dumps(source, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8") + b"\n",
+        )
+
+    async def _bulk_worker(self, bulk_queue: asyncio.Queue) -> None:
+        while True:
+            lines = await bulk_queue.get()
+            if lines is _DONE:
+                return
+            try:
+                await self._send(lines)
+            except Exception as e:
+                # keep draining the queue so the batcher never blocks on a dead worker
+                self._fail(f"bulk request: {e}", count=len(lines) // 2)
+
+    # ------------------ _bulk with item retries ------------------
+
+    async def _backoff(self, attempt: int) -> None:
+        self.stats.retries += 1
+        delay = self.retry_delay * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def _send(self, lines: List[bytes]) -> None:
+        """Send one batch and retry its throttled items.
+
+        A request-level failure is raised to the worker, which fails the batch:
+        the transport has already retried it.
+        """
+        for attempt in range(self.max_retries + 1):
+            body = b"".join(lines)
+            with track_opensearch(self.index, "bulk"):
+                response = await self.client.bulk(body=body)
+            self.stats.bulk_requests += 1
+            self.stats.bulk_bytes += len(body)
+
+            retry: List[bytes] = []
+            for position, item in enumerate(response.get("items", [])):
+                result = next(iter(item.values()))
+                status = result.get("status", 500)
+                if status < 300:
+                    self.stats.indexed += 1
+                    INGEST_CHUNKS.inc(result="indexed")
+                elif status in RETRYABLE_STATUS and attempt < self.max_retries:
+                    retry.extend(lines[2 * position:2 * position + 2])
+                else:
+                    self._fail(f"{result.get('_id')}: {result.get('error')}")
+            if not retry:
+                return
+            lines = retry
+            await self._backoff(attempt)
+
+    def _fail(self, message: str, count: int = 1) -> None:
+        self.stats.failed += count
+        INGEST_CHUNKS.inc(count, result="failed")
+        if len(self.stats.errors) < 100:
+            self.stats.errors.append(message)
+        logger.warning(f"Ingestion failure ({count}): {message}")
+
+    # ------------------ run ------------------
+
+    async def run(self, articles: Iterable[Dict[str, Any]]) -> IngestionStats:
+        """Ingest `articles` and return the run statistics."""
+        started = time.perf_counter()
+        chunk_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        doc_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        bulk_queue: asyncio.Queue = asyncio.Queue(self.max_inflight)
+
+        embedders = [asyncio.create_task(self._embed_worker(chunk_queue, doc_queue)) for _ in range(self.embed_concurrency)]
+        batcher = asyncio.create_task(self._batch(doc_queue, bulk_queue))
+        senders = [asyncio.create_task(self._bulk_worker(bulk_queue)) for _ in range(self.max_inflight)]
+        try:
+            await self._read(articles, chunk_queue, doc_queue)
+            for _ in embedders:
+                await chunk_queue.put(_DONE)
+            await asyncio.gather(*embedders)
+            await doc_queue.put(_DONE)
+            await batcher
+            for _ in senders:
+                await bulk_queue.put(_DONE)
+            await asyncio.gather(*senders)
+        except BaseException:
+            for task in (*embedders, batcher, *senders):
+                task.cancel()
+            raise
+        finally:
+            self.stats.seconds = round(time.perf_counter() - started, 3)
+            if self.stats.indexed:
+                await self._invalidate_cache()
+        logger.info(f"Ingestion finished: {json.dumps(self.stats.as_dict())}")
+        return self.stats
+
+    async def _invalidate_cache(self) -> None:
+        search_cache.invalidate(self.index)
+        if not self.invalidate_url:
+            return
+        try:
+            await asyncio.to_thread(_post_invalidate, self.invalidate_url, self.index)
+        except Exception as e:
+            logger.warning(f"Search cache invalidation via {self.invalidate_url} failed, results refresh within the cache TTL: {e}")
+
+
+def _post_invalidate(url: str, index: str, timeout: float = 10.0) -> None:
+    """POST to the API server's cache invalidation endpoint for `index`."""
+    separator = "&" if "?" in url else "?"
+    request = urllib.request.Request(f"{url}{separator}{urllib.parse.urlencode({'index': index})}", data=b"", method="POST")
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+
+
+async def _main(args) -> None:
+    from CommonService.async_bedrock import TitanV2
+    from CommonService.async_commonsession import AsyncClientPool
+    from CommonService.async_opensearch.client import build_async_client, close_async_client
+    from CommonService.async_opensearch.config import OpenSearchSettings
+    from src.services.local_knn import iter_chunks
+
+    client = build_async_client(
+        OpenSearchSettings(os_endpoint=args.endpoint, os_region=settings.get("aws_config.region", "us-east-1"))
+    )
+    aws_clients = AsyncClientPool(max_pool_connections=int(settings.get("aws_clients.max_pool_connections", 50)))
+    try:
+        bedrock = await aws_clients.get("bedrock-runtime", settings.get("aws_config.region", "us-east-1"))
+        pipeline = IngestionPipeline.from_settings(
+            client, TitanV2(bedrock), index=args.index, incremental=args.incremental or None
+        )
+        stats = await pipeline.run(iter_chunks(args.export))
+    finally:
+        await aws_clients.close()
+        await close_async_client(client)
+    print(json.dumps(stats.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chunk, embed and bulk-index articles.")
+    parser.add_argument("export", help="JSON array or JSONL file of articles (or pre-chunked documents)")
+    parser.add_argument("--endpoint", required=True, help="OpenSearch / AOSS endpoint host")
+    parser.add_argument("--index", help="target index (defaults to ingestion.index)")
+    parser.add_argument("--incremental", action="store_true", help="skip chunks whose stored chunk_hash is unchanged")
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,144 @@
+"""
+Inverted-file (IVF) approximate index for the local vector engine.
+
+Vectors are partitioned with spherical k-means; a query scores the
+`n_lists` centroids, then only the rows of the `nprobe` closest lists.
+Recall and latency both grow with `nprobe` (see benchmarks/bench_ivf.py).
+The partitioning is saved next to the LocalKnnIndex files as ivf.npz
+and loads in milliseconds.
+"""
+
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+IVF_FILE = "ivf.npz"
+_ASSIGN_BATCH = 8192
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+def assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the most similar centroid for every row, computed in batches."""
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _ASSIGN_BATCH):
+        block = np.asarray(vectors[start:start + _ASSIGN_BATCH], dtype=np.float32)
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(
+    vectors: np.ndarray, n_clusters: int, iterations: int = 20, sample_size: Optional[int] = 65536, seed: int = 0
+) -> np.ndarray:
+    """Unit-norm centroids trained on (a sample of) unit-norm vectors."""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    if n_clusters > n:
+        raise ValueError(f"cannot train {n_clusters} lists on {n} vectors")
+    rows = np.sort(rng.choice(n, size=sample_size, replace=False)) if sample_size and n > sample_size else np.arange(n)
+    sample = np.asarray(vectors[rows], dtype=np.float32)
+
+    centroids = sample[rng.choice(len(sample), size=n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # re-seed empty lists from random points so every list stays useful
+            sums[empty] = sample[rng.choice(len(sample), size=int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IvfIndex:
+    """Centroids plus inverted lists stored as one permutation array with offsets."""
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    @classmethod
+    def train(
+        cls, vectors: np.ndarray, n_lists: Optional[int] = None, iterations: int = 20, seed: int = 0
+    ) -> "IvfIndex":
+        """Partition unit-norm `vectors`; n_lists defaults to ~sqrt(N)."""
+        n_lists = n_lists or max(1, int(np.sqrt(len(vectors))))
+        centroids = spherical_kmeans(vectors, n_lists, iterations=iterations, seed=seed)
+        labels = assign(vectors, centroids)
+        rows = np.argsort(labels, kind="stable").astype(np.int64)
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(labels, minlength=n_lists))
+        return cls(centroids, offsets, rows)
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row ids in the `nprobe` lists closest to the (unit-norm) query."""
+        nprobe = max(1, min(nprobe, self.n_lists))
+        similarity = self.centroids @ query
+        lists = np.argpartition(-similarity, nprobe - 1)[:nprobe]
+        return np.concatenate([self.rows[self.offsets[i]:self.offsets[i + 1]] for i in lists])
+
+    def coverage(self, nprobe: int) -> float:
+        """Rows a probe of `nprobe` lists scans on average."""
+        return self.offsets[-1] * min(nprobe, self.n_lists) / self.n_lists
+
+    def candidates(
+        self, query: np.ndarray, nprobe: int = 8, allowed: Optional[np.ndarray] = None, k: int = 1
+    ) -> np.ndarray:
+        """Sorted probed row ids, optionally restricted to `allowed`.
+
+        A filter with no more rows than a probe would scan is returned whole
+        (an exact scan of it is no slower). Otherwise lists are probed
+        closest first until `nprobe` lists are covered and at least `k`
+        allowed rows were found, so a selective filter still yields k hits.
+        """
+        if allowed is None:
+            return np.sort(self.probe(query, nprobe))
+        if len(allowed) <= self.coverage(nprobe):
+            return np.sort(allowed)
+        order = np.argsort(-(self.centroids @ query))
+        found = []
+        count = 0
+        for probed, i in enumerate(order, 1):
+            rows = self.rows[self.offsets[i]:self.offsets[i + 1]]
+            rows = rows[np.isin(rows, allowed)]
+            found.append(rows)
+            count += len(rows)
+            if probed >= nprobe and count >= k:
+                break
+        return np.sort(np.concatenate(found))
+
+    def search(
+        self, vectors: np.ndarray, query: np.ndarray, k: int, nprobe: int = 8, allowed: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Approximate top-k (scores, row ids) among probed rows, optionally restricted to `allowed`."""
+        candidates = self.candidates(query, nprobe, allowed, k)
+        if not len(candidates):
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+        scores = np.asarray(vectors[candidates]) @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return scores[top], candidates[top]
+
+    def save(self, directory: str) -> None:
+        np.savez(os.path.join(directory, IVF_FILE), centroids=self.centroids, offsets=self.offsets, rows=self.rows)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["IvfIndex"]:
+        path = os.path.join(directory, IVF_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return cls(data["centroids"], data["offsets"], data["rows"])
@@ -0,0 +1,299 @@
+"""
+Admission control for Bedrock LLM calls.
+
+Every LLM call goes through `LLMScheduler.submit`, which holds it in a
+priority queue until both token buckets (requests per minute and estimated
+tokens per minute, sized to the account quota) can pay for it. Interactive
+requests are served before batch ones, and batch work may not spend the
+last `batch_reserve` of either bucket, so a backlog of batch jobs cannot
+starve users.
+
+A request that cannot start before its deadline fails fast with
+`DeadlineExceeded`, and a full queue rejects new work with `QueueFull`.
+Callers turn both into 503/429 responses instead of degrading to a
+match_all scan. When Bedrock throttles anyway (quota shared with other
+workloads, or a bad token estimate), the buckets are drained so the next
+admissions wait for a refill, and the call is queued again while its
+deadline allows. Other transient Bedrock failures are retried with
+jittered backoff under the shared "bedrock-runtime" resilience policy
+(retry budget and circuit breaker); while that circuit is open, or once
+the retries are spent, calls fail with `UpstreamUnavailable` (503).
+
+Token use is charged up front from an estimate (prompt characters /
+`chars_per_token` + max_tokens) and corrected with the usage Bedrock
+reports once the call returns.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from CommonService.utils.deadline import current_deadline
+from CommonService.utils.resilience import (
+    CircuitOpenError,
+    Resilience,
+    backoff_delay,
+    for_dependency,
+    is_retryable,
+    is_throttling,
+    retry_after_hint,
+)
+from src.core.config_loader import settings
+from src.core.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_REJECTIONS
+
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+
+class LLMRejected(Exception):
+    """The scheduler refused or gave up on a call; `status_code` is what the API should answer."""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QueueFull(LLMRejected):
+    status_code = 429
+
+
+class DeadlineExceeded(LLMRejected):
+    status_code = 503
+
+
+class UpstreamUnavailable(LLMRejected):
+    status_code = 503
+
+
+class TokenBucket:
+    """`capacity` tokens, refilled continuously at `rate` per second."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float, reserve: float = 0.0) -> float:
+        """Seconds until `amount` tokens can be taken while leaving `reserve` of capacity untouched."""
+        self._refill(now)
+        needed = min(amount, self.capacity) + reserve * self.capacity - self.tokens
+        if needed <= 0:
+            return 0.0
+        return needed / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens -= min(amount, self.capacity)
+
+    def give(self, amount: float, now: float) -> None:
+        self._refill(now)
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, now: float, for_seconds: float = 0.0) -> None:
+        """Empty the bucket so that nothing can be taken for at least `for_seconds`."""
+        self._refill(now)
+        self.tokens = min(self.tokens, -for_seconds * self.rate)
+
+
+class _Ticket:
+    __slots__ = ("priority", "seq", "tokens", "deadline")
+
+    def __init__(self, priority: int, seq: int, tokens: float, deadline: float):
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.deadline = deadline
+
+    def __lt__(self, other: "_Ticket") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        requests_per_minute: float = 50,
+        tokens_per_minute: float = 200_000,
+        max_queue: int = 100,
+        interactive_deadline: float = 20.0,
+        batch_deadline: float = 300.0,
+        batch_reserve: float = 0.2,
+        chars_per_token: float = 4.0,
+        resilience: Optional[Resilience] = None,
+    ):
+        self.set_limits(requests_per_minute, tokens_per_minute)
+        self.max_queue = max_queue
+        self.deadlines = {INTERACTIVE: interactive_deadline, BATCH: batch_deadline}
+        self.batch_reserve = batch_reserve
+        self.chars_per_token = chars_per_token
+        self._resilience = resilience
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def from_settings(cls) -> "LLMScheduler":
+        return cls(
+            requests_per_minute=float(settings.get("llm_scheduler.requests_per_minute", 50)),
+            tokens_per_minute=float(settings.get("llm_scheduler.tokens_per_minute", 200_000)),
+            max_queue=int(settings.get("llm_scheduler.max_queue", 100)),
+            interactive_deadline=float(settings.get("llm_scheduler.interactive_deadline_seconds", 20)),
+            batch_deadline=float(settings.get("llm_scheduler.batch_deadline_seconds", 300)),
+            batch_reserve=float(settings.get("llm_scheduler.batch_reserve", 0.2)),
+            chars_per_token=float(settings.get("llm_scheduler.chars_per_token", 4)),
+        )
+
+    def set_limits(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        """(Re)size both buckets; each holds up to ten seconds of its rate as burst."""
+        self.requests = TokenBucket(requests_per_minute / 60.0, max(1.0, requests_per_minute / 6.0))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute / 6.0)
+
+    def estimate_tokens(self, prompt: str, max_tokens: int) -> float:
+        return len(prompt) / self.chars_per_token + max_tokens
+
+    @property
+    def resilience(self) -> Resilience:
+        """Retry/circuit-breaker policy for the calls (default: the shared "bedrock-runtime" one)."""
+        return self._resilience or for_dependency("bedrock-runtime")
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def _condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._changed is None or self._loop is not loop:
+            self._changed, self._loop = asyncio.Condition(), loop
+        return self._changed
+
+    def _admit_wait(self, ticket: _Ticket, now: float) -> float:
+        """0 and both buckets charged if `ticket` may start now, else seconds to wait."""
+        reserve = self.batch_reserve if ticket.priority != INTERACTIVE else 0.0
+        wait = max(self.requests.wait_time(1, now, reserve), self.tokens.wait_time(ticket.tokens, now, reserve))
+        if wait == 0:
+            self.requests.take(1, now)
+            self.tokens.take(ticket.tokens, now)
+        return wait
+
+    async def _admit(self, ticket: _Ticket) -> None:
+        name = PRIORITY_NAMES.get(ticket.priority, str(ticket.priority))
+        changed = self._condition()
+        queued_at = time.monotonic()
+        async with changed:
+            if len(self._queue) >= self.max_queue:
+                LLM_REJECTIONS.inc(priority=name, reason="queue_full")
+                raise QueueFull(f"LLM queue is full ({self.max_queue} waiting)", retry_after=self._retry_after())
+            heapq.heappush(self._queue, ticket)
+            LLM_QUEUE_DEPTH.set(len(self._queue))
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._admit_wait(ticket, now) if self._queue[0] is ticket else None
+                    if wait == 0:
+                        break
+                    remaining = ticket.deadline - now
+                    if remaining <= 0 or (wait is not None and wait > remaining):
+                        # the buckets can't pay for this call in time: fail now, not at the deadline
+                        LLM_REJECTIONS.inc(priority=name, reason="deadline")
+                        raise DeadlineExceeded("LLM capacity unavailable before the request deadline",
+                                               retry_after=wait if wait is not None else self._retry_after())
+                    try:
+                        await asyncio.wait_for(changed.wait(), timeout=min(remaining, wait) if wait else remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                LLM_QUEUE_DEPTH.set(len(self._queue))
+                changed.notify_all()
+        LLM_QUEUE_WAIT.observe(time.monotonic() - queued_at, priority=name)
+
+    def _retry_after(self) -> float:
+        now = time.monotonic()
+        return max(1.0, self.requests.wait_time(1, now), self.tokens.wait_time(self.tokens.capacity / 10, now))
+
+    def _settle(self, ticket: _Ticket, used_tokens: Optional[float]) -> None:
+        if used_tokens is None:
+            return
+        now = time.monotonic()
+        difference = ticket.tokens - used_tokens
+        if difference > 0:
+            self.tokens.give(difference, now)
+        else:
+            self.tokens.take(-difference, now)
+
+    async def submit(
+        self,
+        fn: Callable[[], Tuple[Any, Optional[float]]],
+        estimated_tokens: float,
+        priority: int = INTERACTIVE,
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """Run the blocking `fn` in the threadpool once admitted and return its result.
+
+        `fn` returns `(result, tokens_used)`; tokens_used may be None when the
+        model didn't report usage. `deadline` is a time.monotonic() value by
+        which the call must have started (default: now + the priority's
+        configured deadline); it is never later than the request's deadline.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.deadlines.get(priority, self.deadlines[INTERACTIVE])
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            deadline = min(deadline, request_deadline)
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        policy = self.resilience
+        policy.budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                policy.breaker.allow()
+            except CircuitOpenError as e:
+                LLM_REJECTIONS.inc(priority=name, reason="circuit_open")
+                raise UpstreamUnavailable(str(e), retry_after=e.retry_after) from e
+            ticket = _Ticket(priority, next(self._seq), estimated_tokens, deadline)
+            try:
+                await self._admit(ticket)
+                result, used = await run_in_threadpool(fn)
+            except (LLMRejected, asyncio.CancelledError):
+                policy.breaker.release()
+                raise
+            except Exception as e:
+                now = time.monotonic()
+                if is_throttling(e):
+                    # load rather than an outage: stop admitting until the buckets (or Bedrock's hint) allow
+                    policy.breaker.release()
+                    self.requests.drain(now, retry_after_hint(e) or 0.0)
+                    self.tokens.drain(now, retry_after_hint(e) or 0.0)
+                    LLM_REJECTIONS.inc(priority=name, reason="throttled")
+                    if now >= deadline:
+                        raise DeadlineExceeded("Bedrock is throttling and the request deadline has passed") from e
+                    continue
+                if not is_retryable(e):
+                    policy.breaker.release()
+                    raise
+                policy.breaker.record_failure()
+                LLM_REJECTIONS.inc(priority=name, reason="unavailable")
+                delay = backoff_delay(attempt, policy.base_delay, policy.max_delay, retry_after_hint(e))
+                attempt += 1
+                if attempt >= policy.max_attempts or now + delay >= deadline or not policy.budget.try_retry():
+                    raise UpstreamUnavailable(f"Bedrock is unavailable: {e}", retry_after=max(1.0, delay)) from e
+                await asyncio.sleep(delay)
+                continue
+            policy.breaker.record_success()
+            self._settle(ticket, used)
+            return result
+
+
+llm_scheduler = LLMScheduler.from_settings()
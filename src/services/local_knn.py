@@ -0,0 +1,427 @@
+"""
+Local vector search over exported chunks.
+
+Chunks exported from the index (the shape in unique_docs.txt: article
+metadata plus a 1024-dim `chunk_vector`) are written once to a raw float32
+matrix and a JSON metadata sidecar. Loading memory-maps the matrix, so a
+large export costs page cache rather than Python heap, and a query is a
+single vectorized dot product over unit-normalized rows.
+
+Used for development/testing without AOSS and as a degraded-mode fallback
+for knn queries that carry an explicit query vector.
+
+Optionally the rows can also be stored as int8 or PQ codes (codes.npz,
+see src/services/quantization.py). A quantized load scores candidates on
+the codes and re-ranks only the best few against the float32 matrix.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.services.ivf_index import IVF_FILE, IvfIndex
+from src.services.quantization import CODECS, load_codec, save_codec
+
+VECTOR_FIELD = "chunk_vector"
+VECTORS_FILE = "vectors.f32"
+METADATA_FILE = "metadata.json"
+CODES_FILE = "codes.npz"
+DEFAULT_NPROBE = 8
+DEFAULT_RERANK = 4
+_ENCODE_BATCH = 8192
+_READ_SIZE = 1 << 20
+
+# keyword fields stored as ';'-separated lists in the index
+MULTI_VALUE_FIELDS = {"concerns", "emerging_risk_name", "misc_topics", "naicscode"}
+FILTER_FIELDS = {"tag", "region", "source", "is_latest", "doc_id"} | MULTI_VALUE_FIELDS
+
+
+def iter_chunks(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield chunk documents from a JSON array export or a JSONL file.
+
+    Both are streamed: a JSON array is decoded one element at a time, so
+    memory stays bounded by the largest document, not the export.
+    Accepts raw `_source` dicts as well as search hits wrapping them.
+    """
+    with open(path, encoding="utf-8") as handle:
+        first = handle.read(1)
+        while first and first.isspace():
+            first = handle.read(1)
+        handle.seek(0)
+        if first == "[":
+            documents = _iter_json_array(handle)
+        else:
+            documents = (json.loads(line) for line in handle if line.strip())
+        for document in documents:
+            yield document.get("_source", document)
+
+
+def _iter_json_array(handle, read_size: int = _READ_SIZE) -> Iterator[Any]:
+    """Decode the elements of a top-level JSON array incrementally."""
+    decoder = json.JSONDecoder()
+    buffer = handle.read(read_size).lstrip()
+    if not buffer.startswith("["):
+        raise ValueError("expected a JSON array")
+    position = 1
+    eof = False
+    while True:
+        while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+            position += 1
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            element, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            element, end = None, None
+        # an element that ends at the buffer edge may be cut short (e.g. a number)
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError(f"truncated JSON array at offset {position}")
+            more = handle.read(read_size)
+            eof = not more
+            buffer = buffer[position:] + more
+            position = 0
+            continue
+        yield element
+        position = end
+        if position > read_size:
+            buffer, position = buffer[position:], 0
+
+
+def _field_values(value: Any, field: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(v) for v in value]
+    if field in MULTI_VALUE_FIELDS and isinstance(value, str):
+        return [part.strip() for part in value.split(";") if part.strip()]
+    if isinstance(value, bool):
+        return [str(value).lower()]
+    return [str(value)]
+
+
+def _listed(value: Any) -> List[Any]:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalKnnIndex:
+    """Cosine top-k over a (memory-mapped) float32 matrix, exact or via an optional IVF index.
+
+    When `codec`/`codes` are given, candidates are scored on the compact
+    codes instead of the float32 rows.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        metadata: List[Dict[str, Any]],
+        ann: Optional[IvfIndex] = None,
+        codec=None,
+        codes: Optional[np.ndarray] = None,
+    ):
+        if len(vectors) != len(metadata):
+            raise ValueError(f"vectors/metadata length mismatch: {len(vectors)} != {len(metadata)}")
+        if codes is not None and len(codes) != len(metadata):
+            raise ValueError(f"codes/metadata length mismatch: {len(codes)} != {len(metadata)}")
+        self.vectors = vectors
+        self.metadata = metadata
+        self.ann = ann
+        self.codec = codec
+        self.codes = codes
+        self._postings: Dict[str, Dict[str, np.ndarray]] = {}
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1])
+
+    def __len__(self) -> int:
+        return len(self.metadata)
+
+    # ------------------ build / load ------------------
+
+    @classmethod
+    def build(cls, chunks: Iterable[Dict[str, Any]], directory: str, batch_size: int = 1024) -> "LocalKnnIndex":
+        """Stream chunks to disk in batches and return the memory-mapped index."""
+        os.makedirs(directory, exist_ok=True)
+        # an IVF partition or codes from the previous build cover rows that may no longer exist
+        _remove(os.path.join(directory, IVF_FILE))
+        _remove(os.path.join(directory, CODES_FILE))
+        metadata: List[Dict[str, Any]] = []
+        dim: Optional[int] = None
+        batch: List[Sequence[float]] = []
+
+        with open(os.path.join(directory, VECTORS_FILE), "wb") as out:
+
+            def flush():
+                if batch:
+                    matrix = _unit_rows(np.asarray(batch, dtype=np.float32))
+                    out.write(matrix.astype(np.float32, copy=False).tobytes())
+                    batch.clear()
+
+            for chunk in chunks:
+                vector = chunk.get(VECTOR_FIELD)
+                if not vector:
+                    continue
+                if dim is None:
+                    dim = len(vector)
+                elif len(vector) != dim:
+                    raise ValueError(f"chunk {chunk.get('doc_id')}/{chunk.get('chunk_id')} has dim {len(vector)}, expected {dim}")
+                batch.append(vector)
+                metadata.append({k: v for k, v in chunk.items() if k != VECTOR_FIELD})
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+
+        with open(os.path.join(directory, METADATA_FILE), "w", encoding="utf-8") as out:
+            json.dump({"dim": dim or 0, "count": len(metadata), "documents": metadata}, out, ensure_ascii=False)
+        return cls.load(directory)
+
+    @classmethod
+    def load(cls, directory: str, quantized: bool = False) -> "LocalKnnIndex":
+        """Memory-map the index; `quantized=True` also loads codes.npz if it was built."""
+        with open(os.path.join(directory, METADATA_FILE), encoding="utf-8") as handle:
+            sidecar = json.load(handle)
+        count, dim = sidecar["count"], sidecar["dim"]
+        if count:
+            vectors = np.memmap(os.path.join(directory, VECTORS_FILE), dtype=np.float32, mode="r", shape=(count, dim))
+        else:
+            vectors = np.empty((0, dim), dtype=np.float32)
+        codec = codes = None
+        codes_path = os.path.join(directory, CODES_FILE)
+        if quantized and os.path.exists(codes_path):
+            codec, codes = load_codec(codes_path)
+        return cls(vectors, sidecar["documents"], ann=IvfIndex.load(directory), codec=codec, codes=codes)
+
+    def build_ann(self, directory: str, n_lists: Optional[int] = None, iterations: int = 20) -> IvfIndex:
+        """Train an IVF partitioning over the stored vectors and persist it next to them."""
+        self.ann = IvfIndex.train(self.vectors, n_lists=n_lists, iterations=iterations)
+        self.ann.save(directory)
+        return self.ann
+
+    def build_codes(self, directory: str, kind: str = "int8", **fit_options):
+        """Fit an int8 or PQ codec on the stored vectors, encode every row and persist codes.npz."""
+        if kind not in CODECS:
+            raise ValueError(f"unknown codec {kind!r}, expected one of {sorted(CODECS)}")
+        codec = CODECS[kind]()
+        codec.fit(self.vectors, **fit_options)
+        codes = np.concatenate(
+            [codec.encode(self.vectors[start:start + _ENCODE_BATCH]) for start in range(0, len(self), _ENCODE_BATCH)]
+        )
+        save_codec(os.path.join(directory, CODES_FILE), codec, codes)
+        self.codec, self.codes = codec, codes
+        return codec
+
+    # ------------------ filtering ------------------
+
+    def _posting(self, field: str) -> Dict[str, np.ndarray]:
+        """value -> sorted row ids, built lazily per field."""
+        posting = self._postings.get(field)
+        if posting is None:
+            rows: Dict[str, List[int]] = {}
+            for row, document in enumerate(self.metadata):
+                for value in _field_values(document.get(field), field):
+                    rows.setdefault(value, []).append(row)
+            posting = {value: np.asarray(ids, dtype=np.int64) for value, ids in rows.items()}
+            self._postings[field] = posting
+        return posting
+
+    def candidate_rows(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Rows matching every filter (OR within a field's values); None means all rows."""
+        if not filters:
+            return None
+        selected: Optional[np.ndarray] = None
+        for field, wanted in filters.items():
+            posting = self._posting(field)
+            keys: List[str] = []
+            for value in wanted if isinstance(wanted, (list, tuple, set)) else [wanted]:
+                keys.extend(_field_values(value, field))
+            matches = [posting[key] for key in keys if key in posting]
+            rows = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.int64)
+            selected = rows if selected is None else np.intersect1d(selected, rows, assume_unique=True)
+            if not len(selected):
+                break
+        return selected
+
+    # ------------------ search ------------------
+
+    def _score(self, rows: Optional[np.ndarray], query: np.ndarray, exact: bool) -> np.ndarray:
+        if self.codes is not None and not exact:
+            codes = self.codes if rows is None else self.codes[rows]
+            return self.codec.scores(codes, query)
+        return (self.vectors if rows is None else self.vectors[rows]) @ query
+
+    def search(
+        self,
+        query_vector: Sequence[float],
+        k: int = 10,
+        filters: Optional[Dict[str, Any]] = None,
+        nprobe: int = DEFAULT_NPROBE,
+        exact: bool = False,
+        rerank: int = DEFAULT_RERANK,
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Top-k (cosine score, metadata) pairs, best first.
+
+        Uses the IVF index when one is loaded, probing `nprobe` lists, and
+        the quantized codes when loaded; the best `k * rerank` code scores
+        are then re-scored against the float32 rows (`rerank=0` skips it).
+        `exact=True` forces a brute-force float32 scan.
+        """
+        if len(self) == 0 or k <= 0:
+            return []
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dim,):
+            raise ValueError(f"query vector has shape {query.shape}, expected ({self.dim},)")
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        rows = self.candidate_rows(filters)
+        if self.ann is not None and not exact:
+            rows = self.ann.candidates(query, nprobe, allowed=rows, k=k)
+        if rows is not None and len(rows) == 0:
+            return []
+        scores = self._score(rows, query, exact)
+
+        quantized = self.codes is not None and not exact
+        keep = min(k * rerank if quantized and rerank else k, len(scores))
+        top = np.argpartition(-scores, keep - 1)[:keep]
+        ids = top if rows is None else rows[top]
+        if quantized and rerank:
+            order = np.argsort(ids)
+            ids = ids[order]
+            top_scores = np.asarray(self.vectors[ids]) @ query
+        else:
+            top_scores = scores[top]
+        best = np.argsort(-top_scores)[:k]
+        return [(float(top_scores[i]), self.metadata[int(ids[i])]) for i in best]
+
+    def search_response(
+        self, query_vector: Sequence[float], k: int = 10, filters: Optional[Dict[str, Any]] = None, **options
+    ) -> Dict[str, Any]:
+        """`search` results shaped like an OpenSearch response, for drop-in use."""
+        results = self.search(query_vector, k, filters, **options)
+        return {
+            "took": 0,
+            "timed_out": False,
+            "_shards": {"total": 0, "successful": 0, "skipped": 0, "failed": 0},
+            "hits": {
+                "total": {"value": len(results), "relation": "eq"},
+                "max_score": results[0][0] if results else None,
+                "hits": [
+                    {"_index": "local_knn", "_id": f"{doc.get('doc_id')}_{doc.get('chunk_id')}", "_score": score, "_source": doc}
+                    for score, doc in results
+                ],
+            },
+        }
+
+
+class _Unsupported(Exception):
+    """A query constraint the local index can't honour."""
+
+
+def extract_knn(body: Dict[str, Any]) -> Optional[Tuple[List[float], int, Dict[str, Any]]]:
+    """Pull (vector, k, keyword filters) out of a knn query body, if it can be answered locally.
+
+    Handles the top-level `knn` form used by the query generator prompt and
+    the OpenSearch `query.knn.<field>` form, alone or inside a `bool`.
+    Required (`must`/`filter`) term/terms clauses on FILTER_FIELDS become
+    filters and optional `should` clauses are ignored. Anything the local
+    index can't apply exactly - `must_not`, range, text queries, a second
+    knn, a `should` the hits depend on - returns None, as do queries that
+    rely on `query_vector_builder` (there is no vector to search with).
+    """
+    found: Dict[str, Any] = {"vector": None, "k": 10, "filters": {}}
+
+    def knn(clause: Any) -> None:
+        if not isinstance(clause, dict):
+            raise _Unsupported()
+        if "field" not in clause and "query_vector" not in clause:
+            clause = next(iter(clause.values()), None)
+            if not isinstance(clause, dict):
+                raise _Unsupported()
+        vector = clause.get("query_vector") or clause.get("vector")
+        if not vector or found["vector"] is not None:
+            raise _Unsupported()
+        found["vector"] = vector
+        found["k"] = int(clause.get("k", found["k"]))
+        if clause.get("filter"):
+            required(clause["filter"])
+
+    def has_knn(node: Any) -> bool:
+        if isinstance(node, list):
+            return any(has_knn(item) for item in node)
+        return isinstance(node, dict) and any(key == "knn" or has_knn(value) for key, value in node.items())
+
+    def required(query: Any) -> None:
+        """Apply `query` as a constraint every hit must meet."""
+        if not isinstance(query, dict) or len(query) != 1:
+            raise _Unsupported()
+        kind, clause = next(iter(query.items()))
+        if kind == "match_all":
+            return
+        if kind == "knn":
+            knn(clause)
+        elif kind in ("term", "terms") and isinstance(clause, dict) and len(clause) == 1:
+            field, wanted = next(iter(clause.items()))
+            if field not in FILTER_FIELDS or field in found["filters"]:
+                raise _Unsupported()
+            found["filters"][field] = wanted.get("value") if kind == "term" and isinstance(wanted, dict) else wanted
+        elif kind == "bool" and isinstance(clause, dict):
+            if clause.get("must_not"):
+                raise _Unsupported()
+            must = _listed(clause.get("must")) + _listed(clause.get("filter"))
+            should = _listed(clause.get("should"))
+            if should and (not must or has_knn(should)):
+                # the hits depend on which should clauses match
+                raise _Unsupported()
+            for sub in must:
+                required(sub)
+        else:
+            raise _Unsupported()
+
+    try:
+        if "knn" in body:
+            knn(body["knn"])
+        if body.get("query") is not None:
+            required(body["query"])
+    except _Unsupported:
+        return None
+    if not found["vector"]:
+        return None
+    return found["vector"], found["k"], found["filters"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a local knn index from exported chunks.")
+    parser.add_argument("export", help="JSON array or JSONL file of chunk documents (e.g. unique_docs.txt)")
+    parser.add_argument("directory", help="output directory for vectors.f32 and metadata.json")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="also train an IVF index with this many lists")
+    parser.add_argument("--codes", choices=sorted(CODECS), help="also store int8 or PQ codes for the vectors")
+    args = parser.parse_args()
+    index = LocalKnnIndex.build(iter_chunks(args.export), args.directory)
+    print(f"Indexed {len(index)} chunks ({index.dim}-dim) into {args.directory}")
+    if args.ivf_lists:
+        index.build_ann(args.directory, n_lists=args.ivf_lists)
+        print(f"Trained IVF index with {args.ivf_lists} lists")
+    if args.codes:
+        index.build_codes(args.directory, kind=args.codes)
+        print(f"Encoded {len(index)} vectors as {args.codes} codes ({index.codes.nbytes} bytes)")
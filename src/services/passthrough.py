@@ -0,0 +1,83 @@
+"""
+Passthrough of raw OpenSearch responses.
+
+Routes that return an OpenSearch response unchanged (/v1/doc-search,
+/v1/mappings) don't need to decode it into dicts only for FastAPI to
+encode it again. These helpers issue the request through the client's
+transport (keeping its connection pool, signing and retries) inside
+`raw_responses()`, so FastJSONSerializer hands back the response text,
+and wrap the bytes in a Response that is gzip'd when the caller accepts it.
+Raw search bodies are cached next to the decoded ones in `search_cache`.
+"""
+
+import gzip
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from opensearchpy.client.utils import _make_path
+from starlette.concurrency import run_in_threadpool
+
+from CommonService.utils.fastjson import dumps, raw_responses
+from src.core.config_loader import settings
+from src.core.metrics import track_opensearch
+from src.core.timing import stage
+from src.services.search_cache import search_cache
+
+PASSTHROUGH_ENABLED = bool(settings.get("passthrough.enabled", True))
+GZIP_MIN_BYTES = int(settings.get("passthrough.gzip_min_bytes", 1024))
+GZIP_LEVEL = int(settings.get("passthrough.gzip_level", 5))
+# bodies above this are compressed in the threadpool instead of on the event loop
+OFFLOAD_MIN_BYTES = 256 * 1024
+
+
+def _as_bytes(data: Any) -> bytes:
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    # the client was built without FastJSONSerializer, so the body was decoded anyway
+    return dumps(data)
+
+
+async def perform_raw(client, method: str, path: str, params: Optional[Dict[str, Any]] = None, body: Any = None) -> bytes:
+    """`client.transport.perform_request` returning the undecoded response body."""
+    with raw_responses():
+        data = await client.transport.perform_request(method, path, params=params, body=body)
+    return _as_bytes(data)
+
+
+async def raw_search(client, index: str, body: Dict[str, Any], size: Optional[int] = None) -> bytes:
+    """Raw `_search` response bytes, fronted by the result cache."""
+
+    async def load():
+        params = {"size": size} if size is not None else None
+        with stage("os_search"), track_opensearch(index, "search"):
+            return await perform_raw(client, "POST", _make_path(index, "_search"), params=params, body=body)
+
+    return await search_cache.aget_or_load(index, body, size, load, variant="raw")
+
+
+async def raw_get_mapping(client, index: str) -> bytes:
+    with track_opensearch(index, "get_mapping"):
+        return await perform_raw(client, "GET", _make_path(index, "_mapping"))
+
+
+def accepts_gzip(request: Request) -> bool:
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() == "gzip" and params.replace(" ", "") != "q=0":
+            return True
+    return False
+
+
+async def passthrough_response(request: Request, payload: bytes, status_code: int = 200) -> Response:
+    """JSON response from already-encoded bytes, gzip'd when negotiated and worth it."""
+    headers = {"Vary": "Accept-Encoding"}
+    if len(payload) >= GZIP_MIN_BYTES and accepts_gzip(request):
+        with stage("gzip"):
+            if len(payload) >= OFFLOAD_MIN_BYTES:
+                payload = await run_in_threadpool(gzip.compress, payload, GZIP_LEVEL)
+            else:
+                payload = gzip.compress(payload, GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=payload, status_code=status_code, media_type="application/json", headers=headers)
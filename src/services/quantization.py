@@ -0,0 +1,150 @@
+"""
+Compact codecs for embedding vectors.
+
+ScalarInt8Codec stores one signed byte per dimension (4x smaller than
+float32). ProductQuantizationCodec splits a vector into `m` sub-vectors
+and stores the id of the nearest of 256 centroids for each, i.e. `m`
+bytes per vector (16x smaller than float32 for m = dim / 4).
+
+Both score queries asymmetrically: the float32 query is compared with
+encoded vectors directly (a rescaled int8 dot product, or per-subspace
+lookup tables for PQ) without decoding the corpus.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+_SCORE_BATCH = 4096
+
+
+class ScalarInt8Codec:
+    """Symmetric per-dimension int8 quantization."""
+
+    kind = "int8"
+
+    def __init__(self, scale: Optional[np.ndarray] = None):
+        self.scale = scale
+
+    def fit(self, vectors: np.ndarray) -> "ScalarInt8Codec":
+        peak = np.abs(np.asarray(vectors, dtype=np.float32)).max(axis=0)
+        peak[peak == 0] = 1.0
+        self.scale = (peak / 127.0).astype(np.float32)
+        return self
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint(np.asarray(vectors, dtype=np.float32) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Inner product of `query` with every encoded row."""
+        scaled_query = (np.asarray(query, dtype=np.float32) * self.scale).astype(np.float32)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_BATCH):
+            out[start:start + _SCORE_BATCH] = codes[start:start + _SCORE_BATCH].astype(np.float32) @ scaled_query
+        return out
+
+    def params(self) -> dict:
+        return {"scale": self.scale}
+
+    @classmethod
+    def from_params(cls, params) -> "ScalarInt8Codec":
+        return cls(scale=params["scale"])
+
+
+def _kmeans_l2(data: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = data[rng.choice(len(data), size=k, replace=len(data) < k)].copy()
+    data_sq = (data ** 2).sum(axis=1, keepdims=True)
+    for _ in range(iterations):
+        distances = data_sq - 2 * data @ centroids.T + (centroids ** 2).sum(axis=1)
+        labels = np.argmin(distances, axis=1)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, data)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+class ProductQuantizationCodec:
+    """Product quantization with 256 centroids per subspace (one byte each)."""
+
+    kind = "pq"
+    n_centroids = 256
+
+    def __init__(self, m: Optional[int] = None, codebooks: Optional[np.ndarray] = None):
+        self.m = m if codebooks is None else len(codebooks)
+        self.codebooks = codebooks  # (m, 256, dim // m)
+
+    def fit(
+        self, vectors: np.ndarray, iterations: int = 15, sample_size: int = 20000, seed: int = 0
+    ) -> "ProductQuantizationCodec":
+        vectors = np.asarray(vectors, dtype=np.float32)
+        dim = vectors.shape[1]
+        self.m = self.m or max(1, dim // 4)
+        if dim % self.m:
+            raise ValueError(f"dimension {dim} is not divisible by m={self.m}")
+        rng = np.random.default_rng(seed)
+        if len(vectors) > sample_size:
+            vectors = vectors[np.sort(rng.choice(len(vectors), size=sample_size, replace=False))]
+        sub = dim // self.m
+        self.codebooks = np.stack(
+            [
+                _kmeans_l2(vectors[:, j * sub:(j + 1) * sub], self.n_centroids, iterations, rng)
+                for j in range(self.m)
+            ]
+        ).astype(np.float32)
+        return self
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        return vectors.reshape(len(vectors), self.m, -1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(vectors)
+        codes = np.empty((len(parts), self.m), dtype=np.uint8)
+        book_sq = (self.codebooks ** 2).sum(axis=2)
+        for j in range(self.m):
+            distances = -2 * parts[:, j, :] @ self.codebooks[j].T + book_sq[j]
+            codes[:, j] = np.argmin(distances, axis=1)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        parts = self.codebooks[np.arange(self.m)[None, :], codes]
+        return parts.reshape(len(codes), -1)
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Asymmetric inner product via a (m, 256) lookup table."""
+        query_parts = np.asarray(query, dtype=np.float32).reshape(self.m, -1)
+        table = np.einsum("jcd,jd->jc", self.codebooks, query_parts).ravel()
+        # flat offsets of each subspace's row in the table
+        offsets = (np.arange(self.m) * self.n_centroids).astype(np.int32)
+        out = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), _SCORE_BATCH):
+            block = codes[start:start + _SCORE_BATCH]
+            out[start:start + len(block)] = np.take(table, block + offsets).sum(axis=1)
+        return out
+
+    def params(self) -> dict:
+        return {"codebooks": self.codebooks}
+
+    @classmethod
+    def from_params(cls, params) -> "ProductQuantizationCodec":
+        return cls(codebooks=params["codebooks"])
+
+
+CODECS = {codec.kind: codec for codec in (ScalarInt8Codec, ProductQuantizationCodec)}
+
+
+def save_codec(path: str, codec, codes: np.ndarray) -> None:
+    np.savez(path, kind=codec.kind, codes=codes, **codec.params())
+
+
+def load_codec(path: str):
+    """Return (codec, codes) saved by `save_codec`."""
+    with np.load(path) as data:
+        codec = CODECS[str(data["kind"])].from_params(data)
+        return codec, data["codes"]
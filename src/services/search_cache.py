@@ -0,0 +1,210 @@
+"""
+Response cache for OpenSearch queries.
+
+Entries are keyed by a canonical serialization of index + body + size, so
+the same generated DSL hits the cache regardless of key order or
+whitespace. Concurrent misses for one key share a single upstream call.
+`invalidate` is the hook for ingestion: it drops cached results for an
+index and prevents loads that were already in flight from storing stale
+data. Cached responses are shared between callers and must be treated as
+read-only.
+
+The cache is bounded both by entry count and by the serialized size of
+the cached responses: a 1000-hit response that carries `chunk_vector`
+runs to tens of MB, so a count alone does not bound memory. Responses
+larger than the whole byte budget are not cached.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from CommonService.utils import fastjson
+from CommonService.utils.singleflight import SingleFlight
+from src.core.config_loader import settings
+from src.core.metrics import record_cache_lookup, track_opensearch
+from src.services.filter_rewrite import rewrite_filters
+
+
+def canonical_key(index: str, body: Any, size: Optional[int], variant: Optional[str] = None) -> str:
+    """Stable hash of a search request: sorted keys, no insignificant whitespace.
+
+    `variant` separates different representations of the same response
+    (e.g. raw passthrough bytes vs decoded dicts).
+    """
+    request = {"index": index, "body": body, "size": size}
+    if variant:
+        request["variant"] = variant
+    canonical = json.dumps(
+        request,
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _weight(response: Any) -> int:
+    """Serialized size of a response in bytes."""
+    if isinstance(response, (bytes, str)):
+        return len(response)
+    return len(fastjson.dumps(response, default=str))
+
+
+def _is_cacheable(response: Any) -> bool:
+    # raw passthrough bodies only reach the cache for successful responses
+    if isinstance(response, bytes):
+        return True
+    # search_documents reports failures as {"error": ...} rather than raising,
+    # and degraded-mode answers are marked with "fallback"
+    return isinstance(response, dict) and "error" not in response and "fallback" not in response
+
+
+class SearchResultCache:
+    """TTL + LRU cache with single-flight loading for sync and async callers."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = 300,
+        max_entries: int = 256,
+        max_bytes: int = 256 << 20,
+        name: str = "opensearch_results",
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.name = name
+        self._lock = threading.Lock()
+        # key -> (expires_at, index, value, weight)
+        self._entries: "OrderedDict[str, Tuple[float, str, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._epoch = 0
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._flight = SingleFlight()
+
+    def _generation(self, index: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(index, 0)
+
+    def _lookup(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, _, value, _ = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def _drop(self, key: str) -> None:
+        self._bytes -= self._entries.pop(key)[3]
+
+    def _store(self, key: str, index: str, generation: Tuple[int, int], value: Any) -> None:
+        if self.ttl_seconds <= 0 or not _is_cacheable(value):
+            return
+        weight = _weight(value)
+        if weight > self.max_bytes:
+            return
+        with self._lock:
+            if self._generation(index) != generation:
+                return  # invalidated while loading
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, index, value, weight)
+            self._bytes += weight
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def get_or_load(self, index: str, body: Any, size: Optional[int], loader: Callable[[], Any]) -> Any:
+        """Return a cached response or run `loader` once for all concurrent callers."""
+        key = canonical_key(index, body, size)
+        hit, value = self._lookup(key)
+        record_cache_lookup(self.name, hit)
+        if hit:
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                generation = self._generation(index)
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+            self._store(key, index, generation, value)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_load(
+        self,
+        index: str,
+        body: Any,
+        size: Optional[int],
+        loader: Callable[[], Awaitable[Any]],
+        variant: Optional[str] = None,
+    ) -> Any:
+        """Async variant of `get_or_load`; concurrent misses share one load via SingleFlight."""
+        key = canonical_key(index, body, size, variant)
+        hit, value = self._lookup(key)
+        record_cache_lookup(self.name, hit)
+        if hit:
+            return value
+
+        generation = self._generation(index)
+
+        async def load():
+            result = await loader()
+            self._store(key, index, generation, result)
+            return result
+
+        return await self._flight.do(key, load)
+
+    def invalidate(self, index: Optional[str] = None) -> int:
+        """Drop cached responses for `index` (or everything); returns entries removed."""
+        with self._lock:
+            if index is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                self._epoch += 1
+                return removed
+            stale = [key for key, (_, entry_index, _, _) in self._entries.items() if entry_index == index]
+            for key in stale:
+                self._drop(key)
+            self._generations[index] = self._generations.get(index, 0) + 1
+            return len(stale)
+
+
+search_cache = SearchResultCache(
+    ttl_seconds=float(settings.get("search_cache.ttl_seconds", 300)),
+    max_entries=int(settings.get("search_cache.max_entries", 256)),
+    max_bytes=int(settings.get("search_cache.max_mb", 256)) << 20,
+)
+
+
+async def cached_search(client, index: str, body: Dict[str, Any], size: Optional[int] = None) -> Dict[str, Any]:
+    """`client.search` on the shared AsyncOpenSearch, fronted by the result cache."""
+    body = rewrite_filters(index, body)
+
+    async def load():
+        params = {"size": size} if size is not None else {}
+        with track_opensearch(index, "search"):
+            return await client.search(body=body, index=index, **params)
+
+    return await search_cache.aget_or_load(index, body, size, load)
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+import httpx
+from fastapi import Depends, FastAPI, Request
+
+from src.core import config_loader
+
+
+def _app():
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def session(request: Request, call_next):
+        request.state.session = "test-session"
+        return await call_next(request)
+
+    @app.get("/client")
+    async def client_id(client=Depends(config_loader.get_opensearch_client)):
+        return {"id": id(client)}
+
+    return app
+
+
+class FakeClient:
+    closed = False
+
+    async def close(self):
+        self.closed = True
+
+
+class TestGetOpenSearchClient(unittest.IsolatedAsyncioTestCase):
+    async def _ids(self, app, n=3):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            return [(await http.get("/client")).json()["id"] for _ in range(n)]
+
+    async def test_returns_lifespan_client_without_closing_it(self):
+        app = _app()
+        app.state.OSCLIENT = FakeClient()
+        self.assertEqual(await self._ids(app), [id(app.state.OSCLIENT)] * 3)
+        self.assertFalse(app.state.OSCLIENT.closed)
+
+    async def test_falls_back_to_one_shared_client(self):
+        created = []
+
+        def connection():
+            created.append(FakeClient())
+            return created[-1]
+
+        with mock.patch.object(config_loader, "opensearch_connection", connection):
+            ids = await self._ids(_app())
+            await config_loader.close_shared_opensearch_client()
+        self.assertEqual(len(created), 1)
+        self.assertEqual(ids, [id(created[0])] * 3)
+        self.assertTrue(created[0].closed)
+
+    async def test_dependency_can_still_be_overridden(self):
+        app = _app()
+        override = FakeClient()
+        app.dependency_overrides[config_loader.get_opensearch_client] = lambda: override
+        self.assertEqual(await self._ids(app, 1), [id(override)])
+
+
+if __name__ == "__main__":
+    unittest.main()
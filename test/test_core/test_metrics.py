@@ -0,0 +1,62 @@
+import unittest
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.api.routes.metrics_route import metrics_router
+from src.core.metrics import Counter, Histogram, Registry, track_opensearch
+from src.db.db_middleware import Opensearch_middleware
+
+
+class TestRegistry(unittest.TestCase):
+    def test_render_counter_and_histogram(self):
+        registry = Registry()
+        counter = registry.register(Counter("calls_total", "Calls.", ("index",)))
+        histogram = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+        counter.inc(index="a")
+        counter.inc(2, index="a")
+        histogram.observe(0.5)
+
+        text = registry.render()
+        self.assertIn('calls_total{index="a"} 3', text)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('latency_seconds_bucket{le="1"} 1', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 1', text)
+        self.assertIn("latency_seconds_count 1", text)
+
+    def test_duplicate_registration_rejected(self):
+        registry = Registry()
+        registry.register(Counter("dup_total", "Dup."))
+        with self.assertRaises(ValueError):
+            registry.register(Counter("dup_total", "Dup."))
+
+    def test_track_opensearch_counts_errors(self):
+        from src.core.metrics import OPENSEARCH_ERRORS
+
+        before = OPENSEARCH_ERRORS.value(index="idx", operation="search")
+        with self.assertRaises(RuntimeError):
+            with track_opensearch("idx", "search"):
+                raise RuntimeError("boom")
+        self.assertEqual(OPENSEARCH_ERRORS.value(index="idx", operation="search"), before + 1)
+
+
+class TestMetricsEndpoint(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+        app.add_middleware(Opensearch_middleware)
+        app.include_router(metrics_router)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: str):
+            return {"id": item_id}
+
+        self.async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://ts")
+
+    async def asyncTearDown(self):
+        await self.async_client.aclose()
+
+    async def test_requests_labelled_by_route_template(self):
+        await self.async_client.get("/items/42")
+        response = await self.async_client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_requests_total{method="GET",route="/items/{item_id}",status="200"}', response.text)
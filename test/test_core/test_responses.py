@@ -0,0 +1,28 @@
+import json
+import unittest
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.core.responses import FastJSONResponse
+
+
+class Query(BaseModel):
+    query: str
+
+
+class TestFastJSONResponse(unittest.TestCase):
+    def test_renders_same_document_as_json_response(self):
+        content = {"user_query": Query(query="ai risks"), "results": [{"title": "Ünïcode", "score": 1.5}], "tags": None}
+        fast = json.loads(FastJSONResponse(content).body)
+        self.assertEqual(fast, {"user_query": {"query": "ai risks"}, "results": content["results"], "tags": None})
+        self.assertEqual(fast, json.loads(JSONResponse({**content, "user_query": {"query": "ai risks"}}).body))
+
+    def test_media_type_and_unencodable_values(self):
+        self.assertEqual(FastJSONResponse({}).media_type, "application/json")
+        with self.assertRaises(TypeError):
+            FastJSONResponse({"x": object()})
+
+
+if __name__ == "__main__":
+    unittest.main()
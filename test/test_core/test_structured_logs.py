@@ -0,0 +1,56 @@
+import io
+import json
+import logging
+import unittest
+
+from src.logger.console_logs import Loggercheck
+from src.logger.structured_logs import (
+    CappedQueueHandler,
+    DebugSampler,
+    JsonFormatter,
+    summarize_payload,
+    truncate,
+)
+
+
+class TestStructuredLogs(unittest.TestCase):
+    def test_truncate_caps_long_messages(self):
+        self.assertEqual(truncate("abc", 10), "abc")
+        capped = truncate("x" * 50, 10)
+        self.assertTrue(capped.startswith("x" * 10))
+        self.assertIn("truncated 40 chars", capped)
+
+    def test_summarize_payload_serializes_and_caps(self):
+        text = summarize_payload({"hits": ["a" * 100]}, limit=20)
+        self.assertTrue(text.startswith('{"hits": ["aaa'))
+        self.assertIn("truncated", text)
+
+    def test_loggercheck_is_per_module(self):
+        first = Loggercheck("module.one")
+        second = Loggercheck("module.two")
+        self.assertIsNot(first, second)
+        self.assertIs(first, Loggercheck("module.one"))
+        self.assertEqual(second.get_logger().name, "module.two")
+
+    def test_debug_sampler_only_drops_debug(self):
+        sampler = DebugSampler(0.0)
+        debug = logging.LogRecord("t", logging.DEBUG, "", 0, "msg", (), None)
+        info = logging.LogRecord("t", logging.INFO, "", 0, "msg", (), None)
+        self.assertFalse(sampler.filter(debug))
+        self.assertTrue(sampler.filter(info))
+
+    def test_queue_handler_prepares_capped_json_record(self):
+        handler = CappedQueueHandler(None, max_message_chars=16)
+        record = logging.LogRecord("svc", logging.INFO, "", 0, "payload %s", ("y" * 64,), None)
+        record.session = "abc"
+        prepared = handler.prepare(record)
+        self.assertIsNone(prepared.args)
+
+        stream = io.StringIO()
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter())
+        output.emit(prepared)
+        entry = json.loads(stream.getvalue())
+        self.assertEqual(entry["logger"], "svc")
+        self.assertEqual(entry["session"], "abc")
+        self.assertIn("truncated", entry["message"])
@@ -0,0 +1,45 @@
+import unittest
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.core.metrics import STAGE_DURATION
+from src.core.timing import record_stage, stage
+from src.db.db_middleware import Opensearch_middleware
+
+
+class TestRequestTiming(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        app = FastAPI()
+        app.add_middleware(Opensearch_middleware)
+
+        @app.get("/timed")
+        async def timed():
+            with stage("prompt_build"):
+                pass
+            record_stage("os_took", 12)
+            return {"ok": True}
+
+        self.async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://ts")
+
+    async def asyncTearDown(self):
+        await self.async_client.aclose()
+
+    async def test_server_timing_header(self):
+        response = await self.async_client.get("/timed")
+        self.assertEqual(response.status_code, 200)
+        header = response.headers["Server-Timing"]
+        self.assertIn("prompt_build;dur=", header)
+        self.assertIn("os_took;dur=12.0", header)
+        self.assertIn("total;dur=", header)
+
+    async def test_stage_histogram_observed(self):
+        await self.async_client.get("/timed")
+        snapshot = STAGE_DURATION.snapshot()
+        self.assertGreaterEqual(snapshot[("os_took",)]["count"], 1)
+
+    def test_stage_outside_request_is_noop(self):
+        with stage("orphan"):
+            pass
+        record_stage("orphan", 1.0)
+        self.assertNotIn(("orphan",), STAGE_DURATION.snapshot())
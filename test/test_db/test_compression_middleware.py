@@ -0,0 +1,85 @@
+import gzip
+import unittest
+import zlib
+
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from src.db.compression_middleware import CompressionMiddleware, negotiate_encoding
+
+BIG = b'{"data": "' + b"x" * 5000 + b'"}'
+
+
+def make_app(**options):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, **options)
+
+    @app.get("/big")
+    async def big():
+        return Response(BIG, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(b"{}", media_type="application/json")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(BIG), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    async def stream():
+        async def lines():
+            for i in range(3):
+                yield b'{"line": %d}\n' % i
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    return app
+
+
+class TestNegotiateEncoding(unittest.TestCase):
+    def test_quality_values(self):
+        self.assertEqual(negotiate_encoding("gzip, deflate", allow_brotli=False), "gzip")
+        self.assertIsNone(negotiate_encoding("gzip;q=0", allow_brotli=False))
+        self.assertIsNone(negotiate_encoding("identity", allow_brotli=False))
+        self.assertEqual(negotiate_encoding("*", allow_brotli=False), "gzip")
+
+
+class TestCompressionMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(make_app())
+
+    def get(self, path, accept="gzip"):
+        # iter_raw skips httpx's transparent decoding
+        with self.client.stream("GET", path, headers={"Accept-Encoding": accept}) as response:
+            return response, b"".join(response.iter_raw())
+
+    def test_large_body_is_gzipped(self):
+        response, raw = self.get("/big")
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.headers["vary"], "Accept-Encoding")
+        self.assertEqual(int(response.headers["content-length"]), len(raw))
+        self.assertEqual(gzip.decompress(raw), BIG)
+
+    def test_small_or_unaccepted_bodies_are_untouched(self):
+        for path, accept in (("/small", "gzip"), ("/big", "identity")):
+            response, raw = self.get(path, accept)
+            self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(raw, BIG)
+
+    def test_already_encoded_response_passes_through(self):
+        response, raw = self.get("/encoded")
+        self.assertEqual(gzip.decompress(raw), BIG)
+
+    def test_stream_is_compressed_per_chunk(self):
+        response, raw = self.get("/stream")
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertNotIn("content-length", response.headers)
+        self.assertEqual(zlib.decompress(raw, 31), b'{"line": 0}\n{"line": 1}\n{"line": 2}\n')
+
+    def test_offloaded_compression_matches(self):
+        client = TestClient(make_app(offload_min_bytes=1))
+        with client.stream("GET", "/big", headers={"Accept-Encoding": "gzip"}) as response:
+            raw = b"".join(response.iter_raw())
+        self.assertEqual(gzip.decompress(raw), BIG)
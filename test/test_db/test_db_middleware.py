@@ -0,0 +1,39 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from CommonService.utils.resilience import CircuitOpenError
+from src.db.db_middleware import Opensearch_middleware
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(Opensearch_middleware)
+
+    @app.get("/down")
+    async def down():
+        raise CircuitOpenError("opensearch", 4.2)
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("boom")
+
+    return app
+
+
+class TestOpensearchMiddleware(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(make_app())
+
+    def test_open_circuit_is_a_503_with_retry_after(self):
+        response = self.client.get("/down")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "5")
+
+    def test_other_errors_stay_500(self):
+        self.assertEqual(self.client.get("/broken").status_code, 500)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.datastructures import Headers
+
+from CommonService.utils.deadline import time_left
+from src.db.deadline_middleware import DeadlineMiddleware, request_budget
+
+
+def make_app(events, **options):
+    app = FastAPI()
+    app.add_middleware(DeadlineMiddleware, **options)
+
+    @app.get("/left")
+    async def left():
+        return {"left": time_left()}
+
+    @app.get("/slow")
+    async def slow():
+        try:
+            await asyncio.sleep(1.0)
+        except asyncio.CancelledError:
+            events.append("cancelled")
+            raise
+        events.append("finished")
+        return {"done": True}
+
+    return app
+
+
+class TestRequestBudget(unittest.TestCase):
+    def test_header_overrides_default_up_to_the_maximum(self):
+        self.assertEqual(request_budget(Headers({}), 29, 120), 29)
+        self.assertEqual(request_budget(Headers({"x-request-timeout": "5"}), 29, 120), 5)
+        self.assertEqual(request_budget(Headers({"x-request-timeout": "600"}), 29, 120), 120)
+        self.assertEqual(request_budget(Headers({"x-request-timeout": "soon"}), 29, 120), 29)
+
+
+class TestDeadlineMiddleware(unittest.TestCase):
+    def test_handlers_see_the_request_deadline(self):
+        client = TestClient(make_app([], default_seconds=10))
+        left = client.get("/left", headers={"X-Request-Timeout": "2"}).json()["left"]
+        self.assertTrue(0 < left <= 2)
+
+    def test_expired_budget_cancels_the_handler_and_answers_504(self):
+        events = []
+        client = TestClient(make_app(events, default_seconds=0.05))
+        response = client.get("/slow")
+        self.assertEqual(response.status_code, 504)
+        self.assertEqual(events, ["cancelled"])
+
+    def test_client_disconnect_cancels_the_handler(self):
+        events = []
+        app = make_app(events, default_seconds=10)
+        sent = []
+
+        async def scenario():
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await asyncio.sleep(0.05)
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": "/slow", "raw_path": b"/slow", "root_path": "", "query_string": b"",
+                "headers": [], "client": ("test", 1), "server": ("test", 80),
+            }
+            await asyncio.wait_for(app(scope, receive, send), 0.5)
+
+        asyncio.run(scenario())
+        self.assertEqual(events, ["cancelled"])
+        self.assertEqual(sent, [])
@@ -1,42 +1,71 @@
 import unittest
-from unittest.mock import AsyncMock
+from unittest.mock import patch
 
 from httpx import ASGITransport, AsyncClient
-from main_ import app
 
-from src.core.config_loader import get_opensearch_client
+from main import app
+from src.services import fake_opensearch
+from src.services.dsl_validator import recent_first_query
+from src.services.llm_scheduler import DeadlineExceeded
+from src.services.local_knn import iter_chunks
+from src.services.search_cache import search_cache
 
+INDEX = "ei_articles_index-05-nov-test"
 
-class TestOpensearchMappings(unittest.IsolatedAsyncioTestCase):
-    async def asyncSetUp(self):
-        # self.client = TestClient(app)
-        self.mock_opensearch = AsyncMock()
-        self.mock_opensearch.indices = AsyncMock()
-        self.mock_opensearch.indices.get_mappings = AsyncMock(return_value={"test_index": {"mappings": {}}})
-
-        async def override_get_client():
-            yield self.mock_opensearch
 
-        app.dependency_overrides[get_opensearch_client] = override_get_client
+class TestSampleRoutes(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.store = fake_opensearch.FakeOpenSearchStore()
+        self.store.load(INDEX, iter_chunks("unique_docs.txt"))
+        self._previous_sync_client = fake_opensearch.search_opensearch._search_client
+        _, self.os_client = fake_opensearch.install(app, self.store)
+        search_cache.invalidate()
         self.async_client = AsyncClient(transport=ASGITransport(app=app), base_url="http://ts")
 
     async def asyncTearDown(self):
-        app.dependency_overrides.clear()
         await self.async_client.aclose()
+        await self.os_client.close()
+        fake_opensearch.search_opensearch._search_client = self._previous_sync_client
+        del app.state.OSCLIENT
+        search_cache.invalidate()
 
     async def test_mappings_sucess(self):
         response = await self.async_client.get("/v1/mappings")
         self.assertEqual(response.status_code, 200)
-        self.assertIn("test_index", response.json())
-
-    # @patch("src.core.config_loader.get_opensearch_client", new_callable=AsyncMock)
-    # async def test_mappings_error(self, mock_opensearch):
-    #     print(mock_opensearch)
-    #     print(mock_opensearch.indices.get_mappings)
-    #     mock_opensearch.indices.get_mappings = AsyncMock(
-    #         side_effect=Exception("Error connection")
-    #     )
-    #     mock_opensearch.indices.get_mappings.assert_called_once()
-    #     res = self.client.get("/v1/mappings")
-    #     self.assertEqual(res.status_code, 200)
-    #     # self.assertIn("error", res.json())
+        self.assertIn(INDEX, response.json())
+        self.assertEqual(response.json()[INDEX]["mappings"]["properties"]["chunk_vector"]["type"], "knn_vector")
+
+    async def test_doc_search_returns_one_hit(self):
+        response = await self.async_client.get("/v1/doc-search")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["hits"]["hits"]), 1)
+        self.assertEqual(response.json()["hits"]["total"]["value"], 10)
+
+    async def test_mappings_error(self):
+        self.store.inject_failure(500)
+        response = await self.async_client.get("/v1/mappings")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("error", response.json())
+
+    async def test_llm_overload_is_a_503_not_match_all(self):
+        class OverloadedGenerator:
+            async def generate_query(self, query):
+                raise DeadlineExceeded("no capacity", retry_after=2.5)
+
+        with patch("src.api.routes.sample_route.shared_generator", OverloadedGenerator):
+            response = await self.async_client.post("/v1/search-insights", json={"query": "wildfires"})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["retry-after"], "3")
+        self.assertEqual(self.store.requests, [])
+
+    async def test_body_size_of_the_recent_first_fallback_is_sent(self):
+        class FallbackGenerator:
+            async def generate_query(self, query):
+                return recent_first_query(3)
+
+        client = fake_opensearch.search_opensearch._search_client
+        with patch("src.api.routes.sample_route.shared_generator", FallbackGenerator), \
+                patch.object(client, "search", wraps=client.search) as search:
+            response = await self.async_client.post("/v1/search-insights", json={"query": "anything"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(search.call_args.kwargs["size"], 3)
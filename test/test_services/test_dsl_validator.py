@@ -0,0 +1,93 @@
+import copy
+import unittest
+
+from src.api.routes.query_generator import OPENSEARCH_SCHEMA
+from src.services.dsl_validator import DSLValidator, InvalidQuery, parse_schema_fields, recent_first_query
+
+LLM_KNN = {
+    "field": "chunk_vector",
+    "query_vector_builder": {"text_embedding": {"model_text": "cyber risk"}},
+    "k": 500,
+    "num_candidates": 50000,
+}
+
+
+class TestSchemaFields(unittest.TestCase):
+    def test_prompt_schema_is_parsed(self):
+        fields, dimensions = parse_schema_fields(OPENSEARCH_SCHEMA)
+        self.assertEqual(fields["chunk_vector"], "knn_vector")
+        self.assertEqual(dimensions, {"chunk_vector": 1024})
+        self.assertEqual(fields["doc_id"], "long")
+        self.assertEqual(fields["chunk_text"], "text")
+
+
+class TestDSLValidator(unittest.TestCase):
+    def setUp(self):
+        self.validator = DSLValidator.from_schema(OPENSEARCH_SCHEMA)
+        self.text_field = next(name for name, kind in self.validator.fields.items() if kind == "text")
+        self.keyword_field = next(name for name, kind in self.validator.fields.items() if kind == "keyword")
+
+    def test_valid_query_passes_unchanged(self):
+        body = {"query": {"bool": {"must": [{"match": {self.text_field: "cyber"}}]}}, "size": 20}
+        result, repairs = self.validator.validate(body)
+        self.assertEqual(result, body)
+        self.assertEqual(repairs, [])
+
+    def test_repairs_and_input_is_not_mutated(self):
+        body = {
+            "query": {"bool": {
+                "must": [{"term": {self.keyword_field: "x"}}, {"match": {self.text_field.upper(): "cyber"}}],
+                "filter": [{"knn": copy.deepcopy(LLM_KNN)}],
+            }},
+            "size": 5000,
+            "sort": [{self.text_field: "asc"}],
+            "explain": True,
+        }
+        original = copy.deepcopy(body)
+        result, repairs = self.validator.validate(body)
+        self.assertEqual(body, original)
+
+        bool_query = result["query"]["bool"]
+        self.assertNotIn("filter", bool_query)
+        self.assertIn({"term": {self.keyword_field: "x"}}, bool_query["must"])
+        knn = next(sub["knn"] for sub in bool_query["must"] if "knn" in sub)
+        self.assertEqual((knn["k"], knn["num_candidates"]), (100, 1000))
+        self.assertIn({"match": {self.text_field: "cyber"}}, bool_query["must"])
+        self.assertEqual(result["size"], 1000)
+        self.assertNotIn("sort", result)
+        self.assertNotIn("explain", result)
+        self.assertEqual(len(repairs), 7)
+
+    def test_term_on_text_becomes_match(self):
+        result, _ = self.validator.validate({"query": {"term": {self.text_field: "ransomware"}}})
+        self.assertEqual(result["query"], {"match": {self.text_field: "ransomware"}})
+
+    def test_term_to_match_keeps_boost_and_name(self):
+        result, _ = self.validator.validate({"query": {"term": {self.text_field: {"value": "pfas", "boost": 2, "_name": "t"}}}})
+        self.assertEqual(result["query"], {"match": {self.text_field: {"query": "pfas", "boost": 2, "_name": "t"}}})
+        result, _ = self.validator.validate({"query": {"terms": {self.text_field: ["a", "b"], "boost": 3}}})
+        self.assertEqual(result["query"]["bool"]["boost"], 3)
+        result, _ = self.validator.validate({"query": {"terms": {self.keyword_field: ["a"], "_name": "k"}}})
+        self.assertEqual(result["query"], {"terms": {self.keyword_field: ["a"], "_name": "k"}})
+
+    def test_match_all_is_bounded_to_the_newest(self):
+        result, repairs = self.validator.validate({"query": {"match_all": {}}, "size": 10000})
+        self.assertEqual(result, recent_first_query(self.validator.recent_size))
+        self.assertIn("match_all -> recent-first", repairs)
+
+    def test_unrepairable_queries_are_rejected(self):
+        for body in (
+            {"query": {"match": {"no_such_field": "x"}}},
+            {"query": {"range": {"doc_id": {"gte": "yesterday"}}}},
+            {"query": {"script": {"script": "1"}}},
+            {"knn": {"chunk_vector": {"vector": [0.1, 0.2], "k": 5}}},
+            {"size": 10},
+            {"query": {"bool": {"must_not": [{"knn": copy.deepcopy(LLM_KNN)}]}}},
+            ["not", "an", "object"],
+        ):
+            with self.assertRaises(InvalidQuery, msg=body):
+                self.validator.validate(body)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import time
+import unittest
+
+from opensearchpy.exceptions import RequestError, TransportError
+
+from CommonService.async_opensearch.client import ResilientAsyncTransport
+from src.services.fake_opensearch import FakeOpenSearchStore, fake_async_client, fake_client
+from src.services.local_knn import iter_chunks
+
+INDEX = "ei"
+
+
+def make_store(**options):
+    store = FakeOpenSearchStore(**options)
+    store.load(INDEX, iter_chunks("unique_docs.txt"))
+    return store
+
+
+class TestFakeOpenSearchSearch(unittest.TestCase):
+    def setUp(self):
+        self.store = make_store()
+        self.client = fake_client(self.store)
+        with open("unique_docs.txt", encoding="utf-8") as handle:
+            self.docs = json.load(handle)
+
+    def search(self, body, **params):
+        return self.client.search(index=INDEX, body=body, **params)
+
+    def test_bool_with_term_range_and_sort(self):
+        body = {
+            "query": {"bool": {
+                "must": [{"term": {"tag": "Current"}}],
+                "filter": [{"range": {"published_time": {"gte": "2025-11-05 00:00:00"}}}],
+                "must_not": [{"term": {"region": "Europe"}}],
+            }},
+            "sort": [{"doc_id": {"order": "desc"}}],
+        }
+        hits = self.search(body, size=3)["hits"]["hits"]
+        doc_ids = [hit["_source"]["doc_id"] for hit in hits]
+        self.assertEqual(doc_ids, sorted(doc_ids, reverse=True))
+        self.assertTrue(all(hit["_source"]["tag"] == "Current" for hit in hits))
+
+    def test_terms_on_semicolon_separated_keywords(self):
+        total = self.search({"query": {"terms": {"concerns": ["emerging"]}}})["hits"]["total"]["value"]
+        expected = sum("emerging" in (doc["concerns"] or "").split(";") for doc in self.docs)
+        self.assertEqual(total, expected)
+
+    def test_knn_with_vector_ranks_the_same_chunk_first(self):
+        doc = self.docs[3]
+        body = {"knn": {"chunk_vector": {"vector": doc["chunk_vector"], "k": 2}}}
+        hits = self.search(body)["hits"]["hits"]
+        self.assertEqual(len(hits), 2)
+        self.assertEqual(hits[0]["_source"]["doc_id"], doc["doc_id"])
+        self.assertAlmostEqual(hits[0]["_score"], 1.0, places=4)
+
+    def test_knn_filter_restricts_candidates(self):
+        doc = self.docs[3]
+        others = [d["doc_id"] for d in self.docs if d["doc_id"] != doc["doc_id"]]
+        body = {"query": {"knn": {"chunk_vector": {
+            "vector": doc["chunk_vector"], "k": 5, "filter": {"terms": {"doc_id": others}},
+        }}}}
+        hits = self.search(body)["hits"]["hits"]
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(hit["_source"]["doc_id"] in others for hit in hits))
+
+    def test_source_filtering(self):
+        hit = self.search({"query": {"match_all": {}}, "_source": {"excludes": ["chunk_vector"]}}, size=1)["hits"]["hits"][0]
+        self.assertNotIn("chunk_vector", hit["_source"])
+
+    def test_unsupported_query_is_a_400(self):
+        with self.assertRaises(RequestError):
+            self.search({"query": {"fuzzy": {"title": "x"}}})
+
+
+class TestFakeOpenSearchWrites(unittest.TestCase):
+    def test_bulk_msearch_and_get(self):
+        store = FakeOpenSearchStore()
+        client = fake_client(store)
+        response = client.bulk(body=[
+            {"index": {"_index": INDEX, "_id": "a"}}, {"tag": "Current", "doc_id": 1},
+            {"create": {"_index": INDEX, "_id": "a"}}, {"tag": "Untagged"},
+            {"update": {"_index": INDEX, "_id": "a"}}, {"doc": {"is_latest": False}},
+        ])
+        self.assertTrue(response["errors"])
+        self.assertEqual([next(iter(item.values()))["status"] for item in response["items"]], [201, 409, 200])
+        self.assertEqual(client.get(index=INDEX, id="a")["_source"], {"tag": "Current", "doc_id": 1, "is_latest": False})
+        responses = client.msearch(body=[
+            {"index": INDEX}, {"query": {"term": {"is_latest": False}}},
+            {"index": INDEX}, {"query": {"term": {"is_latest": True}}},
+        ])["responses"]
+        self.assertEqual([r["hits"]["total"]["value"] for r in responses], [1, 0])
+
+
+class TestFakeOpenSearchFaults(unittest.TestCase):
+    def test_injected_failures_and_latency(self):
+        store = make_store(latency=0.02)
+        client = fake_async_client(store)
+
+        async def scenario():
+            store.inject_failure(429)
+            with self.assertRaises(TransportError) as raised:
+                await client.search(index=INDEX, body={})
+            started = time.perf_counter()
+            await asyncio.gather(*(client.search(index=INDEX, body={}) for _ in range(5)))
+            elapsed = time.perf_counter() - started
+            await client.close()
+            return raised.exception.status_code, elapsed
+
+        status, elapsed = asyncio.run(scenario())
+        self.assertEqual(status, 429)
+        # concurrent requests overlap their injected latency
+        self.assertGreaterEqual(elapsed, 0.02)
+        self.assertLess(elapsed, 0.09)
+
+    def test_resilient_transport_retries_only_retryable_statuses(self):
+        store = make_store()
+        client = fake_async_client(store, transport_class=ResilientAsyncTransport, max_retries=2)
+
+        async def scenario():
+            store.inject_failure(503, times=2)
+            response = await client.search(index=INDEX, body={"query": {"match_all": {}}})
+            store.inject_failure(400)
+            store.inject_failure(503)
+            with self.assertRaises(RequestError):
+                await client.search(index=INDEX, body={})
+            await client.close()
+            return response
+
+        self.assertGreater(len(asyncio.run(scenario())["hits"]["hits"]), 0)
+        # the 400 was not retried, so the queued 503 is still pending
+        self.assertEqual(store._failures, [503])
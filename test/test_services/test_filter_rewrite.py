@@ -0,0 +1,118 @@
+import copy
+import unittest
+
+from src.api.routes.query_generator import OPENSEARCH_SCHEMA
+from src.services.dsl_validator import parse_schema_fields
+from src.services.fake_opensearch import FakeOpenSearchStore, fake_client
+from src.services.filter_rewrite import FilterRewriter, register_fields, rewrite_filters
+from src.services.local_knn import iter_chunks
+
+FIELDS, _ = parse_schema_fields(OPENSEARCH_SCHEMA)
+
+
+def knn(text="wildfire", k=10, **extra):
+    return {"knn": {"chunk_vector": {"query_vector_builder": {"text_embedding": {"model_text": text}}, "k": k, **extra}}}
+
+
+class TestFilterRewriter(unittest.TestCase):
+    def setUp(self):
+        self.rewriter = FilterRewriter(FIELDS, knn_prefilter=False)
+
+    def test_keyword_and_range_predicates_move_to_filter(self):
+        body = {"query": {"bool": {"must": [
+            {"term": {"tag": "Current"}},
+            {"range": {"published_time": {"gte": "now-3d/d"}}},
+            {"match": {"title": "wildfire"}},
+        ]}}}
+        original = copy.deepcopy(body)
+        result, notes = self.rewriter.rewrite(body)
+        self.assertEqual(body, original)
+        self.assertEqual(result["query"]["bool"], {
+            "must": [{"match": {"title": "wildfire"}}],
+            "filter": [{"term": {"tag": "Current"}}, {"range": {"published_time": {"gte": "now-3d/d"}}}],
+        })
+        self.assertEqual(notes, ["2 clause(s) bool.must -> bool.filter"])
+
+    def test_bare_top_level_predicate_is_wrapped(self):
+        result, _ = self.rewriter.rewrite({"query": {"terms": {"region": ["US", "Canada"]}}, "size": 5})
+        self.assertEqual(result, {"query": {"bool": {"filter": [{"terms": {"region": ["US", "Canada"]}}]}}, "size": 5})
+
+    def test_scored_clauses_stay(self):
+        for body in (
+            {"query": {"bool": {"must": [{"term": {"title": "wildfire"}}]}}},  # text: score varies
+            {"query": {"bool": {"should": [{"bool": {"must": [{"term": {"tag": "Current"}}]}}, {"match": {"title": "x"}}]}}},
+            {"query": {"bool": {"must": [{"term": {"tag": "Current"}}, {"match": {"title": "x"}}]}}, "min_score": 2},
+        ):
+            result, notes = self.rewriter.rewrite(body)
+            self.assertIs(result, body)
+            self.assertEqual(notes, [])
+
+    def test_untyped_index_only_moves_constant_score_clauses(self):
+        body = {"query": {"bool": {"must": [{"term": {"URL": "https://x"}}, {"exists": {"field": "URL"}}]}}}
+        result, _ = FilterRewriter().rewrite(body)
+        self.assertEqual(result["query"]["bool"], {"must": [{"term": {"URL": "https://x"}}], "filter": [{"exists": {"field": "URL"}}]})
+
+    def test_predicates_inside_filter_context_are_rewritten(self):
+        body = {"query": {"bool": {"filter": [{"bool": {"must": [{"term": {"title": "x"}}, {"term": {"tag": "Current"}}]}}]}}}
+        result, _ = self.rewriter.rewrite(body)
+        inner = result["query"]["bool"]["filter"][0]["bool"]
+        self.assertEqual(inner["filter"], [{"term": {"tag": "Current"}}])
+
+
+class TestKnnPrefilter(unittest.TestCase):
+    def setUp(self):
+        self.rewriter = FilterRewriter(FIELDS, knn_prefilter=True)
+
+    def test_filters_are_pushed_into_the_knn_clause(self):
+        body = {"query": {"bool": {
+            "must": [{"term": {"tag": "Current"}}, knn(filter={"term": {"source": "Reuters"}})],
+            "must_not": [{"term": {"region": "Europe"}}],
+        }}}
+        result, notes = self.rewriter.rewrite(body)
+        self.assertEqual(result["query"]["bool"], {"must": [knn(filter={"bool": {
+            "filter": [{"term": {"source": "Reuters"}}, {"term": {"tag": "Current"}}],
+            "must_not": [{"term": {"region": "Europe"}}],
+        }})]})
+        self.assertEqual(notes[-1], "bool.filter -> knn.filter")
+
+    def test_flat_knn_form(self):
+        flat = {"field": "chunk_vector", "query_vector_builder": {"text_embedding": {"model_text": "x"}}, "k": 10}
+        result, _ = self.rewriter.rewrite({"query": {"bool": {"must": [{"knn": flat}, {"term": {"tag": "Current"}}]}}})
+        self.assertEqual(result["query"]["bool"]["must"], [{"knn": {**flat, "filter": {"term": {"tag": "Current"}}}}])
+
+    def test_not_pushed_with_should_or_several_knn(self):
+        for bool_query in (
+            {"must": [knn()], "filter": [{"term": {"tag": "Current"}}], "should": [{"match": {"title": "x"}}]},
+            {"must": [knn("a"), knn("b")], "filter": [{"term": {"tag": "Current"}}]},
+        ):
+            result, _ = self.rewriter.rewrite({"query": {"bool": bool_query}})
+            self.assertEqual(result["query"]["bool"]["filter"], [{"term": {"tag": "Current"}}])
+
+    def test_prefiltered_hits_all_pass_the_filter(self):
+        store = FakeOpenSearchStore()
+        store.load("ei", iter_chunks("unique_docs.txt"))
+        client = fake_client(store)
+        body = {"query": {"bool": {"must": [{"term": {"tag": "Current"}}, knn("risk", k=5)]}}}
+        rewritten, _ = self.rewriter.rewrite(body)
+        before = client.search(index="ei", body=body)["hits"]["hits"]
+        after = client.search(index="ei", body=rewritten)["hits"]["hits"]
+        self.assertTrue(all(hit["_source"]["tag"] == "Current" for hit in after))
+        self.assertGreaterEqual(len(after), len(before))
+        self.assertTrue({hit["_id"] for hit in before} <= {hit["_id"] for hit in after})
+
+
+class TestRewriteFilters(unittest.TestCase):
+    def test_uses_the_fields_registered_for_the_index(self):
+        body = {"query": {"term": {"tag": "Current"}}}
+        self.assertIs(rewrite_filters("unregistered", body), body)
+        register_fields("typed", FIELDS)
+        self.assertEqual(rewrite_filters("typed", body), {"query": {"bool": {"filter": [{"term": {"tag": "Current"}}]}}})
+
+    def test_knn_prefilter_is_off_unless_the_index_is_listed(self):
+        register_fields("typed", FIELDS)
+        body = {"query": {"bool": {"must": [knn(), {"term": {"tag": "Current"}}]}}}
+        self.assertEqual(rewrite_filters("typed", body)["query"]["bool"], {"must": [knn()], "filter": [{"term": {"tag": "Current"}}]})
+
+
+if __name__ == "__main__":
+    unittest.main()
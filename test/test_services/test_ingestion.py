@@ -0,0 +1,261 @@
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest.mock import patch
+
+from opensearchpy.exceptions import TransportError
+
+from src.services.ingestion import IngestionPipeline, chunk_article, chunk_text
+from src.services.local_knn import VECTOR_FIELD
+
+
+class FakeEmbedder:
+    def __init__(self, fail_on=None):
+        self.calls = 0
+        self.fail_on = fail_on
+
+    async def generate_embedding(self, payload):
+        self.calls += 1
+        if self.fail_on and self.fail_on in payload["inputText"]:
+            raise RuntimeError("model error")
+        return [float(len(payload["inputText"])), 1.0]
+
+
+class FakeBulkClient:
+    """Records _bulk bodies; throttles every item of the first request."""
+
+    def __init__(self, throttle_first=True):
+        self.bodies = []
+        self.indexed = {}
+        self.throttle_first = throttle_first
+
+    async def bulk(self, body):
+        self.bodies.append(body)
+        lines = body.decode("utf-8").splitlines()
+        items = []
+        for action, source in zip(lines[::2], lines[1::2]):
+            meta = json.loads(action)["index"]
+            if self.throttle_first and len(self.bodies) == 1:
+                items.append({"index": {"_id": meta["_id"], "status": 429}})
+            else:
+                self.indexed[meta["_id"]] = json.loads(source)
+                items.append({"index": {"_id": meta["_id"], "status": 201}})
+        return {"errors": any(i["index"]["status"] >= 300 for i in items), "items": items}
+
+
+class FakeIndexClient:
+    """In-memory index supporting _bulk index/update and a paged terms lookup on doc_id."""
+
+    def __init__(self):
+        self.docs = {}
+        self.actions = []
+        self.searches = 0
+
+    async def bulk(self, body):
+        lines = body.decode("utf-8").splitlines()
+        items = []
+        for action_line, source_line in zip(lines[::2], lines[1::2]):
+            (op, meta), = json.loads(action_line).items()
+            source = json.loads(source_line)
+            self.actions.append((op, meta["_id"]))
+            if op == "index":
+                self.docs[meta["_id"]] = source
+            else:
+                self.docs[meta["_id"]].update(source["doc"])
+            items.append({op: {"_id": meta["_id"], "status": 200}})
+        return {"errors": False, "items": items}
+
+    async def search(self, index, body):
+        self.searches += 1
+        wanted = set(body["query"]["bool"]["filter"][0]["terms"]["doc_id"])
+        hits = sorted(
+            (
+                {"_id": _id, "_source": {k: v for k, v in doc.items() if k != VECTOR_FIELD}, "sort": [doc["doc_id"], doc["chunk_id"]]}
+                for _id, doc in self.docs.items()
+                if doc["doc_id"] in wanted
+            ),
+            key=lambda hit: hit["sort"],
+        )
+        if "search_after" in body:
+            hits = [hit for hit in hits if hit["sort"] > body["search_after"]]
+        return {"hits": {"hits": hits[:body["size"]]}}
+
+
+def _article(doc_id, sentences=30):
+    text = " ".join(f"Sentence {i} about emerging risk number {i}." for i in range(sentences))
+    return {"doc_id": doc_id, "title": f"Article {doc_id}", "data": text, "is_latest": True, "tag": "Current"}
+
+
+class TestChunking(unittest.TestCase):
+    def test_chunks_respect_word_limit_and_sentence_boundaries(self):
+        chunks = chunk_text(_article(1)["data"], max_words=20)
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertLessEqual(len(chunk.split()), 20)
+            self.assertTrue(chunk.endswith("."))
+        self.assertEqual(" ".join(chunks), _article(1)["data"])
+
+    def test_overlap_repeats_trailing_sentences(self):
+        chunks = chunk_text(_article(1)["data"], max_words=21, overlap_sentences=1)
+        self.assertEqual(chunks[0].split(". ")[-1], chunks[1].split(". ")[0] + ".")
+
+    def test_article_chunks_carry_metadata(self):
+        chunks = chunk_article(_article(7), max_words=20)
+        self.assertEqual([c["chunk_id"] for c in chunks], list(range(len(chunks))))
+        self.assertTrue(all(c["doc_id"] == 7 and c["field"] == "data" for c in chunks))
+
+    def test_prechunked_documents_pass_through_without_vector(self):
+        doc = {"doc_id": 1, "chunk_id": 3, "chunk_text": "x.", VECTOR_FIELD: [0.1]}
+        self.assertEqual(chunk_article(doc), [{"doc_id": 1, "chunk_id": 3, "chunk_text": "x."}])
+
+
+
+class TestIngestionPipeline(unittest.IsolatedAsyncioTestCase):
+    async def test_bulk_batches_are_bounded_and_throttled_items_retried(self):
+        client = FakeBulkClient()
+        pipeline = IngestionPipeline(
+            client, FakeEmbedder(), "test-index", chunk_words=20, bulk_max_docs=4, max_inflight=2, retry_delay=0
+        )
+        stats = await pipeline.run([_article(i) for i in range(5)])
+
+        self.assertEqual(stats.chunks, len(client.indexed))
+        self.assertEqual(stats.indexed, stats.chunks)
+        self.assertEqual(stats.failed, 0)
+        self.assertGreaterEqual(stats.retries, 1)
+        for body in client.bodies:
+            self.assertLessEqual(body.count(b"\n") // 2, 4)
+        doc = client.indexed["3_0"]
+        self.assertEqual(doc["chunk_id"], 0)
+        self.assertEqual(len(doc[VECTOR_FIELD]), 2)
+
+    async def test_byte_limit_splits_batches(self):
+        client = FakeBulkClient(throttle_first=False)
+        pipeline = IngestionPipeline(client, FakeEmbedder(), "test-index", chunk_words=20, bulk_max_bytes=600)
+        stats = await pipeline.run([_article(1)])
+        self.assertEqual(stats.bulk_requests, len(client.bodies))
+        self.assertEqual(stats.bulk_requests, stats.chunks)
+
+    async def test_api_server_cache_is_invalidated_after_the_run(self):
+        requests = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                requests.append(self.path)
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/v1/cache/invalidate"
+            pipeline = IngestionPipeline(
+                FakeBulkClient(throttle_first=False), FakeEmbedder(), "test-index", invalidate_url=url
+            )
+            await pipeline.run([_article(1)])
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(requests, ["/v1/cache/invalidate?index=test-index"])
+
+    async def test_failed_requests_are_left_to_the_transport_retries(self):
+        class UnavailableClient(FakeBulkClient):
+            async def bulk(self, body):
+                self.bodies.append(body)
+                raise TransportError(503, "unavailable")
+
+        client = UnavailableClient()
+        stats = await IngestionPipeline(client, FakeEmbedder(), "test-index", retry_delay=0).run([_article(1)])
+        self.assertEqual(len(client.bodies), 1)
+        self.assertEqual(stats.failed, stats.chunks)
+        self.assertEqual(stats.retries, 0)
+
+    async def test_embedding_failures_are_counted_not_fatal(self):
+        client = FakeBulkClient(throttle_first=False)
+        pipeline = IngestionPipeline(client, FakeEmbedder(fail_on="Sentence 0 "), "test-index", chunk_words=20)
+        stats = await pipeline.run([_article(1)])
+        self.assertEqual(stats.failed, 1)
+        self.assertEqual(stats.indexed, stats.chunks - 1)
+
+
+class TestIncrementalIngestion(unittest.IsolatedAsyncioTestCase):
+    async def _ingest(self, client, embedder, articles, **options):
+        pipeline = IngestionPipeline(client, embedder, "test-index", chunk_words=20, incremental=True, **options)
+        return await pipeline.run(articles)
+
+    async def test_unchanged_chunks_are_not_re_embedded(self):
+        client, embedder = FakeIndexClient(), FakeEmbedder()
+        first = await self._ingest(client, embedder, [_article(1)])
+        calls = embedder.calls
+        self.assertEqual(calls, first.chunks)
+        self.assertTrue(all(doc["chunk_hash"] for doc in client.docs.values()))
+
+        client.actions.clear()
+        again = await self._ingest(client, embedder, [_article(1)])
+        self.assertEqual(embedder.calls, calls)
+        self.assertEqual(again.unchanged, again.chunks)
+        self.assertEqual(client.actions, [])
+
+    async def test_changed_metadata_updates_without_embedding(self):
+        client, embedder = FakeIndexClient(), FakeEmbedder()
+        await self._ingest(client, embedder, [_article(1)])
+        calls = embedder.calls
+        recrawled = {**_article(1), "last_update_time": "2025-11-06 10:00:00 EST"}
+        stats = await self._ingest(client, embedder, [recrawled])
+        self.assertEqual(embedder.calls, calls)
+        self.assertEqual({op for op, _ in client.actions[-stats.chunks:]}, {"update"})
+        self.assertTrue(all(doc["last_update_time"].startswith("2025-11-06") for doc in client.docs.values()))
+        self.assertTrue(all(VECTOR_FIELD in doc for doc in client.docs.values()))
+
+    async def test_only_changed_chunks_are_embedded_and_removed_ones_retired(self):
+        client, embedder = FakeIndexClient(), FakeEmbedder()
+        original = await self._ingest(client, embedder, [_article(1)])
+        calls = embedder.calls
+        shorter = _article(1, sentences=12)
+        shorter["data"] = shorter["data"].replace("Sentence 11 about", "Sentence eleven about")
+        stats = await self._ingest(client, embedder, [shorter])
+
+        self.assertEqual(embedder.calls - calls, 1)
+        self.assertEqual(stats.retired, original.chunks - stats.chunks)
+        latest = sorted(_id for _id, doc in client.docs.items() if doc["is_latest"])
+        self.assertEqual(latest, [f"1_{i}" for i in range(stats.chunks)])
+
+    async def test_lookup_pages_past_the_page_size(self):
+        client, embedder = FakeIndexClient(), FakeEmbedder()
+        original = await self._ingest(client, embedder, [_article(1), _article(2)])
+        calls = embedder.calls
+        shorter = _article(2, sentences=12)
+        client.searches = 0
+        with patch("src.services.ingestion.LOOKUP_PAGE_SIZE", 3):
+            stats = await self._ingest(client, embedder, [_article(1), shorter])
+        self.assertGreater(client.searches, 1)
+        self.assertEqual(embedder.calls, calls)
+        self.assertEqual(stats.unchanged, stats.chunks)
+        self.assertEqual(stats.retired, original.chunks - stats.chunks)
+
+    async def test_embedding_cache_skips_bedrock_for_known_text(self):
+        cache = {}
+        embedder = FakeEmbedder()
+        await self._ingest(FakeIndexClient(), embedder, [_article(1)], embedding_cache=cache)
+        calls = embedder.calls
+        stats = await self._ingest(FakeIndexClient(), embedder, [_article(1)], embedding_cache=cache)
+        self.assertEqual(embedder.calls, calls)
+        self.assertEqual(stats.cached, stats.chunks)
+
+    async def test_lookup_failure_falls_back_to_full_embedding(self):
+        client, embedder = FakeIndexClient(), FakeEmbedder()
+
+        async def broken_search(index, body):
+            raise RuntimeError("search unavailable")
+
+        client.search = broken_search
+        stats = await self._ingest(client, embedder, [_article(1)])
+        self.assertEqual(embedder.calls, stats.chunks)
+        self.assertEqual(stats.indexed, stats.chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()
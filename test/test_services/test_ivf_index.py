@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.services.ivf_index import IvfIndex
+from src.services.local_knn import LocalKnnIndex
+
+
+def _clustered(rows=400, dim=16, clusters=8, seed=3):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    data = centres[rng.integers(0, clusters, size=rows)] + rng.normal(scale=0.2, size=(rows, dim))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestIvfIndex(unittest.TestCase):
+    def setUp(self):
+        self.vectors = _clustered()
+        self.ivf = IvfIndex.train(self.vectors, n_lists=8, iterations=10)
+
+    def test_lists_partition_every_row_once(self):
+        self.assertEqual(self.ivf.offsets[-1], len(self.vectors))
+        self.assertEqual(sorted(self.ivf.rows.tolist()), list(range(len(self.vectors))))
+
+    def test_probing_all_lists_is_exact(self):
+        query = self.vectors[10]
+        _, ids = self.ivf.search(self.vectors, query, k=5, nprobe=self.ivf.n_lists)
+        expected = np.argsort(-(self.vectors @ query))[:5]
+        self.assertEqual(ids.tolist(), expected.tolist())
+
+    def test_few_probes_find_the_query_row(self):
+        _, ids = self.ivf.search(self.vectors, self.vectors[42], k=1, nprobe=1)
+        self.assertEqual(ids.tolist(), [42])
+
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.ivf.save(tmp)
+            loaded = IvfIndex.load(tmp)
+        np.testing.assert_array_equal(loaded.rows, self.ivf.rows)
+        np.testing.assert_array_equal(loaded.centroids, self.ivf.centroids)
+
+    def test_load_missing_returns_none(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(IvfIndex.load(tmp))
+
+
+class TestLocalKnnWithIvf(unittest.TestCase):
+    def test_local_index_uses_persisted_ivf_with_filters(self):
+        vectors = _clustered(rows=200)
+        chunks = [
+            {"doc_id": i, "tag": "Current" if i % 2 else "Untagged", "chunk_vector": v.tolist()}
+            for i, v in enumerate(vectors)
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            LocalKnnIndex.build(chunks, tmp).build_ann(tmp, n_lists=4)
+            index = LocalKnnIndex.load(tmp)
+            self.assertIsNotNone(index.ann)
+            results = index.search(vectors[7], k=3, filters={"tag": "Current"}, nprobe=4)
+            exact = index.search(vectors[7], k=3, filters={"tag": "Current"}, exact=True)
+        self.assertEqual(results[0][1]["doc_id"], 7)
+        self.assertTrue(all(doc["tag"] == "Current" for _, doc in results))
+        self.assertEqual([d["doc_id"] for _, d in results], [d["doc_id"] for _, d in exact])
+
+    def test_selective_filter_still_returns_k_hits(self):
+        vectors = _clustered(rows=400)
+        ivf = IvfIndex.train(vectors, n_lists=20, iterations=10)
+        allowed = np.arange(0, 400, 10)  # 40 rows spread over the lists
+        _, ids = ivf.search(vectors, vectors[5], k=10, nprobe=1, allowed=allowed)
+        self.assertEqual(len(ids), 10)
+        _, ids = ivf.search(vectors, vectors[5], k=10, nprobe=8, allowed=allowed)
+        expected = allowed[np.argsort(-(vectors[allowed] @ vectors[5]))[:10]]
+        self.assertEqual(ids.tolist(), expected.tolist())
+
+    def test_rebuild_drops_the_stale_partition(self):
+        vectors = _clustered(rows=200)
+        chunks = [{"doc_id": i, "chunk_vector": v.tolist()} for i, v in enumerate(vectors)]
+        with tempfile.TemporaryDirectory() as tmp:
+            LocalKnnIndex.build(chunks, tmp).build_ann(tmp, n_lists=8)
+            index = LocalKnnIndex.build(chunks[:20], tmp)
+            self.assertIsNone(index.ann)
+            results = LocalKnnIndex.load(tmp).search(vectors[3], k=3)
+        self.assertEqual(results[0][1]["doc_id"], 3)
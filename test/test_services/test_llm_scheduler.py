@@ -0,0 +1,162 @@
+import asyncio
+import time
+import unittest
+
+from botocore.exceptions import ClientError
+
+from CommonService.utils.resilience import CircuitBreaker, Resilience, RetryBudget
+from src.services.llm_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    DeadlineExceeded,
+    LLMScheduler,
+    QueueFull,
+    TokenBucket,
+    UpstreamUnavailable,
+)
+
+
+def throttled():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "InvokeModel")
+
+
+def unavailable():
+    return ClientError({"Error": {"Code": "ServiceUnavailableException", "Message": "try later"}}, "InvokeModel")
+
+
+def policy(failure_threshold=5):
+    return Resilience(
+        "bedrock-runtime", max_attempts=3, base_delay=0.001, max_delay=0.01,
+        budget=RetryBudget(min_per_second=100), breaker=CircuitBreaker("bedrock-runtime", failure_threshold, 60),
+    )
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_wait_time_and_refill(self):
+        bucket = TokenBucket(rate=10, capacity=10)
+        now = time.monotonic()
+        self.assertEqual(bucket.wait_time(10, now), 0)
+        bucket.take(10, now)
+        self.assertAlmostEqual(bucket.wait_time(5, now), 0.5, places=2)
+        self.assertEqual(bucket.wait_time(5, now + 0.5), 0)
+
+    def test_reserve_is_kept_back(self):
+        bucket = TokenBucket(rate=1, capacity=10)
+        now = time.monotonic()
+        self.assertEqual(bucket.wait_time(8, now, reserve=0.2), 0)
+        self.assertGreater(bucket.wait_time(9, now, reserve=0.2), 0)
+
+
+class TestLLMScheduler(unittest.TestCase):
+    def test_requests_are_paced_by_the_request_bucket(self):
+        # 600 rpm = 10/s with a burst of 100: drain the burst first
+        scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=10**9)
+        scheduler.requests.tokens = 0
+
+        async def scenario():
+            started = time.monotonic()
+            await asyncio.gather(*(scheduler.submit(lambda: ("ok", None), estimated_tokens=1) for _ in range(3)))
+            return time.monotonic() - started
+
+        self.assertGreaterEqual(asyncio.run(scenario()), 0.25)
+
+    def test_interactive_goes_before_batch(self):
+        scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=10**9, batch_reserve=0)
+        scheduler.requests.tokens = 0
+        order = []
+
+        async def scenario():
+            batch = asyncio.create_task(scheduler.submit(lambda: (order.append("batch"), None), 1, priority=BATCH))
+            await asyncio.sleep(0)
+            interactive = asyncio.create_task(scheduler.submit(lambda: (order.append("interactive"), None), 1))
+            await asyncio.gather(batch, interactive)
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["interactive", "batch"])
+
+    def test_rejects_when_capacity_misses_the_deadline(self):
+        scheduler = LLMScheduler(requests_per_minute=6, tokens_per_minute=10**9)
+        scheduler.requests.tokens = 0
+
+        async def scenario():
+            await scheduler.submit(lambda: ("ok", None), 1, deadline=time.monotonic() + 0.5)
+
+        started = time.monotonic()
+        with self.assertRaises(DeadlineExceeded) as raised:
+            asyncio.run(scenario())
+        # fails fast instead of waiting for the deadline
+        self.assertLess(time.monotonic() - started, 0.2)
+        self.assertGreaterEqual(raised.exception.retry_after, 1)
+        self.assertEqual(raised.exception.status_code, 503)
+
+    def test_queue_full(self):
+        scheduler = LLMScheduler(requests_per_minute=6, tokens_per_minute=10**9, max_queue=1)
+        scheduler.requests.tokens = 0
+
+        async def scenario():
+            waiting = asyncio.create_task(scheduler.submit(lambda: ("ok", None), 1))
+            await asyncio.sleep(0.01)
+            try:
+                with self.assertRaises(QueueFull):
+                    await scheduler.submit(lambda: ("ok", None), 1)
+            finally:
+                waiting.cancel()
+
+        asyncio.run(scenario())
+
+    def test_token_estimate_is_settled_with_reported_usage(self):
+        scheduler = LLMScheduler(requests_per_minute=600, tokens_per_minute=6000)
+        before = scheduler.tokens.tokens
+        asyncio.run(scheduler.submit(lambda: ("ok", 100), estimated_tokens=500))
+        self.assertAlmostEqual(scheduler.tokens.tokens, before - 100, delta=5)
+
+    def test_throttling_drains_buckets_and_retries(self):
+        scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10**9)
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                raise throttled()
+            return "ok", None
+
+        self.assertEqual(asyncio.run(scheduler.submit(fn, 1, deadline=time.monotonic() + 5)), "ok")
+        self.assertEqual(len(calls), 2)
+
+    def test_other_errors_propagate(self):
+        scheduler = LLMScheduler()
+
+        def fn():
+            raise ValueError("bad request")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(scheduler.submit(fn, 1, priority=INTERACTIVE))
+
+    def test_transient_errors_are_retried_with_backoff(self):
+        scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10**9, resilience=policy())
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) < 3:
+                raise unavailable()
+            return "ok", None
+
+        self.assertEqual(asyncio.run(scheduler.submit(fn, 1)), "ok")
+        self.assertEqual(len(calls), 3)
+
+    def test_open_circuit_rejects_without_calling_bedrock(self):
+        scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10**9, resilience=policy(failure_threshold=2))
+        calls = []
+
+        def fn():
+            calls.append(1)
+            raise unavailable()
+
+        with self.assertRaises(UpstreamUnavailable):
+            asyncio.run(scheduler.submit(fn, 1))
+        self.assertEqual(len(calls), 2)
+        with self.assertRaises(UpstreamUnavailable) as raised:
+            asyncio.run(scheduler.submit(fn, 1))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(raised.exception.status_code, 503)
@@ -0,0 +1,109 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.services.local_knn import LocalKnnIndex, extract_knn, iter_chunks
+
+
+def _chunks():
+    rng = np.random.default_rng(7)
+    docs = []
+    for doc_id in range(20):
+        docs.append(
+            {
+                "doc_id": doc_id,
+                "chunk_id": 0,
+                "tag": "Current" if doc_id % 2 else "Untagged",
+                "region": "US",
+                "concerns": "lawsuits;injuries" if doc_id % 5 == 0 else "emerging",
+                "chunk_vector": rng.normal(size=8).tolist(),
+            }
+        )
+    return docs
+
+
+class TestLocalKnnIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.docs = _chunks()
+        self.index = LocalKnnIndex.build(self.docs, self.tmp.name, batch_size=7)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_build_is_memory_mapped_and_reloadable(self):
+        self.assertIsInstance(self.index.vectors, np.memmap)
+        reloaded = LocalKnnIndex.load(self.tmp.name)
+        self.assertEqual(len(reloaded), 20)
+        self.assertEqual(reloaded.dim, 8)
+        self.assertNotIn("chunk_vector", reloaded.metadata[0])
+
+    def test_matches_brute_force_cosine(self):
+        query = self.docs[3]["chunk_vector"]
+        matrix = np.array([d["chunk_vector"] for d in self.docs])
+        expected = np.argsort(-(matrix @ query) / np.linalg.norm(matrix, axis=1))[:5]
+        results = self.index.search(query, k=5)
+        self.assertEqual([doc["doc_id"] for _, doc in results], expected.tolist())
+        self.assertAlmostEqual(results[0][0], 1.0, places=5)
+
+    def test_prefilter_on_keyword_and_multi_value_fields(self):
+        query = self.docs[0]["chunk_vector"]
+        results = self.index.search(query, k=20, filters={"tag": "Current", "concerns": "lawsuits"})
+        self.assertEqual(sorted(doc["doc_id"] for _, doc in results), [5, 15])
+        self.assertEqual(self.index.search(query, k=5, filters={"tag": "Missing"}), [])
+
+    def test_search_response_is_opensearch_shaped(self):
+        response = self.index.search_response(self.docs[1]["chunk_vector"], k=3)
+        self.assertEqual(response["hits"]["total"]["value"], 3)
+        self.assertIn("_source", response["hits"]["hits"][0])
+
+
+class TestExportHelpers(unittest.TestCase):
+    def test_iter_chunks_reads_json_array_and_jsonl(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            array_path = os.path.join(tmp, "docs.json")
+            lines_path = os.path.join(tmp, "docs.jsonl")
+            with open(array_path, "w") as handle:
+                json.dump([{"_source": {"doc_id": 1}}, {"doc_id": 2}], handle)
+            with open(lines_path, "w") as handle:
+                handle.write('{"doc_id": 1}\n\n{"doc_id": 2}\n')
+            self.assertEqual([d["doc_id"] for d in iter_chunks(array_path)], [1, 2])
+            self.assertEqual([d["doc_id"] for d in iter_chunks(lines_path)], [1, 2])
+
+    def test_json_array_exports_are_streamed(self):
+        docs = [{"doc_id": i, "chunk_text": "x" * i, "nested": {"n": [1.5, i]}} for i in range(50)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "export.json")
+            with open(path, "w", encoding="utf-8") as handle:
+                json.dump([{"_source": doc} for doc in docs], handle, indent=2)
+            self.assertEqual(list(iter_chunks(path)), docs)
+
+    def test_extract_knn_with_filters(self):
+        body = {
+            "query": {
+                "bool": {
+                    "must": [{"knn": {"chunk_vector": {"vector": [0.1, 0.2], "k": 4}}}],
+                    "filter": [{"term": {"tag": {"value": "Current"}}}],
+                }
+            }
+        }
+        self.assertEqual(extract_knn(body), ([0.1, 0.2], 4, {"tag": "Current"}))
+
+    def test_extract_knn_without_vector(self):
+        body = {"knn": {"field": "chunk_vector", "query_vector_builder": {"text_embedding": {}}, "k": 10}}
+        self.assertIsNone(extract_knn(body))
+
+    def test_extract_knn_ignores_should_and_refuses_what_it_cannot_apply(self):
+        knn = {"knn": {"chunk_vector": {"vector": [0.1, 0.2], "k": 4}}}
+        body = {"query": {"bool": {"must": [knn], "should": [{"term": {"region": "US"}}]}}}
+        self.assertEqual(extract_knn(body), ([0.1, 0.2], 4, {}))
+        for query in (
+            {"bool": {"must": [knn], "must_not": [{"term": {"tag": "Current"}}]}},
+            {"bool": {"must": [knn, {"range": {"doc_id": {"gte": 3}}}]}},
+            {"bool": {"must": [knn, {"match": {"title": "wildfire"}}]}},
+            {"bool": {"should": [knn, {"match_phrase": {"title": "wildfire"}}]}},
+        ):
+            self.assertIsNone(extract_knn({"query": query}), query)
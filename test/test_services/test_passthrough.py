@@ -0,0 +1,72 @@
+import asyncio
+import gzip
+import json
+import unittest
+
+from opensearchpy import AsyncOpenSearch
+from opensearchpy._async.http_aiohttp import AsyncConnection
+from starlette.requests import Request
+
+from CommonService.utils.fastjson import FastJSONSerializer
+from src.services import passthrough
+from src.services.search_cache import search_cache
+
+RESPONSE = json.dumps({"hits": {"total": {"value": 1}, "hits": [{"_id": "a", "_source": {"title": "x" * 2000}}]}})
+
+
+class FakeConnection(AsyncConnection):
+    calls = []
+
+    async def perform_request(self, method, url, params=None, body=None, timeout=None, ignore=(), headers=None):
+        FakeConnection.calls.append((method, url, params))
+        return 200, {"content-type": "application/json"}, RESPONSE
+
+    async def close(self):
+        pass
+
+
+def make_client():
+    return AsyncOpenSearch(hosts=[{"host": "localhost"}], connection_class=FakeConnection, serializer=FastJSONSerializer())
+
+
+def make_request(accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+class TestRawSearch(unittest.TestCase):
+    def setUp(self):
+        FakeConnection.calls = []
+        search_cache.invalidate()
+
+    def test_returns_response_bytes_unchanged_and_caches_them(self):
+        async def scenario():
+            client = make_client()
+            first = await passthrough.raw_search(client, "idx", {"query": {"match_all": {}}}, 10)
+            second = await passthrough.raw_search(client, "idx", {"query": {"match_all": {}}}, 10)
+            decoded = await client.search(index="idx", body={"query": {"match_all": {}}})
+            return first, second, decoded
+
+        first, second, decoded = asyncio.run(scenario())
+        self.assertEqual(first, RESPONSE.encode())
+        self.assertEqual(second, first)
+        self.assertEqual(FakeConnection.calls[0], ("POST", "/idx/_search", {"size": 10}))
+        # one raw load, one decoded search: the cache hit and the raw flag don't leak
+        self.assertEqual(len(FakeConnection.calls), 2)
+        self.assertEqual(decoded["hits"]["total"]["value"], 1)
+
+
+class TestPassthroughResponse(unittest.TestCase):
+    def test_gzips_when_accepted(self):
+        response = asyncio.run(passthrough.passthrough_response(make_request("br, gzip"), RESPONSE.encode()))
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.body), RESPONSE.encode())
+
+    def test_plain_when_not_accepted_or_small(self):
+        for request, payload in ((make_request(), RESPONSE.encode()),
+                                 (make_request("gzip;q=0"), RESPONSE.encode()),
+                                 (make_request("gzip"), b"{}")):
+            response = asyncio.run(passthrough.passthrough_response(request, payload))
+            self.assertNotIn("content-encoding", response.headers)
+            self.assertEqual(response.body, payload)
+            self.assertEqual(response.headers["vary"], "Accept-Encoding")
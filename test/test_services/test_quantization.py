@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.services.local_knn import CODES_FILE, LocalKnnIndex
+from src.services.quantization import ProductQuantizationCodec, ScalarInt8Codec, load_codec, save_codec
+
+
+def _unit_vectors(rows=600, dim=32, clusters=12, seed=5):
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dim))
+    data = centres[rng.integers(0, clusters, size=rows)] + rng.normal(scale=0.3, size=(rows, dim))
+    return (data / np.linalg.norm(data, axis=1, keepdims=True)).astype(np.float32)
+
+
+def _recall(codec, vectors, k=10, queries=20):
+    codes = codec.encode(vectors)
+    hits = 0
+    for query in vectors[:queries]:
+        expected = set(np.argsort(-(vectors @ query))[:k].tolist())
+        found = set(np.argsort(-codec.scores(codes, query))[:k].tolist())
+        hits += len(expected & found)
+    return hits / (k * queries)
+
+
+class TestScalarInt8Codec(unittest.TestCase):
+    def setUp(self):
+        self.vectors = _unit_vectors()
+        self.codec = ScalarInt8Codec().fit(self.vectors)
+
+    def test_codes_are_one_byte_per_dimension(self):
+        codes = self.codec.encode(self.vectors)
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(codes.nbytes * 4, self.vectors.nbytes)
+
+    def test_round_trip_error_is_small(self):
+        decoded = self.codec.decode(self.codec.encode(self.vectors))
+        self.assertLess(np.abs(decoded - self.vectors).max(), 0.01)
+
+    def test_asymmetric_scores_match_decoded_dot_products(self):
+        codes = self.codec.encode(self.vectors)
+        query = self.vectors[3]
+        np.testing.assert_allclose(self.codec.scores(codes, query), self.codec.decode(codes) @ query, atol=1e-5)
+        self.assertGreaterEqual(_recall(self.codec, self.vectors), 0.9)
+
+
+class TestProductQuantizationCodec(unittest.TestCase):
+    def setUp(self):
+        self.vectors = _unit_vectors()
+        self.codec = ProductQuantizationCodec(m=8).fit(self.vectors, iterations=8)
+
+    def test_codes_are_m_bytes(self):
+        codes = self.codec.encode(self.vectors)
+        self.assertEqual(codes.shape, (len(self.vectors), 8))
+        self.assertEqual(codes.dtype, np.uint8)
+
+    def test_lookup_table_scores_match_decoded_dot_products(self):
+        codes = self.codec.encode(self.vectors)
+        query = self.vectors[7]
+        np.testing.assert_allclose(self.codec.scores(codes, query), self.codec.decode(codes) @ query, atol=1e-5)
+        self.assertGreaterEqual(_recall(self.codec, self.vectors), 0.5)
+
+    def test_rejects_indivisible_dimension(self):
+        with self.assertRaises(ValueError):
+            ProductQuantizationCodec(m=5).fit(self.vectors)
+
+    def test_save_and_load_round_trip(self):
+        codes = self.codec.encode(self.vectors)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "codes.npz")
+            save_codec(path, self.codec, codes)
+            loaded, loaded_codes = load_codec(path)
+        self.assertIsInstance(loaded, ProductQuantizationCodec)
+        np.testing.assert_array_equal(loaded_codes, codes)
+        np.testing.assert_array_equal(loaded.codebooks, self.codec.codebooks)
+
+
+class TestQuantizedLocalKnn(unittest.TestCase):
+    def test_quantized_search_reranks_to_exact_order(self):
+        vectors = _unit_vectors(rows=300)
+        chunks = [{"doc_id": i, "chunk_id": 0, "chunk_vector": v.tolist()} for i, v in enumerate(vectors)]
+        with tempfile.TemporaryDirectory() as tmp:
+            index = LocalKnnIndex.build(chunks, tmp)
+            index.build_codes(tmp, kind="int8")
+            self.assertTrue(os.path.exists(os.path.join(tmp, CODES_FILE)))
+            quantized = LocalKnnIndex.load(tmp, quantized=True)
+            self.assertIsNotNone(quantized.codes)
+            exact = [doc["doc_id"] for _, doc in index.search(vectors[11], k=5, exact=True)]
+            approx = [doc["doc_id"] for _, doc in quantized.search(vectors[11], k=5)]
+            filtered = quantized.search(vectors[11], k=3, filters={"doc_id": [11, 12]})
+        self.assertEqual(approx, exact)
+        self.assertEqual(sorted(doc["doc_id"] for _, doc in filtered), [11, 12])
+
+    def test_rebuild_drops_stale_codes(self):
+        vectors = _unit_vectors(rows=200)
+        chunks = [{"doc_id": i, "chunk_id": 0, "chunk_vector": v.tolist()} for i, v in enumerate(vectors)]
+        with tempfile.TemporaryDirectory() as tmp:
+            LocalKnnIndex.build(chunks, tmp).build_codes(tmp, kind="int8")
+            LocalKnnIndex.build(chunks[:20], tmp)
+            self.assertFalse(os.path.exists(os.path.join(tmp, CODES_FILE)))
+            reloaded = LocalKnnIndex.load(tmp, quantized=True)
+        self.assertEqual(len(reloaded), 20)
+        self.assertIsNone(reloaded.codes)
+
+    def test_unknown_codec_is_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            index = LocalKnnIndex.build([{"doc_id": 1, "chunk_id": 0, "chunk_vector": [1.0, 0.0]}], tmp)
+            with self.assertRaises(ValueError):
+                index.build_codes(tmp, kind="binary")
+
+
+if __name__ == "__main__":
+    unittest.main()
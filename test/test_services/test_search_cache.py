@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from src.services.search_cache import SearchResultCache, canonical_key
+
+
+class TestCanonicalKey(unittest.TestCase):
+    def test_key_ignores_key_order(self):
+        first = canonical_key("idx", {"query": {"term": {"tag": "Current"}}, "size": 5}, 10)
+        second = canonical_key("idx", {"size": 5, "query": {"term": {"tag": "Current"}}}, 10)
+        self.assertEqual(first, second)
+
+    def test_key_depends_on_index_and_size(self):
+        body = {"query": {"match_all": {}}}
+        self.assertNotEqual(canonical_key("a", body, 10), canonical_key("b", body, 10))
+        self.assertNotEqual(canonical_key("a", body, 10), canonical_key("a", body, 20))
+
+
+class TestSearchResultCache(unittest.TestCase):
+    def test_hit_after_miss(self):
+        cache = SearchResultCache(ttl_seconds=60)
+        calls = []
+        loader = lambda: calls.append(1) or {"hits": {"hits": []}}
+        cache.get_or_load("idx", {"q": 1}, 10, loader)
+        cache.get_or_load("idx", {"q": 1}, 10, loader)
+        self.assertEqual(len(calls), 1)
+
+    def test_errors_are_not_cached(self):
+        cache = SearchResultCache(ttl_seconds=60)
+        calls = []
+        loader = lambda: calls.append(1) or {"error": "boom"}
+        cache.get_or_load("idx", {}, 1, loader)
+        cache.get_or_load("idx", {}, 1, loader)
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_entries_reload(self):
+        cache = SearchResultCache(ttl_seconds=0.01)
+        calls = []
+        loader = lambda: calls.append(1) or {"hits": {}}
+        cache.get_or_load("idx", {}, 1, loader)
+        time.sleep(0.02)
+        cache.get_or_load("idx", {}, 1, loader)
+        self.assertEqual(len(calls), 2)
+
+    def test_invalidate_index(self):
+        cache = SearchResultCache(ttl_seconds=60)
+        cache.get_or_load("a", {}, 1, lambda: {"hits": 1})
+        cache.get_or_load("b", {}, 1, lambda: {"hits": 2})
+        self.assertEqual(cache.invalidate("a"), 1)
+        self.assertEqual(cache.get_or_load("a", {}, 1, lambda: {"hits": 3}), {"hits": 3})
+        self.assertEqual(cache.get_or_load("b", {}, 1, lambda: {"hits": 4}), {"hits": 2})
+
+    def test_eviction_is_driven_by_size(self):
+        cache = SearchResultCache(ttl_seconds=60, max_entries=100, max_bytes=250)
+        big = lambda n: {"hits": "x" * 100, "n": n}
+        for n in range(3):
+            cache.get_or_load("idx", {"q": n}, 1, lambda: big(n))
+        self.assertEqual(len(cache._entries), 2)
+        self.assertLessEqual(cache._bytes, 250)
+        self.assertEqual(cache.get_or_load("idx", {"q": 0}, 1, lambda: "reloaded"), "reloaded")
+        self.assertEqual(cache.get_or_load("idx", {"q": 2}, 1, lambda: "reloaded"), big(2))
+
+    def test_responses_over_the_byte_budget_are_not_cached(self):
+        cache = SearchResultCache(ttl_seconds=60, max_bytes=50)
+        calls = []
+        loader = lambda: calls.append(1) or {"hits": "x" * 100}
+        cache.get_or_load("idx", {}, 1, loader)
+        cache.get_or_load("idx", {}, 1, loader)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache._bytes, 0)
+
+    def test_concurrent_sync_misses_share_one_load(self):
+        cache = SearchResultCache(ttl_seconds=60)
+        calls = []
+
+        def loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return {"hits": {}}
+
+        threads = [threading.Thread(target=cache.get_or_load, args=("idx", {}, 1, loader)) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+
+
+class TestAsyncSearchResultCache(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_async_misses_share_one_load(self):
+        cache = SearchResultCache(ttl_seconds=60)
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"hits": {}}
+
+        results = await asyncio.gather(*(cache.aget_or_load("idx", {}, 1, loader) for _ in range(5)))
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(result == {"hits": {}} for result in results))
+
+    async def test_invalidation_during_load_is_not_stored(self):
+        cache = SearchResultCache(ttl_seconds=60)
+
+        async def loader():
+            cache.invalidate("idx")
+            return {"hits": "stale"}
+
+        await cache.aget_or_load("idx", {}, 1, loader)
+        calls = []
+
+        async def fresh():
+            calls.append(1)
+            return {"hits": "fresh"}
+
+        self.assertEqual(await cache.aget_or_load("idx", {}, 1, fresh), {"hits": "fresh"})
+        self.assertEqual(len(calls), 1)